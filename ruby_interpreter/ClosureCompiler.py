@@ -0,0 +1,317 @@
+from RTEResult import *
+from Errors import RunTimeError
+from Token import *
+from Nodes import *
+from Value import *
+from Compiler import BINARY_METHODS
+
+###########################
+#   Closure Function Class
+###########################
+
+# A Function whose body was already turned into a closure.
+# Calling it runs the body closure, so it never recompiles anything.
+class ClosureFunction(Function):
+    __slots__ = ('body',)
+
+    def __init__(self, name, body_node, arg_names, auto_return, body):
+        super().__init__(name, body_node, arg_names, auto_return)
+        self.body = body
+
+    def execute(self, args, context, pos_start=None, pos_end=None):
+        exec_ctx = self.generate_new_context(context, pos_start, pos_end)
+        self.check_and_populate_args(self.arg_names, args, exec_ctx)
+
+        try:
+            value = self.body(exec_ctx)
+        except ReturnSignal as signal:
+            return signal.value
+
+        if self.auto_return: return value
+        return Number.null
+
+
+#######################
+#   CLOSURE COMPILER
+#######################
+
+# Turns every node into a python closure taking the context and returning a Value.
+# The visit_* lookup of the Interpreter happens once here instead of once per evaluation.
+
+class ClosureCompiler:
+    def run(self, node, context): # Compiles and runs a program, returns a RTEResult like Interpreter.run
+        program = self.compile(node)
+        try:
+            return RTEResult().success(program(context))
+        except ErrorSignal as signal:
+            return RTEResult().failure(signal.error)
+        except (ReturnSignal, BreakSignal, ContinueSignal):
+            return RTEResult().success(None)
+
+    def compile(self, node):
+        method_name = f'compile_{type(node).__name__}'
+        method = getattr(self, method_name, self.no_compile_method)
+        return method(node)
+
+    def no_compile_method(self, node):
+        raise Exception(f'No compile_{type(node).__name__} method defined')
+
+    # Body of a block loop or function whose value is thrown away
+    def compile_void(self, node):
+        if not isinstance(node, ListNode):
+            return self.compile(node)
+
+        statements = [self.compile(element_node) for element_node in node.element_nodes]
+        def run_statements(context):
+            for statement in statements:
+                statement(context)
+        return run_statements
+
+    def compile_NumberNode(self, node):
+        number = make_number(node.tok.value)
+        return lambda context: number
+
+    def compile_StringNode(self, node):
+        string = string_literal(node.tok.value)
+        return lambda context: string
+
+    def compile_BinaryOperatorNode(self, node):
+        if node.op_tok.type == TT_KEYWORD: return self.compile_logic(node)
+
+        if isinstance(node.left_node, BinaryOperatorNode) and node.left_node.op_tok.type != TT_KEYWORD:
+            return self.compile_chain(node)
+
+        method_name = BINARY_METHODS.get(node.op_tok.type)
+        if method_name is None:
+            raise Exception(f'No binary operation defined for {node.op_tok}')
+
+        left_node, right_node = self.compile(node.left_node), self.compile(node.right_node)
+
+        def binary_operation(context):
+            left = left_node(context)
+            result, error = getattr(left, method_name)(right_node(context))
+            if error: raise ErrorSignal(error.at_node(node, context))
+            return result
+        return binary_operation
+
+    # A chain like a + b + c + ... nests to the left as deep as it is long, so its links are compiled
+    # in a loop into one closure that applies them in order, instead of a closure calling a closure per link
+    def compile_chain(self, node):
+        links = []
+        while isinstance(node, BinaryOperatorNode) and node.op_tok.type != TT_KEYWORD:
+            method_name = BINARY_METHODS.get(node.op_tok.type)
+            if method_name is None:
+                raise Exception(f'No binary operation defined for {node.op_tok}')
+            links.append((node, method_name))
+            node = node.left_node
+
+        first_node = self.compile(node)
+        links = [(link, method_name, self.compile(link.right_node)) for link, method_name in reversed(links)]
+
+        def chain(context):
+            left = first_node(context)
+            for link, method_name, right_node in links:
+                left, error = getattr(left, method_name)(right_node(context))
+                if error: raise ErrorSignal(error.at_node(link, context))
+            return left
+        return chain
+
+    # Like Interpreter.logic_operation, the right operand only runs when the left one does not decide
+    def compile_logic(self, node):
+        left_node, right_node = self.compile(node.left_node), self.compile(node.right_node)
+
+        if node.op_tok.keyword == KW_AND:
+            def anded(context):
+                if not left_node(context).is_true(): return Number.false
+                return Number.true if right_node(context).is_true() else Number.false
+            return anded
+
+        def ored(context):
+            if left_node(context).is_true(): return Number.true
+            return Number.true if right_node(context).is_true() else Number.false
+        return ored
+
+    def compile_UnaryOpNode(self, node):
+        operand = self.compile(node.node)
+
+        if node.op_tok.type == TT_SUBTRACT:
+            def negate(context):
+                number, error = operand(context).multiply_by(make_number(-1))
+                if error: raise ErrorSignal(error.at_node(node, context))
+                return number
+            return negate
+
+        if node.op_tok.keyword == KW_NOT:
+            def notted(context):
+                number, error = operand(context).notted()
+                if error: raise ErrorSignal(error.at_node(node, context))
+                return number
+            return notted
+
+        return operand
+
+    def compile_VarAccessNode(self, node):
+        var_name, pos_start, pos_end = node.var_name_tok.value, node.pos_start, node.pos_end
+
+        def var_access(context):
+            value = context.symbol_table.get(var_name)
+            if not value:
+                raise ErrorSignal(RunTimeError(
+                    pos_start, pos_end,
+                    f"'{var_name}' is not defined",
+                    context
+                ))
+            return value
+        return var_access
+
+    def compile_VarAssignNode(self, node):
+        var_name, value_node = node.var_name_tok.value, self.compile(node.value_node)
+
+        def var_assign(context):
+            value = value_node(context)
+            context.symbol_table.set(var_name, value)
+            return value
+        return var_assign
+
+    def compile_IfNode(self, node):
+        cases = [
+            (self.compile(condition), self.compile_void(expr) if return_null else self.compile(expr), return_null)
+            for condition, expr, return_null in node.cases
+        ]
+        if node.else_case:
+            expr, return_null = node.else_case
+            else_case = (self.compile_void(expr) if return_null else self.compile(expr), return_null)
+        else:
+            else_case = None
+
+        def if_expr(context):
+            for condition, expr, return_null in cases:
+                if condition(context).is_true():
+                    value = expr(context)
+                    return Number.null if return_null else value
+            if else_case:
+                expr, return_null = else_case
+                value = expr(context)
+                return Number.null if return_null else value
+            return Number.null
+        return if_expr
+
+    def compile_ForNode(self, node):
+        var_name, return_null = node.var_name_tok.value, node.return_null
+        body = self.compile_void(node.body_node) if return_null else self.compile(node.body_node)
+
+        def finish(elements):
+            if return_null: return Number.null
+            return List(elements)
+
+        if node.iterable_node:
+            iterable_node = self.compile(node.iterable_node)
+
+            def for_in(context):
+                elements = []
+                symbol_table = context.symbol_table
+                for item in iterable_node(context).elements:
+                    symbol_table.set(var_name, item)
+                    try:
+                        value = body(context)
+                    except ContinueSignal:
+                        continue
+                    except BreakSignal:
+                        break
+                    if not return_null: elements.append(value)
+                return finish(elements)
+            return for_in
+
+        start_value_node = self.compile(node.start_value_node)
+        end_value_node = self.compile(node.end_value_node)
+        step_value_node = self.compile(node.step_value_node) if node.step_value_node else None
+
+        def for_range(context):
+            elements = []
+            i = start_value_node(context).value
+            end = end_value_node(context).value
+            step = step_value_node(context).value if step_value_node else 1
+            ascending = step >= 0
+            symbol_table = context.symbol_table
+
+            while (i < end) if ascending else (i > end):
+                symbol_table.set(var_name, make_number(i))
+                i += step
+                try:
+                    value = body(context)
+                except ContinueSignal:
+                    continue
+                except BreakSignal:
+                    break
+                if not return_null: elements.append(value)
+            return finish(elements)
+        return for_range
+
+    def compile_WhileNode(self, node, until=False):
+        condition_node, return_null = self.compile(node.condition_node), node.return_null
+        body = self.compile_void(node.body_node) if return_null else self.compile(node.body_node)
+
+        def while_loop(context):
+            elements = []
+            while condition_node(context).is_true() != until:
+                try:
+                    value = body(context)
+                except ContinueSignal:
+                    continue
+                except BreakSignal:
+                    break
+                if not return_null: elements.append(value)
+
+            if return_null: return Number.null
+            return List(elements)
+        return while_loop
+
+    def compile_UntilNode(self, node):
+        return self.compile_WhileNode(node, until=True)
+
+    def compile_FunctionDefinitionNode(self, node):
+        func_name = node.var_name_tok.value if node.var_name_tok else None
+        arg_names = [arg_name.value for arg_name in node.arg_name_toks]
+        body_node, auto_return = node.body_node, node.auto_return
+        body = self.compile(body_node) if auto_return else self.compile_void(body_node)
+
+        def function_definition(context):
+            func_value = ClosureFunction(func_name, body_node, arg_names, auto_return, body)
+            if func_name: context.symbol_table.set(func_name, func_value)
+            return func_value
+        return function_definition
+
+    def compile_CallNode(self, node):
+        node_to_call = self.compile(node.node_to_call)
+        arg_nodes = [self.compile(arg_node) for arg_node in node.arg_nodes]
+        pos_start, pos_end = node.pos_start, node.pos_end
+
+        def call(context):
+            value_to_call = node_to_call(context)
+            args = [arg_node(context) for arg_node in arg_nodes]
+            return value_to_call.execute(args, context, pos_start, pos_end)
+        return call
+
+    def compile_ListNode(self, node):
+        element_nodes = [self.compile(element_node) for element_node in node.element_nodes]
+
+        def list_expr(context):
+            return List([element_node(context) for element_node in element_nodes])
+        return list_expr
+
+    def compile_ReturnNode(self, node):
+        node_to_return = self.compile(node.node_to_return) if node.node_to_return else None
+
+        def return_statement(context):
+            raise ReturnSignal(node_to_return(context) if node_to_return else Number.null)
+        return return_statement
+
+    def compile_ContinueNode(self, node):
+        def continue_statement(context):
+            raise CONTINUE
+        return continue_statement
+
+    def compile_BreakNode(self, node):
+        def break_statement(context):
+            raise BREAK
+        return break_statement
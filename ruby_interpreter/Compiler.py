@@ -0,0 +1,391 @@
+from Token import *
+from Nodes import *
+
+#######################
+#   OPCODES
+#######################
+
+# Every instruction is two slots in Code.instructions: the opcode and its argument.
+# Opcodes are small ints so the VM dispatch loop only does integer compares.
+
+LOAD_NUMBER     = 0     # push Number(constants[arg])
+LOAD_STRING     = 1     # push String(constants[arg])
+LOAD_NAME       = 2     # push the variable names[arg]
+STORE_NAME      = 3     # set names[arg] to TOS (TOS stays on the stack)
+BINARY_OP       = 4     # pop right, left; push left.<names[arg]>(right)
+UNARY_NEG       = 5     # TOS = TOS * -1
+UNARY_NOT       = 6     # TOS = NOT TOS
+UNARY_POS       = 7     # TOS keeps its value
+POP             = 8     # discard TOS
+POP_N           = 9     # discard arg items
+LOAD_NULL       = 10    # push Number.null
+LOAD_ONE        = 11    # push Number(1), used as the default STEP
+JUMP            = 12    # pc = arg
+POP_JUMP_IF_FALSE = 13  # pop TOS, jump if it is not true
+POP_JUMP_IF_TRUE  = 14  # pop TOS, jump if it is true
+BUILD_LIST      = 15    # pop arg items, push a List of them
+NEW_ACCUM       = 16    # push an empty python list to collect loop values
+ACCUM_APPEND    = 17    # pop TOS and append it to the accumulator at stack[-arg]
+BUILD_ACCUM     = 18    # turn the accumulator on TOS into a List
+FOR_RANGE_PREP  = 19    # pop step, end, start; push the counted loop state
+FOR_RANGE_NEXT  = 20    # push Number(i) and advance i, or pop the state and jump to arg
+GET_ITER        = 21    # TOS = iterator over TOS.elements
+FOR_ITER        = 22    # push the next element, or pop the iterator and jump to arg
+MAKE_FUNCTION   = 23    # push a function built from constants[arg]
+CALL            = 24    # pop arg args and the callee; push the return value
+RETURN_VALUE    = 25    # return TOS from the current function
+HALT            = 26    # stop the program without a value (top-level RETURN)
+LEAVE_LOOP      = 27    # BREAK (arg 1) or CONTINUE (arg 0) outside of a loop: go on at the loop around the call
+
+OPCODE_NAMES = {
+    value: name for name, value in list(globals().items())
+    if name.isupper() and isinstance(value, int) and not name.startswith('TT_')
+}
+
+# How many items each opcode adds to (or removes from) the stack.
+# None means the effect depends on the argument
+STACK_EFFECT = {
+    LOAD_NUMBER: 1, LOAD_STRING: 1, LOAD_NAME: 1, STORE_NAME: 0,
+    BINARY_OP: -1, UNARY_NEG: 0, UNARY_NOT: 0, UNARY_POS: 0,
+    POP: -1, POP_N: None, LOAD_NULL: 1, LOAD_ONE: 1,
+    JUMP: 0, POP_JUMP_IF_FALSE: -1, POP_JUMP_IF_TRUE: -1,
+    BUILD_LIST: None, NEW_ACCUM: 1, ACCUM_APPEND: -1, BUILD_ACCUM: 0,
+    FOR_RANGE_PREP: -2, FOR_RANGE_NEXT: 1, GET_ITER: 0, FOR_ITER: 1,
+    MAKE_FUNCTION: 1, CALL: None, RETURN_VALUE: -1, HALT: 0, LEAVE_LOOP: 0,
+}
+
+# Maps operator tokens to the Value method that implements them
+BINARY_METHODS = {
+    TT_ADD: 'added_to',
+    TT_SUBTRACT: 'subbed_by',
+    TT_MULTIPLY: 'multiply_by',
+    TT_DIVIDE: 'divide_by',
+    TT_POWER: 'power_by',
+    TT_GREATER_THAN: 'greater_than',
+    TT_GREATER_THAN_EQUALS: 'greater_than_eq',
+    TT_LESS_THAN: 'less_than',
+    TT_LESS_THAN_EQUALS: 'less_than_eq',
+    TT_EQUALS_TO: 'equal_to',
+    TT_NE: 'not_equal_to',
+}
+
+
+#######################
+#   CODE OBJECT
+#######################
+
+class Code:
+    def __init__(self, name):
+        self.name = name
+        self.instructions = []  # flat list of [opcode, arg, opcode, arg, ...]
+        self.nodes = []         # node each instruction came from, used for positions and errors
+        self.constants = []
+        self.names = []
+        self.slots = []         # Frame slot of each name, None for names the function does not bind
+        self.loops = {}         # CALL index -> (break target, break depth, continue target, continue depth)
+
+    def disassemble(self):
+        lines = []
+        for pc in range(0, len(self.instructions), 2):
+            op, arg = self.instructions[pc], self.instructions[pc + 1]
+            lines.append(f'{pc:>5} {OPCODE_NAMES[op]:<18} {arg}')
+        return f'<code {self.name}>\n' + '\n'.join(lines)
+
+
+#######################
+#   COMPILER
+#######################
+
+# The compiler lowers the AST from Parser.parse into a Code object for the VM.
+# It tracks the stack depth at every point so that BREAK and CONTINUE can drop
+# whatever half-finished expression values are left before jumping.
+
+class Compiler:
+    def __init__(self, name='<program>', in_function=False, scope=None):
+        self.code = Code(name)
+        self.in_function = in_function
+        self.scope = scope # The function's slots from the Resolver
+        self.depth = 0
+        self.loops = []  # [break_jumps, continue_target, break_depth, continue_depth, calls]
+
+    def compile_program(self, node):
+        self.compile(node)
+        self.emit(RETURN_VALUE)
+        return self.code
+
+    def compile_function(self, node):
+        if node.auto_return:
+            self.compile(node.body_node)
+        else:
+            self.compile_void(node.body_node)
+            self.emit(LOAD_NULL)
+        self.emit(RETURN_VALUE)
+        return self.code
+
+    ##################
+    # Helpers
+    ##################
+
+    def emit(self, op, arg=0, node=None):
+        code = self.code
+        code.instructions.append(op)
+        code.instructions.append(arg)
+        code.nodes.append(node)
+        code.nodes.append(None)
+
+        effect = STACK_EFFECT[op]
+        if effect is None:
+            if op == POP_N: effect = -arg
+            elif op == BUILD_LIST: effect = 1 - arg
+            elif op == CALL: effect = -arg
+        self.depth += effect
+        return len(code.instructions) - 2 # index of the emitted instruction
+
+    def patch(self, index, target=None):
+        self.code.instructions[index + 1] = len(self.code.instructions) if target is None else target
+
+    def here(self):
+        return len(self.code.instructions)
+
+    def constant(self, value):
+        self.code.constants.append(value)
+        return len(self.code.constants) - 1
+
+    def name(self, name):
+        if name not in self.code.names:
+            self.code.names.append(name)
+            self.code.slots.append(self.scope.get(name) if self.scope else None)
+        return self.code.names.index(name)
+
+    def compile(self, node):
+        method_name = f'compile_{type(node).__name__}'
+        method = getattr(self, method_name, self.no_compile_method)
+        method(node)
+
+    def no_compile_method(self, node):
+        raise Exception(f'No compile_{type(node).__name__} method defined')
+
+    # Compiles a node whose value is never used, like the body of a block loop
+    def compile_void(self, node):
+        if isinstance(node, ListNode):
+            for element_node in node.element_nodes:
+                self.compile(element_node)
+                self.emit(POP)
+        else:
+            self.compile(node)
+            self.emit(POP)
+
+    ##################
+    # Nodes
+    ##################
+
+    def compile_NumberNode(self, node):
+        self.emit(LOAD_NUMBER, self.constant(node.tok.value), node)
+
+    def compile_StringNode(self, node):
+        self.emit(LOAD_STRING, self.constant(node.tok.value), node)
+
+    def compile_VarAccessNode(self, node):
+        self.emit(LOAD_NAME, self.name(node.var_name_tok.value), node)
+
+    def compile_VarAssignNode(self, node):
+        self.compile(node.value_node)
+        self.emit(STORE_NAME, self.name(node.var_name_tok.value), node)
+
+    # A chain like a + b + c + ... nests to the left as deep as it is long, so its left spine is
+    # compiled in a loop and only the right operands recurse
+    def compile_BinaryOperatorNode(self, node):
+        if node.op_tok.type == TT_KEYWORD: return self.compile_logic(node)
+
+        links = []
+        while isinstance(node, BinaryOperatorNode) and node.op_tok.type != TT_KEYWORD:
+            method_name = BINARY_METHODS.get(node.op_tok.type)
+            if method_name is None:
+                raise Exception(f'No binary operation defined for {node.op_tok}')
+            links.append((node, method_name))
+            node = node.left_node
+
+        self.compile(node)
+        for node, method_name in reversed(links):
+            self.compile(node.right_node)
+            self.emit(BINARY_OP, self.name(method_name), node)
+
+    # AND and OR jump over their right operand when the left one decides the result.
+    # Either way they push TRUE or FALSE, like Interpreter.logic_operation
+    def compile_logic(self, node):
+        jump_op, decided = (POP_JUMP_IF_FALSE, 0) if node.op_tok.keyword == KW_AND else (POP_JUMP_IF_TRUE, 1)
+        self.compile(node.left_node)
+        left_jump = self.emit(jump_op)
+        self.compile(node.right_node)
+        right_jump = self.emit(jump_op)
+        self.emit(LOAD_NUMBER, self.constant(1 - decided), node)
+        end_jump = self.emit(JUMP)
+        self.depth -= 1 # only one of the two results is left on the stack
+        self.patch(left_jump)
+        self.patch(right_jump)
+        self.emit(LOAD_NUMBER, self.constant(decided), node)
+        self.patch(end_jump)
+
+    def compile_UnaryOpNode(self, node):
+        self.compile(node.node)
+        if node.op_tok.type == TT_SUBTRACT:
+            self.emit(UNARY_NEG, 0, node)
+        elif node.op_tok.keyword == KW_NOT:
+            self.emit(UNARY_NOT, 0, node)
+        else:
+            self.emit(UNARY_POS, 0, node)
+
+    def compile_ListNode(self, node):
+        for element_node in node.element_nodes:
+            self.compile(element_node)
+        self.emit(BUILD_LIST, len(node.element_nodes), node)
+
+    def compile_IfNode(self, node):
+        end_jumps = []
+
+        for condition, expr, return_null in node.cases:
+            self.compile(condition)
+            next_case = self.emit(POP_JUMP_IF_FALSE)
+            self.compile_branch(expr, return_null)
+            end_jumps.append(self.emit(JUMP))
+            self.depth -= 1 # only one branch leaves its value on the stack
+            self.patch(next_case)
+
+        if node.else_case:
+            expr, return_null = node.else_case
+            self.compile_branch(expr, return_null)
+        else:
+            self.emit(LOAD_NULL)
+
+        for jump in end_jumps:
+            self.patch(jump)
+
+    def compile_branch(self, expr, return_null):
+        if return_null:
+            self.compile_void(expr)
+            self.emit(LOAD_NULL)
+        else:
+            self.compile(expr)
+
+    def compile_ForNode(self, node):
+        if not node.return_null:
+            self.emit(NEW_ACCUM)
+
+        if node.start_value_node and node.end_value_node:
+            self.compile(node.start_value_node)
+            self.compile(node.end_value_node)
+            if node.step_value_node:
+                self.compile(node.step_value_node)
+            else:
+                self.emit(LOAD_ONE)
+            self.emit(FOR_RANGE_PREP)
+            next_op = FOR_RANGE_NEXT
+        else:
+            self.compile(node.iterable_node)
+            self.emit(GET_ITER)
+            next_op = FOR_ITER
+
+        loop_start = self.here()
+        loop_exit = self.emit(next_op)
+        self.emit(STORE_NAME, self.name(node.var_name_tok.value))
+        self.emit(POP)
+
+        self.compile_loop_body(node, loop_start, break_depth=self.depth - 1)
+        self.depth -= 1 # the loop state is popped when the loop finishes
+        self.finish_loop(node, loop_exit)
+
+    def compile_WhileNode(self, node, jump_op=POP_JUMP_IF_FALSE):
+        if not node.return_null:
+            self.emit(NEW_ACCUM)
+
+        loop_start = self.here()
+        self.compile(node.condition_node)
+        loop_exit = self.emit(jump_op)
+
+        self.compile_loop_body(node, loop_start, break_depth=self.depth)
+        self.finish_loop(node, loop_exit)
+
+    def compile_UntilNode(self, node):
+        self.compile_WhileNode(node, POP_JUMP_IF_TRUE)
+
+    def compile_loop_body(self, node, loop_start, break_depth):
+        self.loops.append([[], loop_start, break_depth, self.depth, []])
+
+        if node.return_null:
+            self.compile_void(node.body_node)
+        else:
+            self.compile(node.body_node)
+            self.emit(ACCUM_APPEND, self.depth - break_depth)
+        self.emit(JUMP, loop_start)
+
+    def finish_loop(self, node, loop_exit):
+        break_jumps, continue_target, break_depth, continue_depth, calls = self.loops.pop()
+        self.patch(loop_exit)
+        for jump in break_jumps:
+            self.patch(jump)
+        # Where a BREAK or CONTINUE that left a function called in the body goes on
+        for call in calls:
+            self.code.loops[call] = (self.here(), break_depth, continue_target, continue_depth)
+
+        if node.return_null:
+            self.emit(LOAD_NULL)
+        else:
+            self.emit(BUILD_ACCUM, 0, node)
+
+    def compile_BreakNode(self, node):
+        self.jump_out_of_loop(node, is_break=True)
+
+    def compile_ContinueNode(self, node):
+        self.jump_out_of_loop(node, is_break=False)
+
+    def jump_out_of_loop(self, node, is_break):
+        if not self.loops:
+            if self.in_function: # Leaves the function for the loop around the call, like the Interpreter's signals
+                self.emit(LEAVE_LOOP, int(is_break), node)
+                self.depth += 1
+            else: # BREAK or CONTINUE outside of any loop stops the program
+                self.compile_ReturnNode(ReturnNode(None, node.pos_start, node.pos_end))
+            return
+
+        break_jumps, continue_target, break_depth, continue_depth, _ = self.loops[-1]
+        depth = self.depth
+        target_depth = break_depth if is_break else continue_depth
+
+        if depth > target_depth:
+            self.emit(POP_N, depth - target_depth)
+        if is_break:
+            break_jumps.append(self.emit(JUMP))
+        else:
+            self.emit(JUMP, continue_target)
+
+        # Code after the jump is unreachable, keep the stack depth the caller expects
+        self.depth = depth + 1
+
+    def compile_ReturnNode(self, node):
+        depth = self.depth
+        if node.node_to_return:
+            self.compile(node.node_to_return)
+        else:
+            self.emit(LOAD_NULL)
+
+        if self.in_function:
+            self.emit(RETURN_VALUE)
+        else: # a RETURN in the program itself ends it without a value
+            self.emit(POP)
+            self.emit(HALT)
+        self.depth = depth + 1
+
+    def compile_FunctionDefinitionNode(self, node):
+        name = node.var_name_tok.value if node.var_name_tok else '<anonymous>'
+        body_code = Compiler(name, in_function=True, scope=node.scope).compile_function(node)
+
+        self.emit(MAKE_FUNCTION, self.constant((node, body_code)), node)
+        if node.var_name_tok:
+            self.emit(STORE_NAME, self.name(node.var_name_tok.value))
+
+    def compile_CallNode(self, node):
+        self.compile(node.node_to_call)
+        for arg_node in node.arg_nodes:
+            self.compile(arg_node)
+        call = self.emit(CALL, len(node.arg_nodes), node)
+        if self.loops: self.loops[-1][4].append(call)
@@ -3,8 +3,10 @@
 #########################
 
 class Context: # holds current context to hold functions 
-    def __init__(self, display_name, parent=None, parent_entry_pos=None):
+    def __init__(self, display_name, parent=None, parent_entry_pos=None, parent_entry_end=None):
         self.display_name = display_name
         self.parent = parent
         self.parent_entry_pos = parent_entry_pos
+        self.parent_entry_end = parent_entry_end # End of the call, errors about the call itself point at all of it
         self.symbol_table = None
+        self.tail_calls = None # Calls this context took the place of, see Function.execute
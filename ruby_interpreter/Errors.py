@@ -33,6 +33,12 @@ class ExpectedCharError(Error):
     def __init__(self,pos_start, pos_end, details):
         super().__init__(pos_start,pos_end, "Expected Character", details)
 
+# A program that nests or recurses deeper than python's recursion limit lets a pass or an engine go,
+# main.run has nothing better to point at than the start of the program
+class RecursionDepthError(Error):
+    def __init__(self, pos_start, pos_end, details):
+        super().__init__(pos_start, pos_end, "Recursion Error", details)
+
 class RunTimeError(Error):
     def __init__(self, pos_start, pos_end, details, context):
         super().__init__(pos_start, pos_end, "Runtime Error", details)
@@ -46,13 +52,28 @@ class RunTimeError(Error):
         return result
 
     def generate_traceback(self):
-        result =''
+        lines = [] # Innermost first, joined the other way around at the end
         pos = self.pos_start
         ctx = self.context
 
         while ctx:
-            result = f'File {pos.file_name}, line {str(pos.ln + 1)}, in {ctx.display_name}\n' + result
+            lines.append(f'File {pos.file_name}, line {str(pos.ln + 1)}, in {ctx.display_name}\n')
+            tail_calls = ctx.tail_calls # (name, pos, count, older tail calls)
+            while tail_calls:
+                name, call_pos, count, tail_calls = tail_calls
+                lines.append(f'File {call_pos.file_name}, line {str(call_pos.ln + 1)}, in {name}\n' * count)
             pos = ctx.parent_entry_pos
             ctx = ctx.parent
         
-        return "Traceback (most recent call last):\n" + result
\ No newline at end of file
+        return "Traceback (most recent call last):\n" + ''.join(reversed(lines))
+
+# What a Value operation returns when it fails. Values do not know where they are used, so the
+# engine that ran the operation turns it into a RunTimeError at its node, like the transpiler's ScriptError
+class OperationError:
+    def __init__(self, details, at='node'):
+        self.details = details
+        self.at = at # 'node' for the whole node, 'right' for the right operand
+
+    def at_node(self, node, context):
+        pos_node = node.right_node if self.at == 'right' else node
+        return RunTimeError(pos_node.pos_start, pos_node.pos_end, self.details, context)
@@ -0,0 +1,385 @@
+import marshal
+from array import array
+from Token import *
+from Nodes import *
+from Position import Position, Source
+from Value import make_number, string_literal
+
+##################
+#   FLAT AST
+##################
+
+# The whole AST in parallel arrays with one entry per node, instead of a python object per node.
+# A big program takes several times less memory this way, and passes over the whole tree
+# (bound_names, to_bytes) are loops over the arrays instead of recursive walks.
+#
+#   kinds           index of the node's class in NODE_TYPES
+#   flags           NUMERIC, RETURN_NULL, AUTO_RETURN, TAIL_CALL, HAS_VALUE bits
+#   tokens          index into token_table, -1 for none. Equal tokens are stored once, without positions
+#   starts, ends    index of pos_start / pos_end in the one Source of the program, -1 for None
+#   slots           Frame slot from the Resolver, -1 for None
+#   firsts, counts  the node's slice of the links array
+#
+# Children are added before their parent, so the root is the last node. The links of each node:
+#   BinaryOperatorNode      left, right                     UnaryOpNode         node
+#   VarAssignNode           value                           CallNode            node_to_call, args...
+#   ForNode                 start, end, step, iterable, body (-1 for a missing one)
+#   WhileNode, UntilNode    condition, body                 ListNode            elements...
+#   IfNode                  (condition, expr, return_null) for every case, then (expr, return_null) of the else
+#   FunctionDefinitionNode  body, then the token of every argument name
+#   ReturnNode              node_to_return (-1 for none)
+#
+# FlatTree.node(index) is the adapter the engines run off: a view with the same class name and
+# attributes as the Nodes class it stands for. Views are read only, FlatTree.to_node() turns
+# the tree back into Nodes for the passes that rewrite it (Optimizer, Resolver).
+
+NODE_TYPES = [NumberNode, StringNode, BinaryOperatorNode, UnaryOpNode, VarAccessNode, VarAssignNode,
+              ForNode, WhileNode, UntilNode, IfNode, FunctionDefinitionNode, CallNode, ListNode,
+              ReturnNode, ContinueNode, BreakNode]
+KINDS = {node_type: kind for kind, node_type in enumerate(NODE_TYPES)}
+
+NUMERIC, RETURN_NULL, AUTO_RETURN, TAIL_CALL, HAS_VALUE = 1, 2, 4, 8, 16
+
+FORMAT = 1 # Version of to_bytes, from_bytes refuses anything else
+
+class FlatTree:
+    def __init__(self, node=None):
+        self.kinds = array('B')
+        self.flags = array('B')
+        self.tokens = array('i')
+        self.starts = array('i')
+        self.ends = array('i')
+        self.slots = array('i')
+        self.firsts = array('i')
+        self.counts = array('i')
+        self.links = array('i')
+
+        self.token_table = []   # Token objects, shared by every node that uses an equal token
+        self.token_ids = {}     # (type, keyword, value) -> index in token_table
+        self.values = {}        # Node index -> prebuilt Number/String of the Optimizer, made again on the first use
+        self.scopes = {}        # Node index -> FunctionDefinitionNode.scope from the Resolver
+        self.source = None
+        self.views = {}         # Node index -> its view, so every engine always gets the same object
+        self.root_index = -1
+
+        if node is not None: self.root_index = self.add(node)
+
+    def __len__(self):
+        return len(self.kinds)
+
+    @property
+    def root(self):
+        return self.node(self.root_index)
+
+    ##################
+    # Building
+    ##################
+
+    # Adds root and everything under it, returns its index. Children go in before their node, in the order
+    # the node links them; the walk keeps its own stack, like a chain a + b + c + ... nests as deep as it is long
+    def add(self, root):
+        if root is None: return -1
+        indices = {} # id(node) -> its index, for the nodes added so far
+        index_of = lambda child: -1 if child is None else indices[id(child)]
+        stack = [(root, False)]
+        while stack:
+            node, children_added = stack.pop()
+            if children_added:
+                indices[id(node)] = self.add_node(node, index_of)
+                continue
+            stack.append((node, True))
+            stack.extend((child, False) for child in reversed(children(node)))
+        return indices[id(root)]
+
+    def add_node(self, node, index_of): # Adds one node, index_of gives the index of an added child
+        flags = NUMERIC if node.numeric else 0
+
+        if isinstance(node, (NumberNode, StringNode)):
+            links = ()
+            if node.value: flags |= HAS_VALUE
+        elif isinstance(node, BinaryOperatorNode):
+            links = (index_of(node.left_node), index_of(node.right_node))
+        elif isinstance(node, UnaryOpNode):
+            links = (index_of(node.node),)
+        elif isinstance(node, VarAssignNode):
+            links = (index_of(node.value_node),)
+        elif isinstance(node, ForNode):
+            links = tuple(index_of(child) for child in (node.start_value_node, node.end_value_node,
+                          node.step_value_node, node.iterable_node, node.body_node))
+            if node.return_null: flags |= RETURN_NULL
+        elif isinstance(node, (WhileNode, UntilNode)):
+            links = (index_of(node.condition_node), index_of(node.body_node))
+            if node.return_null: flags |= RETURN_NULL
+        elif isinstance(node, IfNode):
+            links = []
+            for condition, expr, return_null in node.cases:
+                links += (index_of(condition), index_of(expr), int(return_null))
+            if node.else_case:
+                links += (index_of(node.else_case[0]), int(node.else_case[1]))
+        elif isinstance(node, FunctionDefinitionNode):
+            links = [index_of(node.body_node)] + [self.token(tok) for tok in node.arg_name_toks]
+            if node.auto_return: flags |= AUTO_RETURN
+        elif isinstance(node, CallNode):
+            links = [index_of(node.node_to_call)] + [index_of(arg_node) for arg_node in node.arg_nodes]
+            if node.tail_call: flags |= TAIL_CALL
+        elif isinstance(node, ListNode):
+            links = [index_of(element_node) for element_node in node.element_nodes]
+        elif isinstance(node, ReturnNode):
+            links = (index_of(node.node_to_return),)
+        else: # VarAccessNode, ContinueNode, BreakNode
+            links = ()
+
+        index = len(self.kinds)
+        self.kinds.append(KINDS[type(node)])
+        self.flags.append(flags)
+        self.tokens.append(self.token(getattr(node, 'tok', None) or getattr(node, 'op_tok', None)
+                                      or getattr(node, 'var_name_tok', None)))
+        self.starts.append(self.position_index(node.pos_start))
+        self.ends.append(self.position_index(node.pos_end))
+        slot = getattr(node, 'slot', None)
+        self.slots.append(-1 if slot is None else slot)
+        self.firsts.append(len(self.links))
+        self.counts.append(len(links))
+        self.links.extend(links)
+
+        if getattr(node, 'scope', None) is not None: self.scopes[index] = node.scope
+        return index
+
+    def token(self, tok): # Index of an equal token in token_table, adding it the first time
+        if tok is None: return -1
+        value = tok.value
+        key = (tok.type, tok.keyword, repr(value) if type(value) is float else value) # Keeps -0.0 apart from 0.0
+        index = self.token_ids.get(key)
+        if index is None:
+            index = self.token_ids[key] = len(self.token_table)
+            self.token_table.append(Token(tok.type, value, keyword=tok.keyword))
+        return index
+
+    def position_index(self, pos):
+        if pos is None: return -1
+        if self.source is None: self.source = pos.source
+        return pos.idx
+
+    ##################
+    # Reading
+    ##################
+
+    def node(self, index): # The view of a node, None for -1
+        if index < 0: return None
+        view = self.views.get(index)
+        if view is None:
+            view = self.views[index] = VIEW_TYPES[self.kinds[index]](self, index)
+        return view
+
+    def position(self, idx):
+        return None if idx < 0 else Position(idx, self.source)
+
+    def value(self, index): # Same Value as Optimizer.optimize_NumberNode/optimize_StringNode, None without HAS_VALUE
+        value = self.values.get(index)
+        if value is None and self.flags[index] & HAS_VALUE:
+            make_value = make_number if self.kinds[index] == K_NUMBER else string_literal
+            value = self.values[index] = make_value(self.token_table[self.tokens[index]].value)
+        return value
+
+    def node_links(self, index): # The node's links as a list of ints
+        first = self.firsts[index]
+        return self.links[first:first + self.counts[index]].tolist()
+
+    def bound_names(self): # Every name the program assigns, loops over, defines or takes as an argument
+        token_table, tokens = self.token_table, self.tokens
+        for index, kind in enumerate(self.kinds):
+            if kind == K_VAR_ASSIGN or kind == K_FOR:
+                yield token_table[tokens[index]].value
+            elif kind == K_FUNCTION_DEFINITION:
+                if tokens[index] >= 0: yield token_table[tokens[index]].value
+                for tok in self.node_links(index)[1:]: yield token_table[tok].value
+
+    def to_node(self, index=None): # Builds the Nodes of the tree (or the subtree at index) again
+        if index is None: index = self.root_index
+        if index < 0: return None
+        built = {} # Index -> its new Node, children are built before their node with a stack of its own, like in add()
+        stack = [(index, False)]
+        while stack:
+            current, children_built = stack.pop()
+            if children_built:
+                built[current] = self.build_node(current, built.get)
+                continue
+            stack.append((current, True))
+            stack.extend((child, False) for child in reversed(self.child_links(current)))
+        return built[index]
+
+    def child_links(self, index): # The links of a node that are child nodes, without the flags and tokens among them
+        links, node_type = self.node_links(index), NODE_TYPES[self.kinds[index]]
+        if node_type is IfNode: # condition, expr, return_null per case, then else_case and its return_null
+            cases = [link for i in range(0, len(links) // 3 * 3, 3) for link in links[i:i + 2]]
+            links = cases + [links[-2]] if len(links) % 3 == 2 else cases
+        elif node_type is FunctionDefinitionNode:
+            links = links[:1]
+        return [link for link in links if link >= 0]
+
+    def build_node(self, index, to_node): # One Node, to_node gives the Node built for a link (None for -1)
+        kind, flags, links = self.kinds[index], self.flags[index], self.node_links(index)
+        node_type = NODE_TYPES[kind]
+        tok = self.token_table[self.tokens[index]] if self.tokens[index] >= 0 else None
+
+        if node_type in (NumberNode, StringNode, VarAccessNode):
+            node = node_type(tok)
+        elif node_type is BinaryOperatorNode:
+            node = BinaryOperatorNode(to_node(links[0]), tok, to_node(links[1]))
+        elif node_type is UnaryOpNode:
+            node = UnaryOpNode(tok, to_node(links[0]))
+        elif node_type is VarAssignNode:
+            node = VarAssignNode(tok, to_node(links[0]))
+        elif node_type is ForNode:
+            start, end, step, iterable, body = [to_node(link) for link in links]
+            node = ForNode(tok, start, end, step, body, bool(flags & RETURN_NULL), iterable)
+        elif node_type in (WhileNode, UntilNode):
+            node = node_type(to_node(links[0]), to_node(links[1]), bool(flags & RETURN_NULL))
+        elif node_type is IfNode:
+            node = IfNode.__new__(IfNode) # The Optimizer can leave an IfNode with no cases, which the constructor can not take
+            node.cases = [(to_node(links[i]), to_node(links[i + 1]), bool(links[i + 2])) for i in range(0, len(links) // 3 * 3, 3)]
+            node.else_case = (to_node(links[-2]), bool(links[-1])) if len(links) % 3 == 2 else None
+        elif node_type is FunctionDefinitionNode:
+            arg_name_toks = [self.token_table[link] for link in links[1:]]
+            node = FunctionDefinitionNode(tok, arg_name_toks, to_node(links[0]), bool(flags & AUTO_RETURN))
+            node.scope = self.scopes.get(index)
+        elif node_type is CallNode:
+            node = CallNode(to_node(links[0]), [to_node(link) for link in links[1:]])
+            node.tail_call = bool(flags & TAIL_CALL)
+        elif node_type is ListNode:
+            node = ListNode([to_node(link) for link in links], None, None)
+        elif node_type is ReturnNode:
+            node = ReturnNode(to_node(links[0]), None, None)
+        else:
+            node = node_type(None, None)
+
+        # The tokens have no positions, so the ones the constructors worked out are replaced
+        node.pos_start, node.pos_end = self.position(self.starts[index]), self.position(self.ends[index])
+        if node.numeric != bool(flags & NUMERIC): node.numeric = not node.numeric # The Optimizer may have replaced children since
+        if hasattr(node, 'slot'): node.slot = None if self.slots[index] < 0 else self.slots[index]
+        if flags & HAS_VALUE: node.value = self.value(index)
+        return node
+
+    ##################
+    # Serializing
+    ##################
+
+    def to_bytes(self): # The whole tree with its Source, the scopes and the tokens, for from_bytes
+        source = (self.source.file_name, self.source.file_txt) if self.source else None
+        arrays = [getattr(self, name).tobytes() for name in ARRAYS]
+        token_table = [(tok.type, tok.value, tok.keyword) for tok in self.token_table]
+        return marshal.dumps((FORMAT, source, self.root_index, arrays, token_table, self.scopes))
+
+    @classmethod
+    def from_bytes(cls, data):
+        version, source, root_index, arrays, token_table, scopes = marshal.loads(data)
+        if version != FORMAT: raise ValueError(f'Flat AST format {version} is not supported')
+
+        tree = cls()
+        tree.source = Source(*source) if source else None
+        tree.root_index = root_index
+        for name, data in zip(ARRAYS, arrays):
+            getattr(tree, name).frombytes(data)
+        tree.token_table = [Token(type_, value, keyword=keyword) for type_, value, keyword in token_table]
+        tree.scopes = scopes
+        return tree
+
+ARRAYS = ('kinds', 'flags', 'tokens', 'starts', 'ends', 'slots', 'firsts', 'counts', 'links')
+
+K_NUMBER, K_VAR_ASSIGN, K_FOR, K_FUNCTION_DEFINITION = KINDS[NumberNode], KINDS[VarAssignNode], KINDS[ForNode], KINDS[FunctionDefinitionNode]
+
+
+##################
+#   VIEWS
+##################
+
+# An attribute of a view that is read from the arrays the first time it is asked for and then kept in
+# the view's __dict__, which python looks in first from then on. Only the nodes a program runs get their
+# attributes, and an engine walking them again (every loop iteration, every call) reads them like a Node's
+class cached:
+    def __init__(self, getter):
+        self.getter = getter
+        self.name = None
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, view, owner=None):
+        if view is None: return self
+        value = view.__dict__[self.name] = self.getter(view)
+        return value
+
+class FlatNode: # A node of a FlatTree, every attribute is read from the arrays when it is first asked for
+    __slots__ = ('tree', 'index')
+
+    def __init__(self, tree, index):
+        self.tree = tree
+        self.index = index
+
+    @cached
+    def pos_start(self):
+        return self.tree.position(self.tree.starts[self.index])
+
+    @cached
+    def pos_end(self):
+        return self.tree.position(self.tree.ends[self.index])
+
+    @cached
+    def numeric(self):
+        return bool(self.tree.flags[self.index] & NUMERIC)
+
+    def __repr__(self):
+        return f'<flat {type(self).__name__} {self.index}>'
+
+def link(n): # The node at link n
+    return cached(lambda self: self.tree.node(self.tree.links[self.tree.firsts[self.index] + n]))
+
+def link_list(start=0): # The nodes of every link from start on
+    return cached(lambda self: [self.tree.node(link) for link in self.tree.node_links(self.index)[start:]])
+
+def flag(bit):
+    return cached(lambda self: bool(self.tree.flags[self.index] & bit))
+
+def token():
+    return cached(lambda self: self.tree.token_table[self.tree.tokens[self.index]] if self.tree.tokens[self.index] >= 0 else None)
+
+def slot():
+    return cached(lambda self: None if self.tree.slots[self.index] < 0 else self.tree.slots[self.index])
+
+def if_cases(self):
+    links = self.tree.node_links(self.index)
+    return [(self.tree.node(links[i]), self.tree.node(links[i + 1]), bool(links[i + 2])) for i in range(0, len(links) // 3 * 3, 3)]
+
+def if_else_case(self):
+    links = self.tree.node_links(self.index)
+    return (self.tree.node(links[-2]), bool(links[-1])) if len(links) % 3 == 2 else None
+
+# A view class that passes for node_type: same name, and isinstance works.
+# node_type is kept for the code that checks type(node) is ..., like Interpreter.unboxed through NODE_CLASSES
+def view(node_type, **attributes):
+    view_type = type(node_type.__name__, (FlatNode, node_type),
+                     {'__slots__': (), '__module__': __name__, 'node_type': node_type, **attributes})
+    NODE_CLASSES[view_type] = node_type
+    return view_type
+
+VIEW_TYPES = [
+    view(NumberNode, tok=token(), value=cached(lambda self: self.tree.value(self.index))),
+    view(StringNode, tok=token(), value=cached(lambda self: self.tree.value(self.index))),
+    view(BinaryOperatorNode, left_node=link(0), op_tok=token(), right_node=link(1)),
+    view(UnaryOpNode, op_tok=token(), node=link(0)),
+    view(VarAccessNode, var_name_tok=token(), slot=slot()),
+    view(VarAssignNode, var_name_tok=token(), value_node=link(0), slot=slot()),
+    view(ForNode, var_name_tok=token(), start_value_node=link(0), end_value_node=link(1), step_value_node=link(2),
+         iterable_node=link(3), body_node=link(4), return_null=flag(RETURN_NULL), slot=slot()),
+    view(WhileNode, condition_node=link(0), body_node=link(1), return_null=flag(RETURN_NULL)),
+    view(UntilNode, condition_node=link(0), body_node=link(1), return_null=flag(RETURN_NULL)),
+    view(IfNode, cases=cached(if_cases), else_case=cached(if_else_case)),
+    view(FunctionDefinitionNode, var_name_tok=token(), body_node=link(0), auto_return=flag(AUTO_RETURN), slot=slot(),
+         arg_name_toks=cached(lambda self: [self.tree.token_table[tok] for tok in self.tree.node_links(self.index)[1:]]),
+         scope=cached(lambda self: self.tree.scopes.get(self.index))),
+    view(CallNode, node_to_call=link(0), arg_nodes=link_list(1), tail_call=flag(TAIL_CALL)),
+    view(ListNode, element_nodes=link_list()),
+    view(ReturnNode, node_to_return=link(0)),
+    view(ContinueNode),
+    view(BreakNode),
+]
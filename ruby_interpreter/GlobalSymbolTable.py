@@ -20,3 +20,8 @@ global_symbol_table.set("POP", BuiltInFunction.pop)
 global_symbol_table.set("EXTEND", BuiltInFunction.extend)
 global_symbol_table.set("LEN", BuiltInFunction.len)
 global_symbol_table.set("RUN", BuiltInFunction.run)
+global_symbol_table.set("REQUIRE", BuiltInFunction.require)
+global_symbol_table.set("RUN_CACHE_STATS", BuiltInFunction.run_cache_stats)
+global_symbol_table.set("RUN_CACHE_CLEAR", BuiltInFunction.run_cache_clear)
+global_symbol_table.set("MEMO", BuiltInFunction.memo)
+global_symbol_table.set("MEMO_STATS", BuiltInFunction.memo_stats)
@@ -1,9 +1,11 @@
-from RTEResult import RTEResult
+from RTEResult import *
 from Errors import RunTimeError
 from Token import *
+from Nodes import *
 from Context import Context
 from SymbolTable import SymbolTable
 from Value import *
+import operator
     
 
 
@@ -11,7 +13,134 @@ from Value import *
 #   Interpreter
 ###################
 
+# Raised by Interpreter.unboxed when a numeric node has to go through the normal Value path instead
+class Deopt(Exception): pass
+
+DEOPT = Deopt()
+
+# Raw python versions of the Number methods, for nodes with numeric set
+UNBOXED_ARITHMETIC = {TT_ADD: operator.add, TT_SUBTRACT: operator.sub, TT_MULTIPLY: operator.mul, TT_POWER: operator.pow}
+UNBOXED_COMPARISONS = {TT_GREATER_THAN: operator.gt, TT_GREATER_THAN_EQUALS: operator.ge,
+                       TT_LESS_THAN: operator.lt, TT_LESS_THAN_EQUALS: operator.le, TT_EQUALS_TO: operator.eq,
+                       TT_NE: operator.ne}
+
+# A call the Resolver marked as a tail call. visit_CallNode hands it back up to Function.execute,
+# which runs it in its own loop so tail recursion does not grow the python stack
+class TailCall:
+    def __init__(self, function, args, context, pos_start, pos_end):
+        self.function = function
+        self.args = args
+        self.context = context # Context of the caller, which has nothing left to do
+        self.pos_start = pos_start
+        self.pos_end = pos_end
+
+#####################
+#   TYPE FEEDBACK
+#####################
+
+# BinaryOperatorNodes the numeric fast path does not cover (e.g. fib(n - 1) + fib(n - 2)) and CallNodes
+# watch what they run on. A site that saw the same operand types, or the same function, QUICKEN_AFTER
+# times in a row is quickened: it gets a handler specialized to them, behind a guard that checks them
+# again on every run. A failed guard sends the site back to watching, and after MAX_DEOPTS failures,
+# or when there is no handler for what it saw, the site stays generic and stops watching.
+
+QUICKEN_AFTER = 8
+MAX_DEOPTS = 4
+
+class Site: # Kept on the node as node.site
+    def __init__(self):
+        self.key = None         # Operand types of a BinaryOperatorNode, body node of the function of a CallNode
+        self.count = 0          # Runs in a row that saw key
+        self.handler = None     # Set once the site is quickened
+        self.deopts = 0
+        self.generic = False
+
+class Quickening: # Counts of every site in the process, to see how much of a program got quickened
+    def __init__(self):
+        self.sites = 0      # Sites that started watching
+        self.quickened = 0  # Times a site got a handler
+        self.deopts = 0     # Guards that failed
+        self.generic = 0    # Sites that gave up
+
+    def stats(self):
+        return {'sites': self.sites, 'quickened': self.quickened, 'deopts': self.deopts, 'generic': self.generic}
+
+    def clear(self):
+        self.sites = self.quickened = self.deopts = self.generic = 0
+
+quickening = Quickening()
+
+def new_site(node):
+    quickening.sites += 1
+    node.site = Site()
+    return node.site
+
+def observe(site, key, handler): # One generic run of a site that is still watching
+    if handler is None:
+        site.generic = True
+        quickening.generic += 1
+    elif key == site.key:
+        site.count += 1
+        if site.count >= QUICKEN_AFTER:
+            site.handler = handler
+            quickening.quickened += 1
+    else:
+        site.key = key
+        site.count = 1
+
+def deopt(site): # The guard of a quickened site failed
+    site.handler = site.key = None
+    site.count = 0
+    site.deopts += 1
+    quickening.deopts += 1
+    if site.deopts >= MAX_DEOPTS:
+        site.generic = True
+        quickening.generic += 1
+
+# Handlers of quickened BinaryOperatorNodes, by (operator, left type, right type).
+# They make the same Value the Value methods would, or return None to leave it to them (e.g. an error)
+def number_arithmetic(op):
+    return lambda left, right: make_number(op(left.value, right.value))
+
+def number_comparison(op):
+    return lambda left, right: Number.true if op(left.value, right.value) else Number.false
+
+def number_division(left, right):
+    if right.value == 0: return None # Divison by zero error
+    return make_number(left.value / right.value)
+
+def string_concatenation(left, right):
+    return String(left.value + right.value)
+
+def string_repetition(left, right):
+    return String(left.value * right.value)
+
+def list_index(left, right):
+    try:
+        return left.elements[right.value]
+    except Exception: # Out of bounds error
+        return None
+
+BINARY_HANDLERS = {(TT_DIVIDE, Number, Number): number_division,
+                   (TT_ADD, String, String): string_concatenation,
+                   (TT_MULTIPLY, String, Number): string_repetition,
+                   (TT_DIVIDE, List, Number): list_index}
+BINARY_HANDLERS.update({(op_type, Number, Number): number_arithmetic(op) for op_type, op in UNBOXED_ARITHMETIC.items()})
+BINARY_HANDLERS.update({(op_type, Number, Number): number_comparison(op) for op_type, op in UNBOXED_COMPARISONS.items()})
+
 class Interpreter:
+    quicken = True # False runs every BinaryOperatorNode and CallNode the generic way, to compare
+
+    # Every visit_* method returns the node's Value directly.
+    # Errors, RETURN, BREAK and CONTINUE are raised as signals (see RTEResult.py)
+    def run(self, node, context): # Runs a program, returns a RTEResult for main.run
+        try:
+            return RTEResult().success(self.visit(node, context))
+        except ErrorSignal as signal:
+            return RTEResult().failure(signal.error)
+        except (ReturnSignal, BreakSignal, ContinueSignal):
+            return RTEResult().success(None)
+
     def visit(self, node, context):
         method_name = f'visit_{type(node).__name__}' # method name is set as the type of name]
         method = getattr(self, method_name, self.no_visit_method)
@@ -20,283 +149,350 @@ class Interpreter:
     def no_visit_method(self,node, context):
         raise Exception(f'No visit_{type(node).__name__} method defined')
     
+    # Numbers, Strings and functions are never changed once made, so constants, variables and
+    # call results are handed out as they are instead of copied for every use. Errors take
+    # their position from the node that failed and their context from the one running it
     def visit_NumberNode(self,node, context):
-        return RTEResult().success(
-            Number(node.tok.value).set_context(context).set_pos(node.pos_start, node.pos_end))
+        if node.value: return node.value # Built once by the Optimizer
+        return make_number(node.tok.value)
     
     def visit_StringNode(self,node, context):
-        return RTEResult().success(
-            String(node.tok.value).set_context(context).set_pos(node.pos_start, node.pos_end))
+        if node.value: return node.value
+        return string_literal(node.tok.value)
+
+    # This code is a bit weird, but it makes it cleaner; basically lamda function is used
+    # to map token types to corresposonding binary_operator methods
+    # Example: if token type is ADD, do left.added_to(right), a and b are variables for left and right
+    binary_nodes = {TT_ADD: lambda a, b: a.added_to(b),
+                    TT_SUBTRACT: lambda a, b: a.subbed_by(b),
+                    TT_MULTIPLY: lambda a, b: a.multiply_by(b),
+                    TT_DIVIDE: lambda a, b: a.divide_by(b),
+                    TT_POWER: lambda a, b: a.power_by(b),
+
+                    TT_GREATER_THAN: lambda a, b: a.greater_than(b),
+                    TT_GREATER_THAN_EQUALS: lambda a,b: a.greater_than_eq(b),
+                    TT_LESS_THAN: lambda a,b: a.less_than(b),
+                    TT_LESS_THAN_EQUALS: lambda a, b: a.less_than_eq(b),
+                    TT_EQUALS_TO: lambda a, b: a.equal_to(b),
+                    TT_NE: lambda a, b: a.not_equal_to(b),
+                    } # AND and OR do not evaluate both operands, see logic_operation
+
+    # Numeric fast path: a numeric node is computed on raw python numbers and only boxed into one
+    # Number at the end, instead of building a Number for every operand and operation.
+    # Numeric nodes have no side effects, so when anything is not a plain int/float or would be an
+    # error, DEOPT is raised and the node is simply evaluated again the normal way, which builds
+    # the exact same errors.
+    def unboxed(self, node, context):
+        node_type = NODE_CLASSES[type(node)]
+
+        if node_type is VarAccessNode:
+            if node.slot is None:
+                value = context.symbol_table.get(node.var_name_tok.value)
+            else:
+                value = context.symbol_table.load(node.slot, node.var_name_tok.value)
+            if type(value) is not Number: raise DEOPT
+            number = value.value
+            if type(number) is not int and type(number) is not float: raise DEOPT
+            return number
+
+        if node_type is NumberNode:
+            return node.tok.value
+
+        if node_type is BinaryOperatorNode:
+            # A chain like a + b + c + ... nests to the left as deep as it is long, so its left spine is
+            # walked in a loop and only the right operands recurse
+            links = [node]
+            node = node.left_node
+            while NODE_CLASSES[type(node)] is BinaryOperatorNode:
+                links.append(node)
+                node = node.left_node
+            left = self.unboxed(node, context)
+            if len(links) > 1: links.reverse()
+
+            for node in links:
+                op_type = node.op_tok.type
+                if op_type == TT_KEYWORD: # AND, OR
+                    if (left != 0) == (node.op_tok.keyword == KW_OR): left = 1 if left != 0 else 0
+                    else: left = 1 if self.unboxed(node.right_node, context) != 0 else 0
+                    continue
+
+                right = self.unboxed(node.right_node, context)
+
+                if op_type in UNBOXED_COMPARISONS:
+                    left = int(UNBOXED_COMPARISONS[op_type](left, right))
+                elif op_type == TT_DIVIDE:
+                    if right == 0: raise DEOPT # Divison by zero error
+                    left = left / right
+                else:
+                    try:
+                        left = UNBOXED_ARITHMETIC[op_type](left, right)
+                    except ArithmeticError:
+                        raise DEOPT
+            return left
+
+        if node_type is UnaryOpNode:
+            number = self.unboxed(node.node, context)
+            if node.op_tok.type == TT_SUBTRACT: return number * -1
+            if node.op_tok.type == TT_ADD: return number
+            return 1 if number == 0 else 0
+
+        raise DEOPT
+
+    def is_true(self, node, context): # Evaluates a condition, numeric ones without building a Number
+        if node.numeric:
+            try:
+                return self.unboxed(node, context) != 0
+            except Deopt:
+                pass
+        return self.visit(node, context).is_true()
 
     def visit_BinaryOperatorNode(self,node, context):
+        if node.numeric:
+            try:
+                return make_number(self.unboxed(node, context))
+            except Deopt:
+                pass
+        if node.op_tok.type == TT_KEYWORD: return self.logic_operation(node, context)
+
         # after finding binary operator, needs to find left number node and right number node
-        res = RTEResult()
+        left = self.visit(node.left_node, context) # get left node
+        right = self.visit(node.right_node, context) # get right node
+        return self.binary_operation(node, left, right, context)
+
+    def binary_operation(self, node, left, right, context): # The value of a BinaryOperatorNode from its operand values
+        site = node.site
+        if self.quicken and (site is None or not site.generic):
+            if site is None: site = new_site(node)
+            if site.handler is not None:
+                if type(left) is site.key[0] and type(right) is site.key[1]:
+                    result = site.handler(left, right)
+                    if result is not None: return result
+                else:
+                    deopt(site)
+            else:
+                key = (type(left), type(right))
+                observe(site, key, BINARY_HANDLERS.get((node.op_tok.type, *key)))
 
-        left = res.register(self.visit(node.left_node, context)) # get left node
-        if res.should_return(): return res
-        
-        right = res.register(self.visit(node.right_node, context)) # get right node
-        if res.should_return(): return res
-        
         #Check binary node
-        # This code is a bit weird, but it makes it cleaner; basically lamda function is used
-        # to map token types to corresposonding binary_operator methods
-        # Example: if token type is ADD, do left.added_to(right), a and b are variables for left and right
-        binary_nodes = {TT_ADD: lambda a, b: a.added_to(b),
-                        TT_SUBTRACT: lambda a, b: a.subbed_by(b),
-                        TT_MULTIPLY: lambda a, b: a.multiply_by(b),
-                        TT_DIVIDE: lambda a, b: a.divide_by(b),
-                        TT_POWER: lambda a, b: a.power_by(b),
-
-                        TT_GREATER_THAN: lambda a, b: a.greater_than(b),
-                        TT_GREATER_THAN_EQUALS: lambda a,b: a.greater_than_eq(b),
-                        TT_LESS_THAN: lambda a,b: a.less_than(b),
-                        TT_LESS_THAN_EQUALS: lambda a, b: a.less_than_eq(b),
-                        TT_EQUALS_TO: lambda a, b: a.equal_to(b),
-                        (TT_KEYWORD, 'AND'): lambda a, b: a.anded(b),
-                        (TT_KEYWORD, 'OR'):lambda a, b: a.ored(b)
-                        }
-
-        if (node.op_tok.type or (node.op_tok.type, node.op_tok.value)) in binary_nodes:
-            result, error = binary_nodes[node.op_tok.type](left, right)
-        if error:
-            return res.failure(error)
-        return res.success(result.set_pos(node.pos_start, node.pos_end))
+        result, error = self.binary_nodes[node.op_tok.type](left, right)
+        if error: raise ErrorSignal(error.at_node(node, context))
+        return result
+
+    # AND and OR are TRUE or FALSE by the truth of their operands, like the conditions of IF and WHILE.
+    # The right operand is only evaluated when the left one does not decide the result
+    def logic_operation(self, node, context):
+        left = self.is_true(node.left_node, context)
+        if left == (node.op_tok.keyword == KW_OR): return Number.true if left else Number.false
+        return Number.true if self.is_true(node.right_node, context) else Number.false
 
     def visit_UnaryOpNode(self,node, context):
-        res = RTEResult()
-        number = res.register(self.visit(node.node, context))
-        if res.should_return(): return res
+        if node.numeric:
+            try:
+                return make_number(self.unboxed(node, context))
+            except Deopt:
+                pass
 
-        error = None
+        return self.unary_operation(node, self.visit(node.node, context), context)
 
+    def unary_operation(self, node, number, context): # The value of a UnaryOpNode from its operand value
         if node.op_tok.type == TT_SUBTRACT:
-            number, error = number.multiply_by(Number(-1))
-        if node.op_tok.matches(TT_KEYWORD, 'NOT'):
-            number, error = number.notted()
-        
-        if error:
-            return res.failure(error)
-        return res.success(number.set_pos(node.pos_start, node.pos_end))
+            result, error = number.multiply_by(make_number(-1))
+            if error: raise ErrorSignal(error.at_node(node, context))
+            return result
+        if node.op_tok.keyword == KW_NOT:
+            return number.notted()[0]
+        return number
     
     def visit_VarAccessNode(self,node,context):
-        res = RTEResult()
         var_name = node.var_name_tok.value
-        value = context.symbol_table.get(var_name)
+        if node.slot is None:
+            value = context.symbol_table.get(var_name)
+        else:
+            value = context.symbol_table.load(node.slot, var_name) # Indexed read from the function's Frame
 
         if not value:
-            return res.failure(RunTimeError(
+            raise ErrorSignal(RunTimeError(
                 node.pos_start, node.pos_end,
                 f"'{var_name}' is not defined",
                 context
             ))
         
-        value = value.copy().set_pos(node.pos_start, node.pos_end).set_context(context)
-        return res.success(value)
+        return value
     
     def visit_VarAssignNode(self, node, context):
-        res = RTEResult()
         var_name = node.var_name_tok.value
-        value = res.register(self.visit(node.value_node, context)) # Get the variable value
-        if res.should_return(): return res
+        value = self.visit(node.value_node, context) # Get the variable value
 
-        context.symbol_table.set(var_name,value) # This sets a new symbol or variable within the symbol_table dictionary
-        return res.success(value)
+        if node.slot is None:
+            context.symbol_table.set(var_name,value) # This sets a new symbol or variable within the symbol_table dictionary
+        else:
+            context.symbol_table.store(node.slot, var_name, value)
+        return value
+
+    # Evaluates a node whose value is thrown away (block bodies, statements of a function without auto return)
+    # Statement lists and loops then stream through their statements without collecting any values
+    def visit_void(self, node, context):
+        if isinstance(node, ListNode):
+            for element_node in node.element_nodes:
+                self.visit_void(element_node, context)
+        elif isinstance(node, (ForNode, WhileNode, UntilNode)):
+            getattr(self, f'visit_{type(node).__name__}')(node, context, void=True)
+        else:
+            self.visit(node, context)
 
     def visit_IfNode(self, node, context):
-        res = RTEResult()
-
         for condition, expr, return_null in node.cases:
-            condition_value = res.register(self.visit(condition, context))
-            if res.should_return(): return res
-
-            if condition_value.is_true():
-                expr_value = res.register(self.visit(expr, context))
-                if res.should_return(): return res
+            if self.is_true(condition, context):
                 if return_null:
-                    return res.success(Number.null)
-                return res.success(expr_value)
+                    self.visit_void(expr, context)
+                    return Number.null
+                return self.visit(expr, context)
             
 
         if node.else_case:
             expr, return_null = node.else_case
-            else_value = res.register(self.visit(expr, context))
-            if res.should_return(): return res
-            if return_null: return res.success(Number.null)
-            return res.success(else_value)
+            if return_null:
+                self.visit_void(expr, context)
+                return Number.null
+            return self.visit(expr, context)
         
-        return res.success(Number.null)
+        return Number.null
     
-    def visit_ForNode(self, node, context):
-        res = RTEResult()
+    def visit_ForNode(self, node, context, void=False):
+        collect = not (node.return_null or void) # Only an expression loop whose value is used builds a List
+        body = self.visit if collect else self.visit_void
         elements = []
 
         if node.start_value_node and node.end_value_node:
-            start_value = res.register(self.visit(node.start_value_node, context))
-            if res.should_return(): return res
-
-            end_value = res.register(self.visit(node.end_value_node, context))
-            if res.should_return(): return res
+            start_value = self.visit(node.start_value_node, context)
+            end_value = self.visit(node.end_value_node, context)
             
             if node.step_value_node:
-                step_value = res.register(self.visit(node.step_value_node, context))
-                if res.should_return(): return res
+                step_value = self.visit(node.step_value_node, context)
             else:
-                step_value = Number(1)
+                step_value = make_number(1)
 
-            i = start_value.value
+            # The counter stays a raw python number, only the loop variable is boxed each pass
+            i, end, step = start_value.value, end_value.value, step_value.value
+            ascending = step >= 0
 
-            if step_value.value >= 0:
-                condition = lambda: i < end_value.value
+            while (i < end) if ascending else (i > end):
+                context.symbol_table.store(node.slot, node.var_name_tok.value, make_number(i))
+                i += step
 
-            else:
-                condition = lambda: i > end_value.value
-
-            while condition():
-                context.symbol_table.set(node.var_name_tok.value, Number(i))
-                i += step_value.value
-
-                value = res.register(self.visit(node.body_node, context))
-                if res.should_return() and not res.loop_continue and not res.break_loop:
-                    return res
-
-                if res.loop_continue:
+                try:
+                    value = body(node.body_node, context)
+                except ContinueSignal:
                     continue
-                if res.break_loop:
+                except BreakSignal:
                     break
-                elements.append(value)
+                if collect: elements.append(value)
             
         elif node.iterable_node:
-            iterable_value = res.register(self.visit(node.iterable_node, context))
+            iterable_value = self.visit(node.iterable_node, context)
 
             for item in iterable_value.elements:
-                context.symbol_table.set(node.var_name_tok.value, item)
-                value = res.register(self.visit(node.body_node, context))
-                if res.should_return() and not res.loop_continue and not res.break_loop:
-                    return res
-                if res.loop_continue:
+                context.symbol_table.store(node.slot, node.var_name_tok.value, item)
+                try:
+                    value = body(node.body_node, context)
+                except ContinueSignal:
                     continue
-                if res.break_loop:
+                except BreakSignal:
                     break
-                elements.append(value)
-
-        if node.return_null: return res.success(Number.null)
-
-        return res.success(List(elements).set_context(context).set_pos(node.pos_start, node.pos_end))
+                if collect: elements.append(value)
 
-    def visit_WhileNode(self, node,context):
-        res = RTEResult()
-        elements = []
-
-        while True:
-            condition = res.register(self.visit(node.condition_node, context))
-            if res.should_return(): return res
-
-            if not condition.is_true(): break
-
-            value = res.register(self.visit(node.body_node,context))
-            if res.should_return() and not res.loop_continue and not res.break_loop:
-                return res
-            
-            if res.loop_continue:
-                continue
-            if res.break_loop:
-                break
+        if not collect: return Number.null
 
-            elements.append(value)
+        return List(elements)
 
-        
-        if node.return_null: return res.success(Number.null)
-        return res.success(
-            List(elements).set_context(context).set_pos(node.pos_start, node.pos_end)
-            )
+    def visit_WhileNode(self, node, context, void=False):
+        return self.conditional_loop(node, context, False, void)
     
-    def visit_UntilNode(self, node,context):
-        res = RTEResult()
+    def visit_UntilNode(self, node, context, void=False):
+        return self.conditional_loop(node, context, True, void) # The until node is just a NOT while loop. 
+
+    def conditional_loop(self, node, context, until, void):
+        collect = not (node.return_null or void)
+        body = self.visit if collect else self.visit_void
         elements = []
 
         while True:
-            condition = res.register(self.visit(node.condition_node, context))
-            if res.should_return(): return res
-
-            if condition.is_true(): break # The until node is just a NOT while loop. 
+            if self.is_true(node.condition_node, context) == until: break
 
-            value = res.register(self.visit(node.body_node,context))
-            if res.should_return() and not res.loop_continue and not res.break_loop:
-                return res
-            
-            if res.loop_continue:
+            try:
+                value = body(node.body_node,context)
+            except ContinueSignal:
                 continue
-            if res.break_loop:
+            except BreakSignal:
                 break
 
-            elements.append(value)
+            if collect: elements.append(value)
 
         
-        if node.return_null: return res.success(Number.null)
-        return res.success(
-            List(elements).set_context(context).set_pos(node.pos_start, node.pos_end)
-            )
+        if not collect: return Number.null
+        return List(elements)
     
     def visit_FunctionDefinitionNode(self, node, context):
-        res = RTEResult()
-
         func_name = node.var_name_tok.value if node.var_name_tok else None
 
         body_node =  node.body_node
         arg_names = [arg_names.value for arg_names in node.arg_name_toks] # list of names (Strings) in arg_name_toks
-        func_value = Function(func_name,body_node, arg_names, node.auto_return).set_context(context).set_pos(node.pos_start, node.pos_end)
+        func_value = Function(func_name,body_node, arg_names, node.auto_return, node.scope)
 
         if node.var_name_tok: # If the has a name, we want to add function name with function value
-            context.symbol_table.set(func_name, func_value)
+            context.symbol_table.store(node.slot, func_name, func_value)
 
-        return res.success(func_value)
+        return func_value
 
     def visit_CallNode(self, node, context):
-        res = RTEResult()
-        args = [] # List of arguments being passed into the node when function is called
-
-        value_to_call = res.register(self.visit(node.node_to_call,context))
-        if res.should_return(): return res
-
-        value_to_call = value_to_call.copy().set_pos(node.pos_start,  node.pos_end)
-
-        for arg_node in node.arg_nodes:
-            args.append(res.register(self.visit(arg_node, context)))
-            if res.should_return(): return res
-
-        return_value = res.register(value_to_call.execute(args))
-        if res.should_return(): return res
-        
-        return_value = return_value.copy().set_pos(node.pos_start, node.pos_end).set_context(context)
-
-        return res.success(return_value)
+        site = node.site
+        if self.quicken and (site is None or not site.generic):
+            if site is None: site = new_site(node)
+            function = self.callee(node.node_to_call, context)
+            if site.handler is not None:
+                if type(function) is Function and function.body_node is site.key:
+                    return site.handler(self, node, function, context)
+                deopt(site)
+            elif type(function) is Function and len(function.arg_names) == len(node.arg_nodes):
+                observe(site, function.body_node, Interpreter.call_function)
+            else: # Built-ins, MEMO functions and calls that are an error stay generic
+                observe(site, None, None)
+
+        value_to_call = self.visit(node.node_to_call,context)
+
+        args = [self.visit(arg_node, context) for arg_node in node.arg_nodes] # arguments being passed into the function
+
+        if node.tail_call and type(value_to_call) is Function:
+            return TailCall(value_to_call, args, context, node.pos_start, node.pos_end) # Function.execute runs it without recursing
+
+        return value_to_call.execute(args, context, node.pos_start, node.pos_end)
+
+    def callee(self, node, context): # The function a call names as it is stored, None for anything but a name
+        if not isinstance(node, VarAccessNode): return None
+        if node.slot is None: return context.symbol_table.get(node.var_name_tok.value)
+        return context.symbol_table.load(node.slot, node.var_name_tok.value)
+
+    # Handler of a quickened CallNode: the callee is a Function that takes as many arguments as the call
+    # passes, so it is called without evaluating the node that names it again
+    def call_function(self, node, function, context):
+        args = [self.visit(arg_node, context) for arg_node in node.arg_nodes]
+        if node.tail_call: return TailCall(function, args, context, node.pos_start, node.pos_end)
+        return function.execute(args, context, node.pos_start, node.pos_end)
     
     def visit_ListNode(self, node, context):
-        res = RTEResult()
-        elements = []
-
-        for element_node in node.element_nodes:
-            elements.append(res.register(self.visit(element_node, context)))
-            if res.should_return(): return res
-        
-        return res.success(
-            List(elements).set_context(context).set_pos(node.pos_start, node.pos_end)
-            )
+        elements = [self.visit(element_node, context) for element_node in node.element_nodes]
+        return List(elements)
     
     def visit_ReturnNode(self, node,context):
-        res = RTEResult()
-
         if node.node_to_return: # There may not be a node to return
-            value = res.register(self.visit(node.node_to_return, context))
-            if res.should_return(): return res
+            value = self.visit(node.node_to_return, context)
         else:
             value = Number.null
         
-        return res.success_return(value)
+        raise ReturnSignal(value)
     
     def visit_ContinueNode(self, node,context):
-        return RTEResult().success_continue()
+        raise CONTINUE
 
     def visit_BreakNode(self, node,context):
-        return RTEResult().success_break()
\ No newline at end of file
+        raise BREAK
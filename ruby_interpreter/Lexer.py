@@ -1,6 +1,8 @@
-from Position import Position
+import re
+from Position import Position, Source
 from Token import *
 from Errors import IllegalCharError, ExpectedCharError
+from RTEResult import ErrorSignal
 #############
 #   LEXER   # 
 #############
@@ -11,12 +13,12 @@ class Lexer(object):
     def __init__(self, fn, text):
         self.fn = fn
         self.text = text
-        self.pos = Position(-1,0,-1, fn, text) # position is set to index -1, line 0, column -1
+        self.pos = Position(-1, Source(fn, text)) # position is set to index -1
         self.current_char = self.text[self.pos.idx]
         self.advance() # this makes self.pos = 0 when it's initialized
     
     def advance(self):  # increment pos and reassigns current char  if the position index is less than length of text
-        self.pos.advance(self.current_char)
+        self.pos = self.pos.advance()
         self.current_char = self.text[self.pos.idx] if self.pos.idx < len(self.text) else None
 
 
@@ -113,12 +115,10 @@ class Lexer(object):
             id_str += self.current_char
             self.advance()
         
-        if id_str.upper() in KEYWORDS: # if id_str is in KEYWORDS, it's a keyword, otherwise, it's an identifier
-            tok_type = TT_KEYWORD
-        else:
-            tok_type = TT_IDENTIFIER
+        keyword = KEYWORD_IDS.get(id_str.upper()) # if id_str is in KEYWORDS, it's a keyword, otherwise, it's an identifier
+        tok_type = TT_IDENTIFIER if keyword is None else TT_KEYWORD
         
-        return Token(tok_type, id_str, pos_start, self.pos)
+        return Token(tok_type, id_str, pos_start, self.pos, keyword)
     
     def make_comparison(self, comparison_tokens):
         double_char_tokens = {
@@ -187,4 +187,116 @@ class Lexer(object):
             self.advance()
 
         # Advance after newline
-        self.advance()
\ No newline at end of file
+        self.advance()
+
+
+##################
+#   REGEX LEXER
+##################
+
+# Makes the same tokens as Lexer with one compiled regex: every token kind is a named group
+# of a single alternation, values are slices of the text and each token gets one Position
+# made from the match offset instead of one advanced per character.
+#
+# The Lexer quirks are kept: a token made from an end position starts there too, a comment
+# swallows its newline, escapes are kept as typed, and the first line is line 1 when the text
+# ends with a newline. Anything that is an error for the Lexer (an illegal character, '!' or
+# a run like '=>') is handed to the Lexer itself, so the errors are the same as well.
+# Only a comment on the last line without a newline differs: the Lexer never returns on it.
+
+TOKEN_REGEX = re.compile(r'''[ \t]*(?:
+    (?P<IDENTIFIER>[A-Za-z][A-Za-z0-9_]*)
+  | (?P<NUMBER>[0-9]+(?:\.[0-9]*)?)
+  | (?P<SINGLE>[+/*()\[\]^,])
+  | (?P<NEWLINE>[;\n])
+  | (?P<COMPARISON>[!=<>]+)
+  | (?P<MINUS>->?)
+  | (?P<STRING>"[^"]*"?)
+  | (?P<COMMENT>\#[^\n]*\n?)
+  | (?P<END>\Z)
+)''', re.VERBOSE) # Spaces and tabs before a token are part of its match
+
+REGEX_SINGLE_TOKENS = {
+    '+': TT_ADD, '/': TT_DIVIDE, '*': TT_MULTIPLY, '(': TT_LPAREN, ')': TT_RPAREN,
+    '[': TT_LSQUARE, ']': TT_RSQUARE, '^': TT_POWER, ',': TT_COMMA
+}
+
+REGEX_COMPARISON_TOKENS = {
+    '!=': TT_NE, '==': TT_EQUALS_TO, '>=': TT_GREATER_THAN_EQUALS, '<=': TT_LESS_THAN_EQUALS,
+    '=': TT_EQ, '>': TT_GREATER_THAN, '<': TT_LESS_THAN
+}
+
+class RegexLexer(object):
+    def __init__(self, fn, text):
+        self.fn = fn
+        self.text = text
+
+    def make_tokens(self):
+        try:
+            return list(self.generate_tokens()), None
+        except ErrorSignal as signal:
+            return [], signal.error
+
+    # Yields the tokens one at a time, so the Parser can start before the whole text is lexed.
+    # An error is raised as an ErrorSignal when the lexing gets to it
+    def generate_tokens(self):
+        fn, text = self.fn, self.text
+        source = Source(fn, text)
+        count = 0       # Tokens yielded so far
+        idx = 0
+
+        def token(tok_type, value, at, keyword=None): # Start and end both at index at, like Token(..., pos_end=pos)
+            tok = Token(tok_type, value, keyword=keyword)
+            tok.pos_start = tok.pos_end = Position(at, source)
+            return tok
+
+        for match in TOKEN_REGEX.finditer(text):
+            if match.start() != idx: break # A character no token starts with
+            kind = match.lastgroup
+            start, idx = match.span(kind)
+
+            if kind == 'IDENTIFIER':
+                id_str = text[start:idx]
+                keyword = KEYWORD_IDS.get(id_str.upper())
+                tok = token(TT_IDENTIFIER if keyword is None else TT_KEYWORD, id_str, idx, keyword)
+            elif kind == 'NUMBER':
+                num_str = text[start:idx]
+                tok = token(TT_FLOAT, float(num_str), idx) if '.' in num_str else token(TT_INT, int(num_str), idx)
+            elif kind == 'SINGLE':
+                tok = token(REGEX_SINGLE_TOKENS[text[start]], None, start)
+            elif kind == 'NEWLINE':
+                tok = token(TT_NEWLINE, None, start)
+            elif kind == 'COMPARISON':
+                comparison_str = text[start:idx]
+                tok_type = REGEX_COMPARISON_TOKENS.get(comparison_str)
+                if tok_type is None: # '!' or a run like '=>', which the Lexer fails on
+                    idx = start
+                    break
+                tok = token(tok_type, comparison_str, idx)
+            elif kind == 'MINUS':
+                tok = token(TT_ARROW if idx - start == 2 else TT_SUBTRACT, None, idx)
+            elif kind == 'STRING':
+                if text[idx - 1] != '"' or idx - start == 1: # No closing quote, the Lexer steps past the end
+                    yield token(TT_STRING, text[start + 1:idx], idx + 1)
+                    count += 1
+                    idx += 1
+                    break
+                tok = token(TT_STRING, text[start + 1:idx - 1], idx)
+            elif kind == 'COMMENT':
+                continue
+            else: # END
+                break
+
+            yield tok
+            count += 1
+
+        if idx < len(text): # The Lexer reports the error, and makes the same tokens up to it
+            tokens, error = Lexer(fn, text).make_tokens()
+            if error: raise ErrorSignal(error)
+            yield from tokens[count:]
+            return
+
+        yield Token(TT_EOF, pos_start=Position(idx, source))
+
+
+LEXERS = {'char': Lexer, 'regex': RegexLexer}
@@ -0,0 +1,40 @@
+import os
+
+##################
+#   MODULE CACHE
+##################
+
+# What REQUIRE keeps of every script it ran in this process: the names the script bound at its top level.
+# Requiring the script again binds those same values again instead of running it, until the file's
+# mtime or size changes. A module runs once, like a python import, so a list it made is shared by
+# every REQUIRE of it.
+
+class ModuleCache:
+    def __init__(self):
+        self.modules = {} # Absolute path -> (mtime_ns, size, top level names -> Value)
+        self.hits = 0
+        self.loads = 0
+
+    def stamp(self, file_path): # What tells a changed file apart, None for a file that can not be read
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def get(self, file_path): # The names of the module, None when it has to be run (again)
+        module = self.modules.get(file_path)
+        if module is None or module[:2] != self.stamp(file_path): return None
+        self.hits += 1
+        return module[2]
+
+    def set(self, file_path, stamp, symbols): # stamp is from before the module ran, so a change while it ran is seen
+        self.loads += 1
+        if stamp is not None: self.modules[file_path] = (*stamp, symbols)
+
+    def clear(self):
+        self.modules.clear()
+        self.hits = self.loads = 0
+
+
+module_cache = ModuleCache()
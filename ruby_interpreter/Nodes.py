@@ -1,15 +1,27 @@
+from Token import *
+
 ##################
 # NODES
 #################
-class Node(): pass
+class Node():
+    numeric = False # True when the node only does arithmetic on numbers and variables, see Interpreter.unboxed
+    site = None     # Type feedback of a BinaryOperatorNode or CallNode, see Interpreter.Site
+
+# Operators the Interpreter can run on raw python numbers. AND and OR are keywords, so they go by Token.keyword
+NUMERIC_OPERATORS = {TT_ADD, TT_SUBTRACT, TT_MULTIPLY, TT_DIVIDE, TT_POWER,
+                     TT_GREATER_THAN, TT_GREATER_THAN_EQUALS, TT_LESS_THAN, TT_LESS_THAN_EQUALS, TT_EQUALS_TO, TT_NE}
+LOGIC_KEYWORDS = {KW_AND, KW_OR}
 
 
 
 # Node for number tokens
 # Just turns a number token into a Node
 class NumberNode(Node):
+    numeric = True
+
     def __init__(self,tok):
         self.tok = tok
+        self.value = None                   # Prebuilt Number from the Optimizer
 
         self.pos_start = self.tok.pos_start
         self.pos_end = self.tok.pos_end
@@ -25,6 +37,9 @@ class BinaryOperatorNode(Node):
         self.op_tok = op_tok
         self.right_node = right_node
 
+        self.numeric = (op_tok.type in NUMERIC_OPERATORS or op_tok.keyword in LOGIC_KEYWORDS) \
+            and left_node.numeric and right_node.numeric
+
         self.pos_start = self.left_node.pos_start
         self.pos_end = self.right_node.pos_end
     
@@ -37,6 +52,7 @@ class UnaryOpNode(Node):
     def __init__(self, op_tok, node):
         self.op_tok = op_tok
         self.node = node
+        self.numeric = node.numeric and (op_tok.type in (TT_ADD, TT_SUBTRACT) or op_tok.keyword == KW_NOT)
 
         self.pos_start = self.op_tok.pos_start
         self.pos_end = node.pos_end
@@ -47,8 +63,11 @@ class UnaryOpNode(Node):
 
 # VARIABLES
 class VarAccessNode(Node):
+    numeric = True
+
     def __init__(self, var_name_tok):
         self.var_name_tok = var_name_tok
+        self.slot = None                    # Frame slot from the Resolver, None for a lookup by name
 
         self.pos_start = self.var_name_tok.pos_start
         self.pos_end = self.var_name_tok.pos_end
@@ -57,6 +76,7 @@ class VarAssignNode(Node):
     def __init__(self,var_name_tok, value_node):
         self.var_name_tok = var_name_tok
         self.value_node = value_node
+        self.slot = None                    # Frame slot from the Resolver, None for a lookup by name
     
         self.pos_start = self.var_name_tok.pos_start
         self.pos_end = value_node.pos_end
@@ -67,7 +87,7 @@ class VarAssignNode(Node):
 
 # Conditional Nodes
 class ForNode(Node):
-    def __init__(self, var_name_tok, start_value_node, end_value_node, step_value_node, body_node, return_null, iterable_node):
+    def __init__(self, var_name_tok, start_value_node, end_value_node, step_value_node, body_node, return_null, iterable_node=None):
         self.var_name_tok = var_name_tok
         self.start_value_node = start_value_node
         self.end_value_node = end_value_node
@@ -75,6 +95,7 @@ class ForNode(Node):
         self.body_node = body_node
         self.return_null = return_null
         self.iterable_node = iterable_node
+        self.slot = None                    # Frame slot of the loop variable
 
         self.pos_start = self.var_name_tok.pos_start
         self.pos_end = self.body_node.pos_end
@@ -115,6 +136,8 @@ class FunctionDefinitionNode(Node):
         self.arg_name_toks = arg_name_toks  # List of arguments
         self.body_node = boy_node           # Body Node
         self.auto_return = auto_return
+        self.slot = None                    # Frame slot of the function name
+        self.scope = None                   # Names bound by the function -> Frame slot, set by the Resolver
 
         if self.var_name_tok:                   #If the function has a name, set position at function name
             self.pos_start = self.var_name_tok.pos_start
@@ -129,6 +152,7 @@ class CallNode(Node):
     def __init__(self, node_to_call, arg_nodes): # Takes in function and then list of arguments
         self.node_to_call = node_to_call
         self.arg_nodes = arg_nodes
+        self.tail_call = False # Set by the Resolver when the function returns the call's value as is
 
         self.pos_start = self.node_to_call.pos_start
         
@@ -140,6 +164,7 @@ class CallNode(Node):
 class StringNode(Node):
     def __init__(self,tok):
         self.tok = tok
+        self.value = None                   # Prebuilt String from the Optimizer
 
         self.pos_start = self.tok.pos_start
         self.pos_end = self.tok.pos_end
@@ -169,4 +194,50 @@ class ContinueNode(Node):
 class BreakNode(Node):
     def __init__(self, pos_start, pos_end):
         self.pos_start = pos_start
-        self.pos_end = pos_end
\ No newline at end of file
+        self.pos_end = pos_end
+
+
+# The Nodes class of every node class. A FlatAST view adds itself with the class it stands for,
+# so code that goes by type(node) looks it up here and takes the same path for both
+NODE_CLASSES = {node_class: node_class for node_class in Node.__subclasses__()}
+
+# Child nodes in evaluation order, used by the passes that walk the whole tree
+def children(node):
+    if isinstance(node, BinaryOperatorNode):
+        return [node.left_node, node.right_node]
+    if isinstance(node, UnaryOpNode):
+        return [node.node]
+    if isinstance(node, VarAssignNode):
+        return [node.value_node]
+    if isinstance(node, ForNode):
+        return [child for child in (node.start_value_node, node.end_value_node, node.step_value_node,
+                                    node.iterable_node, node.body_node) if child]
+    if isinstance(node, (WhileNode, UntilNode)):
+        return [node.condition_node, node.body_node]
+    if isinstance(node, IfNode):
+        children = [child for case in node.cases for child in case[:2]]
+        if node.else_case: children.append(node.else_case[0])
+        return children
+    if isinstance(node, FunctionDefinitionNode):
+        return [node.body_node]
+    if isinstance(node, CallNode):
+        return [node.node_to_call] + node.arg_nodes
+    if isinstance(node, ListNode):
+        return node.element_nodes
+    if isinstance(node, ReturnNode) and node.node_to_return:
+        return [node.node_to_return]
+    return []
+
+# Names a function body binds: assignments, FOR variables and named inner functions, not the names
+# the inner functions bind themselves. Walks with its own stack, like the tree can nest
+def bound_names(node):
+    names, stack = [], [node]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, FunctionDefinitionNode):
+            if node.var_name_tok: names.append(node.var_name_tok.value)
+            continue
+        if isinstance(node, (VarAssignNode, ForNode)):
+            names.append(node.var_name_tok.value)
+        stack.extend(reversed(children(node)))
+    return names
@@ -0,0 +1,296 @@
+import sys
+from Token import *
+from Nodes import *
+from Value import *
+from Compiler import BINARY_METHODS
+
+##################
+#   OPTIMIZER
+##################
+
+# Rewrites the AST between Parser.parse and execution:
+#   - constant arithmetic and comparisons are folded into a single NumberNode/StringNode
+#   - IfNode cases with a constant condition are pruned, statements after RETURN/BREAK/CONTINUE are dropped
+#   - NumberNode/StringNode literals get a prebuilt Value that the Interpreter copies instead of rebuilding
+#
+# Folding uses the Value methods themselves, so a folded result is exactly what the Interpreter
+# would have computed. Anything that would fail (division by zero, illegal operations) is left
+# alone so the error still happens at runtime with the same traceback.
+#
+# Dump the tree before and after with: python Optimizer.py script.txt
+
+MAX_FOLDED_SIZE = 1000 # Bigger strings and numbers are left to be built at runtime
+
+# Built-in names that can be folded as long as the program never binds them itself
+CONSTANT_NAMES = {'TRUE': Number.true, 'FALSE': Number.false, 'NULL': Number.null}
+
+class Optimizer:
+    def __init__(self, symbol_table=None):
+        self.symbol_table = symbol_table
+        self.constant_names = {}
+        self.program_names = set() # Names the program binds, from bound_names
+
+    def optimize(self, node):
+        self.program_names = set(self.bound_names(node))
+        self.constant_names = self.foldable_constants(self.program_names)
+        return self.visit(node)
+
+    def foldable_constants(self, bound_names): # The CONSTANT_NAMES a program binding bound_names can fold
+        constant_names = {}
+        for name, value in CONSTANT_NAMES.items():
+            # The shell keeps the global symbol table between lines, so it may have been rebound already
+            if name in bound_names: continue
+            if self.symbol_table and self.symbol_table.get(name) is not value: continue
+            constant_names[name] = value
+        return constant_names
+
+    def visit(self, node):
+        method_name = f'optimize_{type(node).__name__}'
+        method = getattr(self, method_name, self.no_optimize_method)
+        return method(node)
+
+    def no_optimize_method(self, node):
+        return node
+
+    ##################
+    # Constants
+    ##################
+
+    def constant(self, node): # The prebuilt Value of a literal node, None if it is not a constant
+        if isinstance(node, (NumberNode, StringNode)): return node.value
+        return None
+
+    def literal(self, value, pos_start, pos_end): # Builds the literal node for a folded value
+        if isinstance(value, String):
+            tok = Token(TT_STRING, value.value, pos_start)
+        else:
+            tok = Token(TT_FLOAT if isinstance(value.value, float) else TT_INT, value.value, pos_start)
+        tok.pos_start, tok.pos_end = pos_start, pos_end # The literal spans the whole folded expression
+
+        return self.visit(StringNode(tok) if isinstance(value, String) else NumberNode(tok))
+
+    def fold(self, operation, node):
+        try:
+            result = operation()
+        except Exception: # e.g. OverflowError, the Interpreter will fail the same way at runtime
+            return node
+        if not result: return node # Value methods without a matching case return None
+
+        value, error = result
+        if error or not isinstance(value, (Number, String)): return node
+        if self.too_big(value): return node
+        return self.literal(value, node.pos_start, node.pos_end)
+
+    def too_big(self, value):
+        if isinstance(value.value, str): return len(value.value) > MAX_FOLDED_SIZE
+        if isinstance(value.value, int): return value.value.bit_length() > MAX_FOLDED_SIZE
+        return False
+
+    def optimize_NumberNode(self, node):
+        node.value = make_number(node.tok.value)
+        return node
+
+    def optimize_StringNode(self, node):
+        node.value = string_literal(node.tok.value)
+        return node
+
+    def optimize_VarAccessNode(self, node):
+        value = self.constant_names.get(node.var_name_tok.value)
+        if value is None: return node
+        return self.literal(value, node.pos_start, node.pos_end)
+
+    ##################
+    # Operators
+    ##################
+
+    # A chain like a + b + c + ... nests to the left as deep as it is long, so the left spine is
+    # walked in a loop and each link is optimized on the way back up, instead of one visit per link
+    def optimize_BinaryOperatorNode(self, node):
+        links = []
+        while type(node) is BinaryOperatorNode:
+            links.append(node)
+            node = node.left_node
+        result = self.visit(node)
+        for node in reversed(links):
+            node.left_node = result
+            result = self.optimize_operator(node)
+        return result
+
+    def optimize_operator(self, node): # One BinaryOperatorNode, its left operand is already optimized
+        node.right_node = self.visit(node.right_node)
+
+        left, right = self.constant(node.left_node), self.constant(node.right_node)
+        if node.op_tok.type == TT_KEYWORD: return self.fold_logic(node, left, right)
+
+        method_name = BINARY_METHODS.get(node.op_tok.type)
+        if left is None or right is None or method_name is None: return node
+        if not hasattr(left, method_name): return node
+
+        # Make sure a huge result is never built while folding
+        if node.op_tok.type == TT_MULTIPLY:
+            for text, count in ((left.value, right.value), (right.value, left.value)):
+                if isinstance(text, str) and isinstance(count, int) and len(text) * count > MAX_FOLDED_SIZE:
+                    return node
+        if node.op_tok.type == TT_POWER and isinstance(right.value, (int, float)) and abs(right.value) > 64:
+            return node
+
+        return self.fold(lambda: getattr(left, method_name)(right), node)
+
+    # AND and OR fold when their left operand decides them, which drops the right one as the
+    # engines would skip it, or when both operands are constants
+    def fold_logic(self, node, left, right):
+        if left is None: return node
+        is_or = node.op_tok.keyword == KW_OR
+        if left.is_true() == is_or: result = is_or
+        elif right is None: return node
+        else: result = right.is_true()
+        return self.literal(Number.true if result else Number.false, node.pos_start, node.pos_end)
+
+    def optimize_UnaryOpNode(self, node):
+        node.node = self.visit(node.node)
+        number = self.constant(node.node)
+        if number is None: return node
+
+        if node.op_tok.type == TT_SUBTRACT:
+            return self.fold(lambda: number.multiply_by(make_number(-1)), node)
+        if node.op_tok.keyword == KW_NOT:
+            if not isinstance(number, Number): return node
+            return self.fold(lambda: number.notted(), node)
+        return self.literal(number, node.pos_start, node.pos_end)
+
+    ##################
+    # Statements
+    ##################
+
+    def optimize_VarAssignNode(self, node):
+        node.value_node = self.visit(node.value_node)
+        return node
+
+    def optimize_IfNode(self, node):
+        cases = []
+        else_case = node.else_case
+
+        for condition, expr, return_null in node.cases:
+            condition = self.visit(condition)
+            value = self.constant(condition)
+
+            if value is None:
+                cases.append((condition, self.visit(expr), return_null))
+            elif value.is_true():
+                # Every case and the else after this one can never run
+                else_case = (expr, return_null)
+                break
+            # A case that is always false is dropped
+
+        if else_case:
+            expr, return_null = else_case
+            else_case = (self.visit(expr), return_null)
+
+        # Only an expression IF can be replaced by its branch, a block IF still evaluates to NULL
+        if not cases and else_case and not else_case[1]:
+            return else_case[0]
+
+        node.cases = cases
+        node.else_case = else_case
+        return node
+
+    def optimize_ForNode(self, node):
+        for attribute in ('start_value_node', 'end_value_node', 'step_value_node', 'iterable_node'):
+            child = getattr(node, attribute)
+            if child: setattr(node, attribute, self.visit(child))
+        node.body_node = self.visit(node.body_node)
+        return node
+
+    def optimize_WhileNode(self, node):
+        node.condition_node = self.visit(node.condition_node)
+        node.body_node = self.visit(node.body_node)
+        return node
+
+    def optimize_UntilNode(self, node):
+        return self.optimize_WhileNode(node)
+
+    def optimize_FunctionDefinitionNode(self, node):
+        node.body_node = self.visit(node.body_node)
+        return node
+
+    def optimize_CallNode(self, node):
+        node.node_to_call = self.visit(node.node_to_call)
+        node.arg_nodes = [self.visit(arg_node) for arg_node in node.arg_nodes]
+        return node
+
+    def optimize_ListNode(self, node):
+        element_nodes = []
+        for element_node in node.element_nodes:
+            element_nodes.append(self.visit(element_node))
+            if isinstance(element_node, (ReturnNode, BreakNode, ContinueNode)):
+                break # Nothing after these statements can run
+        node.element_nodes = element_nodes
+        return node
+
+    def optimize_ReturnNode(self, node):
+        if node.node_to_return:
+            node.node_to_return = self.visit(node.node_to_return)
+        return node
+
+    ##################
+    # Helpers
+    ##################
+
+    def bound_names(self, node): # Every name the program assigns, loops over, defines or takes as an argument
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            if isinstance(node, (VarAssignNode, ForNode)):
+                yield node.var_name_tok.value
+            if isinstance(node, FunctionDefinitionNode):
+                if node.var_name_tok: yield node.var_name_tok.value
+                for arg_name_tok in node.arg_name_toks: yield arg_name_tok.value
+            stack.extend(reversed(children(node)))
+
+
+##################
+#   DUMP
+##################
+
+def dump(node, indent=0): # Returns the tree as indented text, one node per line
+    pad = '  ' * indent
+    if isinstance(node, (NumberNode, StringNode)):
+        return f'{pad}{type(node).__name__} {node.tok.value!r}\n'
+    if isinstance(node, (VarAccessNode, VarAssignNode, ForNode)):
+        label = f'{type(node).__name__} {node.var_name_tok.value}'
+    elif isinstance(node, FunctionDefinitionNode):
+        arg_names = ', '.join(arg_name_tok.value for arg_name_tok in node.arg_name_toks)
+        func_name = node.var_name_tok.value if node.var_name_tok else '<anonymous>'
+        label = f'FunctionDefinitionNode {func_name}({arg_names})'
+    elif isinstance(node, (BinaryOperatorNode, UnaryOpNode)):
+        op = node.op_tok.value if node.op_tok.type == TT_KEYWORD else TOKEN_NAMES[node.op_tok.type]
+        label = f'{type(node).__name__} {op}'
+    elif isinstance(node, IfNode):
+        label = f'IfNode {len(node.cases)} case(s){" + ELSE" if node.else_case else ""}'
+    else:
+        label = type(node).__name__
+
+    return pad + label + '\n' + ''.join(dump(child, indent + 1) for child in children(node))
+
+
+if __name__ == '__main__':
+    from Lexer import Lexer
+    from Parser import Parser
+
+    fn = sys.argv[1]
+    with open(fn) as f:
+        text = f.read()
+
+    tokens, error = Lexer(fn, text).make_tokens()
+    if error:
+        print(error.as_string())
+        sys.exit(1)
+    ast = Parser(tokens).parse()
+    if ast.error:
+        print(ast.error.as_string())
+        sys.exit(1)
+
+    print('--- parsed ---')
+    print(dump(ast.node), end='')
+    print('--- optimized ---')
+    print(dump(Optimizer().optimize(ast.node)), end='')
@@ -8,7 +8,6 @@ class ParseResult: # Class keeps track of Parse results and Nodes
         self.error = None # Stores Errors
         self.advance_count = 0
         self.last_registered_count = 0
-        self.to_reverse_count = 0
         
     def register_advancement(self):
         self.last_registered_count = 1
@@ -34,10 +33,4 @@ class ParseResult: # Class keeps track of Parse results and Nodes
     def failure(self,error): # Used when an unexpected Error occurs; error will store IllegalCharError object
         if not self.error or self.last_registered_count == 0:
             self.error = error
-        return self
-    
-    def try_register(self,res):
-        if res.error:
-            self.to_reverse_count = res.advance_count
-            return None
-        return self.register(res)
\ No newline at end of file
+        return self
\ No newline at end of file
@@ -65,14 +65,74 @@ arith-expr      : term((PLUS|MINUS) term)*
 '''
 ###########################################################
 
+#####################
+#   TOKEN BUFFER
+#####################
+# Tokens the Parser pulls from a token iterator (e.g. RegexLexer.generate_tokens) as it needs them.
+# The tokens are kept from the start of the top level statement being parsed, so a long program
+# is never held as a whole token list. The Parser itself never looks further than Parser.peek.
+
+class TokenBuffer:
+    def __init__(self, tokens):
+        self.source = iter(tokens)
+        self.buffer = []
+        self.offset = 0     # Index of buffer[0] in the whole token stream
+        self.done = False
+
+    def token(self, idx): # Token at index idx of the stream, None past the EOF token
+        i = idx - self.offset
+        while i >= len(self.buffer) and not self.done:
+            tok = next(self.source, None)
+            if tok is None:
+                self.done = True
+            else:
+                self.buffer.append(tok)
+
+        if i < 0: raise Exception(f'Token {idx} was already released')
+        return self.buffer[i] if i < len(self.buffer) else None
+
+    def release(self, idx): # Tokens before index idx are never read again
+        if idx > self.offset:
+            del self.buffer[:idx - self.offset]
+            self.offset = idx
+
+    def drain(self): # Lexes the rest of the text, so a lexer error after the current token is still raised
+        for _ in self.source: pass
+        self.done = True
+
+
 ###############
 #   PARSER
 ###############
 # Takes in a list of tokens and turns it into a AST following a grammer rule with precedences 
+# Every choice is made from the current token (and Parser.peek for assignments), using the
+# FIRST sets below, so a program that parses never throws a sub-parse away or goes back.
+# Only a statement after the first one of a block that does not parse sends the parser back
+# to its first token, where the block ends and whatever comes after the block reports it.
+
+# Tokens an expr can start with
+EXPR_START_TYPES = {TT_INT, TT_FLOAT, TT_STRING, TT_IDENTIFIER, TT_ADD, TT_SUBTRACT, TT_LPAREN, TT_LSQUARE}
+EXPR_START_KEYWORDS = {KW_VAR, KW_NOT, KW_IF, KW_FOR, KW_WHILE, KW_FUN}
+# Tokens a statement can start with
+STATEMENT_START_KEYWORDS = EXPR_START_KEYWORDS | {KW_RETURN, KW_CONTINUE, KW_BREAK}
+
+# Precedence of the binary operators for Parser.operation, a higher one binds tighter.
+# All of them are left associative except POWER: its right side is a whole factor,
+# so 2^3^2 is 2^(3^2) and 2^-1 is allowed. NOT binds like PREC_COMP, a unary +/- like PREC_FACTOR.
+PREC_LOGIC, PREC_COMP, PREC_ARITH, PREC_TERM, PREC_FACTOR, PREC_POWER = range(1, 7)
+
+BINARY_PRECEDENCE = {
+    TT_GREATER_THAN: PREC_COMP, TT_LESS_THAN: PREC_COMP, TT_EQUALS_TO: PREC_COMP,
+    TT_GREATER_THAN_EQUALS: PREC_COMP, TT_LESS_THAN_EQUALS: PREC_COMP, TT_NE: PREC_COMP,
+    TT_ADD: PREC_ARITH, TT_SUBTRACT: PREC_ARITH,
+    TT_MULTIPLY: PREC_TERM, TT_DIVIDE: PREC_TERM,
+    TT_POWER: PREC_POWER,
+}
+LOGIC_OPERATORS = ('AND', 'OR') # KEYWORD tokens, only the upper case spelling is an operator
     
 class Parser:
-    def __init__(self, tokens): # takes in a list of tokens
-        self.tokens = tokens
+    def __init__(self, tokens): # takes in a list of tokens or a TokenBuffer
+        self.tokens = tokens if isinstance(tokens, TokenBuffer) else TokenBuffer(tokens)
         self.tok_idx = -1
         self.advance() # when intialized, tok_idx = 0;
     
@@ -81,17 +141,16 @@ class Parser:
         self.update_current_tok()
         return self.current_tok
     
-    def reverse(self, amount = 1):
-        self.tok_idx -= amount
-        self.update_current_tok()
-        return self.current_tok
+    def peek(self): # The token after current_tok, without advancing
+        return self.tokens.token(self.tok_idx + 1) or self.current_tok
     
     def update_current_tok(self):
-        if self.tok_idx >= 0 and self.tok_idx < len(self.tokens):
-            self.current_tok = self.tokens[self.tok_idx]
+        if self.tok_idx >= 0:
+            tok = self.tokens.token(self.tok_idx)
+            if tok: self.current_tok = tok
 
     def parse(self):
-        res = self.statements() # Enters AST tree, with expression being the highest order
+        res = self.statements(release=True) # Enters AST tree, with expression being the highest order
 
         if not res.error and self.current_tok.type != TT_EOF: # If current_tok type isn't EOF, that means there's been a syntax error
             return res.failure(InvalidSyntaxError(
@@ -102,7 +161,7 @@ class Parser:
     
 ##################################################
 
-    def statements(self):
+    def statements(self, release=False): # release: top level, tokens of finished statements are dropped
         res = ParseResult()
         statements = []
         pos_start = self.current_tok.pos_start.copy()
@@ -127,13 +186,17 @@ class Parser:
                 more_statements = False
 
             if not more_statements: break # If there are no more statements, get out of loop
-            # Otherwise, try to register each statement
-            statement = res.try_register(self.statement()) # Try register see if there is a statement or not, if not, it returns None
-            if not statement:
-                self.reverse(res.to_reverse_count) # reverse the advance methods performed
-                more_statements = False
-                continue
-            statements.append(statement)
+            # Otherwise, the statements end unless the next token starts a statement (e.g. END)
+            tok = self.current_tok
+            if tok.type not in EXPR_START_TYPES and tok.keyword not in STATEMENT_START_KEYWORDS: break
+            statement_idx = self.tok_idx
+            statement_res = self.statement()
+            if statement_res.error: # e.g. "Token cannot appear after previous tokens" from parse
+                self.tok_idx = statement_idx
+                self.update_current_tok()
+                break
+            statements.append(res.register(statement_res))
+            if release: self.tokens.release(self.tok_idx)
         
         # Return a list of statements that will be evaluated by the Interpreter
         return res.success(ListNode(
@@ -147,23 +210,24 @@ class Parser:
         pos_start = self.current_tok.pos_start.copy()
         
         # Return a ReturnNode
-        if self.current_tok.matches(TT_KEYWORD, 'RETURN'):
+        if self.current_tok.keyword == KW_RETURN:
             res.register_advancement() # Consume Token
             self.advance()
 
-            expr = res.try_register(self.expr()) # expr is optional, so we use try_register
-            if not expr:
-                self.reverse(res.to_reverse_count)
+            expr = None # expr is optional
+            if self.current_tok.type in EXPR_START_TYPES or self.current_tok.keyword in EXPR_START_KEYWORDS:
+                expr = res.register(self.expr())
+                if res.error: return res
             return res.success(ReturnNode(expr, pos_start, self.current_tok.pos_start.copy()))
         
         # Return a ContinueNode
-        if self.current_tok.matches(TT_KEYWORD, 'CONTINUE'):
+        if self.current_tok.keyword == KW_CONTINUE:
             res.register_advancement() # Consume Token
             self.advance()
             return res.success(ContinueNode(pos_start, self.current_tok.pos_start.copy()))
         
         #Return a BreakNode
-        if self.current_tok.matches(TT_KEYWORD, 'BREAK'):
+        if self.current_tok.keyword == KW_BREAK:
             res.register_advancement() # Consume Token
             self.advance()
             return res.success(BreakNode(pos_start, self.current_tok.pos_start.copy()))
@@ -178,10 +242,10 @@ class Parser:
             ))
         return res.success(expr)
     
-    def expr(self): # calls self.term and has ADD, SUB operators; also has variables identifier
+    def expr(self): # variable assignments, every other expression is an operation
         res = ParseResult()
         
-        if self.current_tok.matches(TT_KEYWORD, 'VAR'): # If VAR is declared
+        if self.current_tok.keyword == KW_VAR: # If VAR is declared
             res.register_advancement() # Consume Token
             self.advance()
 
@@ -191,24 +255,19 @@ class Parser:
                     "Expected Identifier"
                 ))
         
-        # Handling Variable Access or Assignment
-        if self.current_tok.type == TT_IDENTIFIER:
+        # Handling Variable Assignment, anything else (including a Variable Access) is a binary operation
+        if self.current_tok.type == TT_IDENTIFIER and self.peek().type == TT_EQ:
             var_name = self.current_tok 
             res.register_advancement()
             self.advance()
-            
-            #Check to see if there's an assignment
-            if self.current_tok.type == TT_EQ: # In the instance of this being an assignment of a variable
-                res.register_advancement()
-                self.advance()
-                expr = res.register(self.expr()) # Get the expression of that variable
+            res.register_advancement() # Consume EQ
+            self.advance()
+            expr = res.register(self.expr()) # Get the expression of that variable
 
-                if res.error: return res
-                return res.success(VarAssignNode(var_name, expr)) # Return Assign node
-            
-            self.reverse() # In the case that it's not an assignment, we need to go backtrack
+            if res.error: return res
+            return res.success(VarAssignNode(var_name, expr)) # Return Assign node
 
-        node = res.register(self.binary_operation(self.comp_expr, ((TT_KEYWORD, "AND"), (TT_KEYWORD, "OR"))))
+        node = res.register(self.operation(PREC_LOGIC))
         
         if res.error:
             return res.failure(InvalidSyntaxError(
@@ -330,22 +389,22 @@ class Parser:
             if res.error: return res
             return res.success(list_expr)
         
-        elif tok.matches(TT_KEYWORD, 'IF'):
+        elif tok.keyword == KW_IF:
             if_expr = res.register(self.if_expr())
             if res.error: return res
             return res.success(if_expr)
         
-        elif tok.matches(TT_KEYWORD, 'FOR'):
+        elif tok.keyword == KW_FOR:
             for_expr = res.register(self.for_expr())
             if res.error: return res
             return res.success(for_expr)
         
-        elif tok.matches(TT_KEYWORD, 'WHILE'):
+        elif tok.keyword == KW_WHILE:
             while_expr = res.register(self.while_expr())
             if res.error: return res
             return res.success(while_expr)
         
-        elif tok.matches(TT_KEYWORD, 'FUN'):
+        elif tok.keyword == KW_FUN:
             func_def = res.register(self.func_def())
             if res.error: return res
             return res.success(func_def)
@@ -417,7 +476,7 @@ class Parser:
         res = ParseResult()
         else_case = None
 
-        if self.current_tok.matches(TT_KEYWORD, 'ELSE'):
+        if self.current_tok.keyword == KW_ELSE:
             res.register_advancement()
             self.advance()
 
@@ -430,7 +489,7 @@ class Parser:
                 else_case = (statements, True)
 
 
-                if self.current_tok.matches(TT_KEYWORD, 'END'): # Look to see if there is an END keyword
+                if self.current_tok.keyword == KW_END: # Look to see if there is an END keyword
                     res.register_advancement()
                     self.advance()
                 else:
@@ -468,7 +527,7 @@ class Parser:
 
         '''
         #THEN Keyword check (if the condition is true, then)
-        if not self.current_tok.matches(TT_KEYWORD, 'THEN'):
+        if self.current_tok.keyword != KW_THEN:
             return res.failure(InvalidSyntaxError(
                 self.current_tok.pos_start, self.current_tok.pos_end,
                 f"Expected 'THEN'"))
@@ -488,7 +547,7 @@ class Parser:
             if res.error: return res
             cases.append((condition, statements, True)) # Include a tuple with condition, statements, and Boolean True
 
-            if self.current_tok.matches(TT_KEYWORD, 'END'): # Look to see if there is an END keyword
+            if self.current_tok.keyword == KW_END: # Look to see if there is an END keyword
                 res.register_advancement()
                 self.advance()
             else:
@@ -516,7 +575,7 @@ class Parser:
         res = ParseResult()
         cases, else_case = [], None
 
-        if self.current_tok.matches(TT_KEYWORD, 'ELIF'):
+        if self.current_tok.keyword == KW_ELIF:
             all_cases = res.register(self.elif_expr())
             if res.error: return res
             cases, else_case = all_cases # update elif and else cases
@@ -530,7 +589,7 @@ class Parser:
         res = ParseResult()
         
         # Check if we have FOR
-        if not self.current_tok.matches(TT_KEYWORD, 'FOR'):
+        if self.current_tok.keyword != KW_FOR:
             return res.failure(InvalidSyntaxError(
                 self.current_tok.pos_start, self.current_tok.pos_end,
                 f"Expected 'FOR'"
@@ -553,7 +612,7 @@ class Parser:
         self.advance()
 
         # Check for 'IN'
-        if self.current_tok.matches(TT_KEYWORD, 'IN'):
+        if self.current_tok.keyword == KW_IN:
             res.register_advancement()
             self.advance()
 
@@ -568,7 +627,7 @@ class Parser:
             body = res.register(self.statements())
             if res.error: return res
 
-            if not self.current_tok.matches(TT_KEYWORD, 'END'):
+            if self.current_tok.keyword != KW_END:
                 return res.failure(InvalidSyntaxError(
                     self.current_tok.pos_start, self.current_tok.pos_end,
                     "Expected 'END'"
@@ -591,7 +650,7 @@ class Parser:
         start_value = res.register(self.expr())
         if res.error: return res
 
-        if not self.current_tok.matches(TT_KEYWORD, "TO"):
+        if self.current_tok.keyword != KW_TO:
             return res.failure(InvalidSyntaxError(
                 self.current_tok.pos_start, self.current_tok.pos_end,
                 f"Expected 'TO'"
@@ -603,7 +662,7 @@ class Parser:
         end_value = res.register(self.expr())
         if res.error: return res
 
-        if self.current_tok.matches(TT_KEYWORD, 'STEP'):
+        if self.current_tok.keyword == KW_STEP:
             res.register_advancement()
             self.advance()
             
@@ -619,7 +678,7 @@ class Parser:
             body = res.register(self.statements())
             if res.error: return res
             
-            if not self.current_tok.matches(TT_KEYWORD, 'END'):
+            if self.current_tok.keyword != KW_END:
                 return res.failure(InvalidSyntaxError(
                     self.current_tok.pos_start, self.current_tok.pos_end,
                     f"Expected 'END'"
@@ -637,7 +696,7 @@ class Parser:
     def while_expr(self):
         res = ParseResult()
 
-        if not self.current_tok.matches(TT_KEYWORD, 'WHILE'):
+        if self.current_tok.keyword != KW_WHILE:
             return res.failure(InvalidSyntaxError(
                 self.current_tok.pos_start, self.current_tok.pos_end,
                 "Expected 'WHILE'"
@@ -650,7 +709,7 @@ class Parser:
         if res.error: return res
         
         '''
-        if not self.current_tok.matches(TT_KEYWORD, 'THEN'):
+        if self.current_tok.keyword != KW_THEN:
             return res.failure(InvalidSyntaxError(
                 self.current_tok.pos_start, self.current_tok.pos_end,
                 "Expected 'THEN'"
@@ -668,7 +727,7 @@ class Parser:
             body = res.register(self.statements())
             if res.error: return res
             
-            if not self.current_tok.matches(TT_KEYWORD, 'END'):
+            if self.current_tok.keyword != KW_END:
                 return res.failure(InvalidSyntaxError(
                     self.current_tok.pos_start, self.current_tok.pos_end,
                     f"Expected 'END'"
@@ -685,82 +744,54 @@ class Parser:
         return res.success(WhileNode(condition, body, False))
 
 
-    def factor(self):
+    def operation(self, min_precedence): # Pratt parser for every operator, parses operators that bind at least min_precedence
         res = ParseResult()
         tok = self.current_tok
 
-        if tok.type in (TT_ADD, TT_SUBTRACT): # Unary 
+        if tok.keyword == KW_NOT and min_precedence <= PREC_COMP: # NOT applies to a whole comparison
             res.register_advancement()
             self.advance()
-            factor = res.register(self.factor())
-            if res.error:return res
-            return res.success(UnaryOpNode(tok, factor))
-        
-        return self.power()
-    
-    def term(self): # Calls self.factor and has MULTIPLY and DIVIDE operators
-        return self.binary_operation(self.factor, (TT_MULTIPLY, TT_DIVIDE))
-    
-    def comp_expr(self):
-        res = ParseResult()
+            node = res.register(self.operation(PREC_COMP))
+            if res.error: return res
+            left = UnaryOpNode(tok, node)
 
-        if self.current_tok.matches(TT_KEYWORD, 'NOT'):
-            op_tok = self.current_tok
+        elif tok.type in (TT_ADD, TT_SUBTRACT): # Unary, applies to a factor
             res.register_advancement()
             self.advance()
-
-            node = res.register(self.comp_expr())
+            node = res.register(self.operation(PREC_FACTOR))
             if res.error: return res
-            return res.success(UnaryOpNode(op_tok, node))
+            left = UnaryOpNode(tok, node)
 
-            
-        node = res.register(self.binary_operation(
-            self.arith_expr, (
-                TT_GREATER_THAN,
-                TT_LESS_THAN,
-                TT_EQUALS_TO,
-                TT_GREATER_THAN_EQUALS,
-                TT_LESS_THAN_EQUALS,
-                TT_NE)))
-        
-        if res.error: return res.failure(InvalidSyntaxError(
-            self.current_tok.pos_start, self.current_tok.pos_end,
-            "Expected int or float, '+', identifier,  '-', '(', '[', or NOT "
-            ))
-        return res.success(node)
-    
-    def arith_expr(self):
-        return self.binary_operation(self.term, (TT_ADD, TT_SUBTRACT))
-        
-    def power(self):
-        return self.binary_operation(self.call, (TT_POWER, ), self.factor)
-
-
-        # This basically takes a function, creates a AST Tree
-    def binary_operation(self, func, ops, func_b =None):
-        if func_b == None:
-            func_b = func
+        else:
+            left = res.register(self.call())
+            if res.error:
+                if min_precedence > PREC_COMP: return res
+                return res.failure(InvalidSyntaxError(
+                    self.current_tok.pos_start, self.current_tok.pos_end,
+                    "Expected int or float, '+', identifier,  '-', '(', '[', or NOT "
+                    ))
 
-        res = ParseResult()
-        left = res.register(func()) # Get left-side expression
-        if res.error: return res
+        while True:
+            op_tok = self.current_tok
+            if op_tok.type == TT_KEYWORD:
+                precedence = PREC_LOGIC if op_tok.value in LOGIC_OPERATORS else None
+            else:
+                precedence = BINARY_PRECEDENCE.get(op_tok.type)
+            if precedence is None or precedence < min_precedence: break
 
-        while self.current_tok.type in ops or (self.current_tok.type, self.current_tok.value) in ops:
-            op_tok = self.current_tok # Get operator token
-            
             res.register_advancement()
             self.advance()
-            
-            right = res.register(func_b()) # Get right-side expression
+
+            right = res.register(self.operation(PREC_FACTOR if precedence == PREC_POWER else precedence + 1))
             if res.error: return res
             left = BinaryOperatorNode(left, op_tok, right)
-        
+
         return res.success(left)
-    
+
     def func_def(self):
         res = ParseResult()
 
-        if not self.current_tok.matches(TT_KEYWORD, 'FUN'):
+        if self.current_tok.keyword != KW_FUN:
             return res.failure(InvalidSyntaxError(
                     self.current_tok.pos_start, self.current_tok.pos_end,
                     "Expected Function"
@@ -853,7 +884,7 @@ class Parser:
         body = res.register(self.statements())
         if res.error: return res
     
-        if not self.current_tok.matches(TT_KEYWORD, 'END'):
+        if self.current_tok.keyword != KW_END:
             return res.failure(InvalidSyntaxError(
                 self.current_tok.pos_start, self.current_tok.pos_end,
                 f"Expected 'END'"
@@ -1,20 +1,53 @@
-class Position:
-    def __init__(self, idx, ln, col, file_name, file_txt): # this is the index, line, column, file name and file text
-        self.idx = idx
-        self.ln = ln
-        self.col = col
-        self.file_name  = file_name
+import re
+from bisect import bisect_right
+
+# One file's name and text. The line each index is on is only worked out when something asks,
+# which is almost always just an error message
+class Source:
+    def __init__(self, file_name, file_txt):
+        self.file_name = file_name
         self.file_txt = file_txt
-    
-    def advance(self, current_char = None): # keeps track of index and column
-        self.idx += 1
-        self.col += 1
-
-        if current_char == '\n': # reset the column and increase line count if there's a newline
-            self.ln += 1
-            self.col = 0
-        
-        return self
+        self.first_line = 1 if file_txt.endswith('\n') else 0 # The Lexer starts by advancing over the last character
+        self.line_starts = None # Index every line starts at, made on the first lookup
+
+    def line_col(self, idx): # Line and column of an index, a binary search over the line starts
+        if self.line_starts is None:
+            self.line_starts = [0] + [match.end() for match in re.finditer('\n', self.file_txt)]
+        line = bisect_right(self.line_starts, idx) - 1
+        return self.first_line + line, idx - self.line_starts[line]
+
+
+class Position: # An index into a Source. Positions never change, advance() makes a new one
+    __slots__ = ('idx', 'source')
+
+    def __init__(self, idx, source): # this is the index and the Source it points into
+        self.idx = idx
+        self.source = source
+
+    @property
+    def ln(self):
+        return self.source.line_col(self.idx)[0]
+
+    @property
+    def col(self):
+        return self.source.line_col(self.idx)[1]
+
+    @property
+    def file_name(self):
+        return self.source.file_name
+
+    @property
+    def file_txt(self):
+        return self.source.file_txt
+
+    def __eq__(self, other): # Equal when they point at the same place, e.g. two positions read from a FlatTree
+        return isinstance(other, Position) and self.idx == other.idx and self.source is other.source
+
+    def __hash__(self):
+        return hash(self.idx)
+
+    def advance(self): # The position of the next character
+        return Position(self.idx + 1, self.source)
     
     def copy(self):
-        return Position(self.idx, self.ln, self.col, self.file_name, self.file_txt)
\ No newline at end of file
+        return self
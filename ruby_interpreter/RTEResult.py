@@ -53,4 +53,29 @@ class RTEResult:
             self.func_return_value or
             self.loop_continue or
             self.break_loop
-        )
\ No newline at end of file
+        )
+
+##########################
+#   CONTROL FLOW SIGNALS
+##########################
+
+# Nodes evaluate to plain values. Anything that is not a normal value
+# (an error, RETURN, BREAK, CONTINUE) leaves the evaluation as an exception,
+# so the normal path never builds or checks a result object.
+# RTEResult is only built once, where a whole program finishes running.
+
+class ErrorSignal(Exception):
+    def __init__(self, error):
+        self.error = error
+
+class ReturnSignal(Exception):
+    def __init__(self, value):
+        self.value = value
+
+class BreakSignal(Exception): pass
+
+class ContinueSignal(Exception): pass
+
+# BREAK and CONTINUE carry no data, so the same instance is raised every time
+BREAK = BreakSignal()
+CONTINUE = ContinueSignal()
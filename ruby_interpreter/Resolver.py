@@ -0,0 +1,71 @@
+from Nodes import *
+
+##################
+#   RESOLVER
+##################
+
+# Walks the AST once before it runs and gives every function a scope:
+# a dict from each name the function binds (arguments, assigned variables,
+# FOR variables and named inner functions) to a slot in its Frame.
+# Nodes inside the function that use one of those names get the slot number.
+#
+# The language is dynamically scoped, so a name the function does not bind can
+# only be found through the calling contexts at runtime; those nodes keep slot = None.
+# Top level names also stay in the global SymbolTable, which RUN and the shell share.
+#
+# It also marks the calls a function returns the value of as is (tail_call), which
+# Function.execute then runs in a loop instead of recursing.
+
+class Resolver:
+    # Walks with its own stack of (node, scope of the function it is in), like the tree can nest deeper than python's recursion limit
+    def resolve(self, root):
+        stack = [(root, None)]
+        while stack:
+            node, scope = stack.pop()
+            if isinstance(node, (VarAccessNode, VarAssignNode, ForNode)):
+                node.slot = scope.get(node.var_name_tok.value) if scope else None
+
+            if isinstance(node, FunctionDefinitionNode):
+                if node.var_name_tok and scope:
+                    node.slot = scope.get(node.var_name_tok.value)
+                stack.append((node.body_node, self.resolve_function(node)))
+                continue
+
+            stack.extend((child, scope) for child in reversed(children(node)))
+        return root
+
+    def resolve_function(self, node): # Gives the function its scope and returns it, resolve() goes on with the body
+        scope = {}
+        for arg_name_tok in node.arg_name_toks:
+            scope.setdefault(arg_name_tok.value, len(scope))
+        for name in bound_names(node.body_node):
+            scope.setdefault(name, len(scope))
+        node.scope = scope
+
+        if node.auto_return: self.mark_tail_call(node.body_node)
+        for return_node in self.return_nodes(node.body_node):
+            if return_node.node_to_return: self.mark_tail_call(return_node.node_to_return)
+        return scope
+
+    def mark_tail_call(self, node): # node is the value the function returns
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            if isinstance(node, CallNode):
+                node.tail_call = True
+            elif isinstance(node, IfNode): # Either branch of an expression IF
+                for condition, expr, return_null in node.cases:
+                    if not return_null: stack.append(expr)
+                if node.else_case and not node.else_case[1]:
+                    stack.append(node.else_case[0])
+
+    def return_nodes(self, node): # RETURNs of a function body outside of loops
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            # A BREAK from the called function must still reach a loop around the RETURN
+            if isinstance(node, (ForNode, WhileNode, UntilNode, FunctionDefinitionNode)): continue
+            if isinstance(node, ReturnNode):
+                yield node
+                continue
+            stack.extend(reversed(children(node)))
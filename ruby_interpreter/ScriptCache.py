@@ -0,0 +1,144 @@
+import os
+import hashlib
+import marshal
+from Position import Source
+from FlatAST import FlatTree
+from Optimizer import CONSTANT_NAMES
+
+##################
+#   SCRIPT CACHE
+##################
+
+# Keeps the resolved tree of every script file that RUN (or main.run(..., cache=True)) ran on disk,
+# so running the same file again skips the Lexer, Parser, Optimizer and Resolver: the tree is read
+# back with FlatTree.from_bytes and the engines run it as before.
+#
+# Entries go in a __rbcache__ directory next to the script, or all in the directory given to ScriptCache.
+# An entry belongs to the absolute path of its script and keeps the script's mtime, size and SHA-256.
+# The mtime and size are the fast key: when the script still has both, the entry is used without hashing
+# the text. When either changed the hash decides: an edited script always misses, a touched one still hits.
+# Like git's racily clean files, the fast key is not trusted for a script whose mtime is not older than the
+# entry, since a file system only keeps mtimes to a clock tick and an edit in the same tick keeps it.
+#
+# The Optimizer folds TRUE/FALSE/NULL only while neither the program nor the symbol table rebinds them,
+# so an entry also records which of them were folded and misses when they would be folded differently.
+#
+# Entry layout, all in one marshal: (CACHE_FORMAT, path, mtime_ns, size, sha256, optimized,
+# bound constants, folded constants, FlatTree.to_bytes()). FlatTree.to_bytes has its own version too.
+
+CACHE_DIR = '__rbcache__'
+CACHE_SUFFIX = '.rbc'
+CACHE_FORMAT = 1 # Version of the entry layout, an entry of any other version is missed and written again
+
+class ScriptCache:
+    def __init__(self, directory=None):
+        self.directory = directory # None puts every entry next to its script
+        self.directories = set()   # Every directory an entry was looked for in, what clear() empties
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+
+    def entry_path(self, file_path): # Where the entry of an absolute script path goes
+        name = os.path.basename(file_path)
+        if self.directory is None:
+            return os.path.join(os.path.dirname(file_path), CACHE_DIR, name + CACHE_SUFFIX)
+        # Every script shares the directory, the hash of the path keeps scripts with the same name apart
+        path_hash = hashlib.sha256(file_path.encode()).hexdigest()[:16]
+        return os.path.join(self.directory, f'{name}.{path_hash}{CACHE_SUFFIX}')
+
+    def load(self, path, text, optimizer=None, fn=None): # The FlatTree cached for the script, None on a miss
+        file_path = os.path.abspath(path)
+        if not os.path.isfile(file_path): return None # Text that is not from a file, e.g. the shell
+        entry_path = self.entry_path(file_path)
+        self.directories.add(os.path.dirname(entry_path))
+
+        try:
+            with open(entry_path, 'rb') as f:
+                entry = marshal.load(f)
+                entry_mtime_ns = os.fstat(f.fileno()).st_mtime_ns
+            version, entry_file, mtime_ns, size, digest, optimized, bound_constants, constants, data = entry
+        except (OSError, EOFError, ValueError, TypeError): # No entry yet, or one this version can not read
+            self.misses += 1
+            return None
+
+        if version != CACHE_FORMAT or entry_file != file_path or not self.unchanged(file_path, mtime_ns, size, entry_mtime_ns, digest, text) \
+                or optimized != (optimizer is not None) \
+                or (optimizer and constants != sorted(optimizer.foldable_constants(bound_constants))):
+            self.misses += 1
+            return None
+
+        try:
+            tree = FlatTree.from_bytes(data)
+        except ValueError: # Written by another FlatTree format
+            self.misses += 1
+            return None
+        tree.source = Source(fn or path, text) # Error messages show the name the script was run by this time
+        self.hits += 1
+        return tree
+
+    def store(self, path, text, tree, optimizer=None): # Writes the entry of a script that load() missed
+        file_path = os.path.abspath(path)
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            return
+
+        optimized = optimizer is not None
+        bound_constants = sorted(optimizer.program_names & CONSTANT_NAMES.keys()) if optimized else []
+        constants = sorted(optimizer.constant_names) if optimized else []
+        entry = (CACHE_FORMAT, file_path, stat.st_mtime_ns, stat.st_size, self.digest(text), optimized,
+                 bound_constants, constants, tree.to_bytes())
+
+        entry_path = self.entry_path(file_path)
+        temp_path = f'{entry_path}.{os.getpid()}.tmp'
+        try:
+            os.makedirs(os.path.dirname(entry_path), exist_ok=True)
+            with open(temp_path, 'wb') as f:
+                marshal.dump(entry, f)
+            os.replace(temp_path, entry_path) # Another process never reads half an entry
+        except OSError: # e.g. a read only directory, the script just is not cached
+            return
+        self.writes += 1
+
+    def unchanged(self, file_path, mtime_ns, size, entry_mtime_ns, digest, text): # Whether the entry was made of this text
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            return False
+        if stat.st_mtime_ns == mtime_ns and stat.st_size == size and mtime_ns < entry_mtime_ns: return True
+        return digest == self.digest(text)
+
+    def digest(self, text):
+        return hashlib.sha256(text.encode('utf-8', 'surrogatepass')).digest()
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'writes': self.writes}
+
+    def clear(self): # Deletes every entry in the cache directories and resets the counts, returns how many
+        directories = set(self.directories)
+        if self.directory is not None: directories.add(self.directory)
+
+        removed = 0
+        for directory in directories:
+            try:
+                names = os.listdir(directory)
+            except OSError:
+                continue
+            for name in names:
+                if not name.endswith(CACHE_SUFFIX): continue
+                try:
+                    os.remove(os.path.join(directory, name))
+                    removed += 1
+                except OSError:
+                    pass
+            if self.directory is None:
+                try:
+                    os.rmdir(directory) # Only goes when nothing else was put in it
+                except OSError:
+                    pass
+
+        self.hits = self.misses = self.writes = 0
+        return removed
+
+
+script_cache = ScriptCache()
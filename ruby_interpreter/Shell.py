@@ -1,9 +1,14 @@
 import main
+import sys
+
+args = [arg for arg in sys.argv[1:] if arg != '--no-optimize']
+engine = args[0] if args else 'interpreter' # e.g. python Shell.py vm
+optimize = '--no-optimize' not in sys.argv  # e.g. python Shell.py --no-optimize runs the tree as parsed
 
 while True:
     text = input('basic > ')
     if text.strip() == "": continue
-    result, error = main.run("<stdin>", text)
+    result, error = main.run("<stdin>", text, engine, optimize)
 
     if error:
         print(error.as_string())
@@ -0,0 +1,479 @@
+from RTEResult import *
+from Errors import RunTimeError
+from Token import *
+from Nodes import *
+from Value import *
+from Interpreter import Interpreter, Deopt
+
+###########################
+#   STACK INTERPRETER
+###########################
+
+# Walks the AST like the Interpreter, but keeps its own stacks instead of recursing in python:
+#   todo    the work left, popped from the end. A node on it is evaluated and its Value pushed on values,
+#           a tuple is the rest of a node whose children are being evaluated and a list is a running loop
+#   values  Values of evaluated nodes that the node above them has not used yet
+#
+# A call of a user Function pushes a RETURN_TO entry and goes on with the body in the same loop, so
+# neither deep recursion nor deeply nested IFs and loops grow the python stack, only these two lists.
+# RETURN, BREAK and CONTINUE pop todo back to the entry they go to instead of raising a signal.
+# Numeric nodes still take the Interpreter's unboxed fast path, which walks the left spine of a chain like
+# a + b + c + ... in a loop and recurses only into right operands, as deep as the parentheses there go.
+#
+# Every Value, context and error is made the same way the Interpreter makes them. Built-ins, MEMO
+# functions and RUN still go through their own execute().
+
+# Continuations on todo, a tuple whose first item is one of these
+VOID            = 0     # (VOID, node): evaluate node and throw its value away
+POP             = 1     # drop the value on top
+PUSH_NULL       = 2     # push NULL, the value of a block whose statements were evaluated with VOID
+BINARY          = 3     # (BINARY, node): both operands are on values
+UNARY           = 4     # (UNARY, node)
+ASSIGN          = 5     # (ASSIGN, node, void): the value is on top, and stays there unless void
+IF              = 6     # (IF, node, i): the condition of case i is on top
+CALL            = 7     # (CALL, node): the function and every argument are on values
+RETURN          = 8     # the value of RETURN is on top
+RETURN_TO       = 9     # (RETURN_TO, caller context, call node, height of values at the call)
+LIST            = 10    # (LIST, node, count)
+FOR_RANGE_PREP  = 11    # (FOR_RANGE_PREP, node, mode): start, end and step are on values
+FOR_EACH_PREP   = 12    # (FOR_EACH_PREP, node, mode): the iterable is on top
+WHILE_TEST      = 13    # (WHILE_TEST, loop): the condition is on top
+VOID_LOOP_START = 14    # (VOID_LOOP_START, node): start a loop that leaves nothing on values
+LOGIC           = 15    # (LOGIC, node): the left operand of AND or OR is on top
+TRUTH           = 16    # TRUE or FALSE for the value on top
+
+POP_ITEM, PUSH_NULL_ITEM, RETURN_ITEM, TRUTH_ITEM = (POP,), (PUSH_NULL,), (RETURN,), (TRUTH,)
+
+# A running loop is a list on todo while its body runs: [kind, node, mode, height of values, elements,
+# what to push for the body, ...] and then [i, end, step, ascending], [iterator] or [until] for each kind
+FOR_RANGE, FOR_EACH, WHILE = range(3)
+VOID_LOOP, NULL_LOOP, COLLECT_LOOP = range(3) # What the loop leaves on values: nothing, NULL or the List
+
+LOOP = 'loop' # What BREAK and CONTINUE pop todo back to, RETURN goes back to RETURN_TO
+
+STOP = object() # End of a FOR_EACH iterator
+
+(K_CONTINUATION, K_LOOP, K_NUMBER, K_STRING, K_BINARY, K_UNARY, K_VAR_ACCESS, K_VAR_ASSIGN, K_IF, K_FOR,
+ K_WHILE, K_UNTIL, K_FUNCTION_DEFINITION, K_CALL, K_LIST, K_RETURN, K_CONTINUE, K_BREAK) = range(18)
+
+KINDS = {tuple: K_CONTINUATION, list: K_LOOP, NumberNode: K_NUMBER, StringNode: K_STRING,
+         BinaryOperatorNode: K_BINARY, UnaryOpNode: K_UNARY, VarAccessNode: K_VAR_ACCESS,
+         VarAssignNode: K_VAR_ASSIGN, IfNode: K_IF, ForNode: K_FOR, WhileNode: K_WHILE, UntilNode: K_UNTIL,
+         FunctionDefinitionNode: K_FUNCTION_DEFINITION, CallNode: K_CALL, ListNode: K_LIST,
+         ReturnNode: K_RETURN, ContinueNode: K_CONTINUE, BreakNode: K_BREAK}
+
+class StackInterpreter(Interpreter):
+    def __init__(self):
+        self.void_plans = {} # node -> what VOID pushes for it, see void_plan
+
+    def run(self, node, context): # Runs a program, returns a RTEResult like Interpreter.run
+        try:
+            return RTEResult().success(self.execute(node, context))
+        except ErrorSignal as signal:
+            return RTEResult().failure(signal.error)
+
+    def kind(self, node): # Kind of a FlatAST view, which only subclasses the class of the node it stands for
+        node_type = getattr(type(node), 'node_type', None)
+        if node_type not in KINDS: raise Exception(f'No visit_{type(node).__name__} method defined')
+        KINDS[type(node)] = KINDS[node_type]
+        return KINDS[node_type]
+
+    def execute(self, node, context): # The value of the program, None when RETURN, BREAK or CONTINUE ends it
+        todo = [node]
+        values = []
+        unboxed = self.unboxed
+        binary_operation = self.binary_operation
+        void_plans = self.void_plans
+
+        while True:
+            try:
+                while todo:
+                    item = todo.pop()
+                    kind = KINDS.get(type(item))
+                    if kind is None: kind = self.kind(item)
+
+                    if kind == K_VAR_ACCESS:
+                        var_name = item.var_name_tok.value
+                        if item.slot is None:
+                            value = context.symbol_table.get(var_name)
+                        else:
+                            value = context.symbol_table.load(item.slot, var_name)
+
+                        if not value:
+                            raise ErrorSignal(RunTimeError(
+                                item.pos_start, item.pos_end,
+                                f"'{var_name}' is not defined",
+                                context
+                            ))
+
+                        values.append(value)
+
+                    elif kind == K_NUMBER:
+                        if item.value: values.append(item.value)
+                        else: values.append(make_number(item.tok.value))
+
+                    elif kind == K_BINARY:
+                        if item.numeric:
+                            try:
+                                values.append(make_number(unboxed(item, context)))
+                                continue
+                            except Deopt:
+                                pass
+                        if item.op_tok.type == TT_KEYWORD:
+                            todo.append((LOGIC, item))
+                        else:
+                            todo.append((BINARY, item))
+                            todo.append(item.right_node)
+                        todo.append(item.left_node)
+
+                    elif kind == K_CONTINUATION:
+                        code = item[0]
+
+                        if code == ASSIGN:
+                            _, node, void = item
+                            value = values.pop() if void else values[-1]
+                            if node.slot is None:
+                                context.symbol_table.set(node.var_name_tok.value, value)
+                            else:
+                                context.symbol_table.store(node.slot, node.var_name_tok.value, value)
+
+                        elif code == BINARY:
+                            node = item[1]
+                            right = values.pop()
+                            values[-1] = binary_operation(node, values[-1], right, context)
+
+                        elif code == CALL:
+                            node = item[1]
+                            count = len(node.arg_nodes)
+                            args = values[len(values) - count:]
+                            del values[len(values) - count:]
+                            value_to_call = values.pop()
+
+                            if type(value_to_call) is Function:
+                                context = self.call(value_to_call, args, node, todo, values, context)
+                            else:
+                                values.append(value_to_call.execute(args, context, node.pos_start, node.pos_end))
+
+                        elif code == RETURN_TO:
+                            context = item[1]
+
+                        elif code == VOID:
+                            node = item[1]
+                            plan = void_plans.get(node)
+                            if plan is None: plan = self.void_plan(node)
+                            todo.extend(plan)
+
+                        elif code == POP:
+                            values.pop()
+
+                        elif code == PUSH_NULL:
+                            values.append(Number.null)
+
+                        elif code == IF:
+                            _, node, i = item
+                            if values.pop().is_true():
+                                self.if_branch(node.cases[i][1], node.cases[i][2], todo)
+                            else:
+                                self.if_cases(node, i + 1, todo, values, context)
+
+                        elif code == RETURN:
+                            value = values.pop()
+                            context, marker = self.unwind(todo, values, context, RETURN_TO)
+                            if marker is None: return None
+                            values.append(value)
+
+                        elif code == UNARY:
+                            values[-1] = self.unary_operation(item[1], values[-1], context)
+
+                        elif code == LIST:
+                            _, node, count = item
+                            elements = values[len(values) - count:]
+                            del values[len(values) - count:]
+                            values.append(List(elements))
+
+                        elif code == WHILE_TEST:
+                            loop = item[1]
+                            if values.pop().is_true() == loop[6]:
+                                self.finish_loop(loop, values, context)
+                            else:
+                                self.push_iteration(loop, todo)
+
+                        elif code == LOGIC: # Like Interpreter.logic_operation
+                            node = item[1]
+                            left = values.pop().is_true()
+                            if left == (node.op_tok.keyword == KW_OR):
+                                values.append(Number.true if left else Number.false)
+                            else:
+                                todo.append(TRUTH_ITEM)
+                                todo.append(node.right_node)
+
+                        elif code == TRUTH:
+                            values[-1] = Number.true if values[-1].is_true() else Number.false
+
+                        elif code == VOID_LOOP_START:
+                            node = item[1]
+                            self.start_loop(node, KINDS[type(node)], VOID_LOOP, todo, values, context)
+
+                        elif code == FOR_RANGE_PREP:
+                            _, node, mode = item
+                            step_value = values.pop() if node.step_value_node else make_number(1)
+                            end_value = values.pop()
+                            start_value = values.pop()
+
+                            # The counter stays a raw python number, only the loop variable is boxed each pass
+                            i, end, step = start_value.value, end_value.value, step_value.value
+                            loop = [FOR_RANGE, node, mode, len(values), [], self.body_plan(node, mode), i, end, step, step >= 0]
+                            self.next_iteration(loop, todo, values, context)
+
+                        elif code == FOR_EACH_PREP:
+                            _, node, mode = item
+                            iterator = iter(values.pop().elements)
+                            loop = [FOR_EACH, node, mode, len(values), [], self.body_plan(node, mode), iterator]
+                            self.next_iteration(loop, todo, values, context)
+
+                    elif kind == K_CALL:
+                        todo.append((CALL, item))
+                        todo.extend(reversed(item.arg_nodes))
+                        todo.append(item.node_to_call)
+
+                    elif kind == K_IF:
+                        self.if_cases(item, 0, todo, values, context)
+
+                    elif kind == K_LOOP: # The body of a loop is done
+                        if item[2] == COLLECT_LOOP: item[4].append(values.pop())
+
+                        if item[0] == FOR_RANGE: # next_iteration for the loops that run the most
+                            i = item[6]
+                            if (i < item[7]) if item[9] else (i > item[7]):
+                                node = item[1]
+                                context.symbol_table.store(node.slot, node.var_name_tok.value, make_number(i))
+                                item[6] = i + item[8]
+                                todo.append(item)
+                                todo.extend(item[5])
+                                continue
+                        self.next_iteration(item, todo, values, context)
+
+                    elif kind == K_RETURN:
+                        if item.node_to_return:
+                            todo.append(RETURN_ITEM)
+                            todo.append(item.node_to_return)
+                        else:
+                            context, marker = self.unwind(todo, values, context, RETURN_TO)
+                            if marker is None: return None
+                            values.append(Number.null)
+
+                    elif kind == K_VAR_ASSIGN:
+                        todo.append((ASSIGN, item, False))
+                        todo.append(item.value_node)
+
+                    elif kind == K_STRING:
+                        if item.value: values.append(item.value)
+                        else: values.append(string_literal(item.tok.value))
+
+                    elif kind == K_UNARY:
+                        if item.numeric:
+                            try:
+                                values.append(make_number(unboxed(item, context)))
+                                continue
+                            except Deopt:
+                                pass
+                        todo.append((UNARY, item))
+                        todo.append(item.node)
+
+                    elif kind == K_LIST:
+                        element_nodes = item.element_nodes
+                        if element_nodes:
+                            todo.append((LIST, item, len(element_nodes)))
+                            todo.extend(reversed(element_nodes))
+                        else:
+                            values.append(List([]))
+
+                    elif kind == K_FUNCTION_DEFINITION:
+                        func_name = item.var_name_tok.value if item.var_name_tok else None
+                        arg_names = [arg_name_tok.value for arg_name_tok in item.arg_name_toks]
+                        func_value = Function(func_name, item.body_node, arg_names, item.auto_return, item.scope)
+
+                        if item.var_name_tok:
+                            context.symbol_table.store(item.slot, func_name, func_value)
+                        values.append(func_value)
+
+                    elif kind == K_FOR or kind == K_WHILE or kind == K_UNTIL:
+                        self.start_loop(item, kind, NULL_LOOP if item.return_null else COLLECT_LOOP, todo, values, context)
+
+                    elif kind == K_CONTINUE:
+                        context, loop = self.unwind(todo, values, context, LOOP)
+                        if loop is None: return None
+                        self.next_iteration(loop, todo, values, context)
+
+                    elif kind == K_BREAK:
+                        context, loop = self.unwind(todo, values, context, LOOP)
+                        if loop is None: return None
+                        self.finish_loop(loop, values, context)
+
+                return values.pop()
+
+            # BREAK and CONTINUE from code that ran through execute(), e.g. a MEMO function
+            except ContinueSignal:
+                context, loop = self.unwind(todo, values, context, LOOP)
+                if loop is None: return None
+                self.next_iteration(loop, todo, values, context)
+            except BreakSignal:
+                context, loop = self.unwind(todo, values, context, LOOP)
+                if loop is None: return None
+                self.finish_loop(loop, values, context)
+
+    ##################
+    # Calls
+    ##################
+
+    def call(self, function, args, node, todo, values, context): # Starts the body of a Function, returns its context
+        exec_ctx = function.generate_new_context(context, node.pos_start, node.pos_end)
+        function.check_and_populate_args(function.arg_names, args, exec_ctx) # Before the context can take the caller's place
+
+        # A tail call takes the place of the call it is returned from, like the loop in Function.execute
+        top = len(todo) - 1
+        if top >= 0 and todo[top] is RETURN_ITEM: top -= 1
+        if node.tail_call and top >= 0 and type(todo[top]) is tuple and todo[top][0] == RETURN_TO \
+                and todo[top][3] == len(values):
+            del todo[top + 1:]
+            function.replace_caller(exec_ctx, context)
+        else:
+            todo.append((RETURN_TO, context, node, len(values)))
+
+        if function.auto_return:
+            todo.append(function.body_node)
+        else:
+            todo.append(PUSH_NULL_ITEM)
+            todo.append((VOID, function.body_node))
+        return exec_ctx
+
+    def unwind(self, todo, values, context, target): # Pops todo back to the innermost LOOP or RETURN_TO
+        while todo:
+            item = todo.pop()
+            if type(item) is list:
+                if target == LOOP:
+                    del values[item[3]:]
+                    return context, item
+            elif type(item) is tuple and item[0] == RETURN_TO:
+                if target == RETURN_TO:
+                    del values[item[3]:]
+                    todo.append(item)
+                    return context, item
+                context = item[1] # BREAK and CONTINUE go on through the caller, like their signals
+        return context, None # Nothing to go back to, the program ends like Interpreter.run ends it
+
+    ##################
+    # Blocks
+    ##################
+
+    # What VOID pushes to evaluate node like Interpreter.visit_void, worked out once per node.
+    # The plans of the statements of a list are put together into one
+    def void_plan(self, node):
+        kind = KINDS.get(type(node))
+        if kind is None: kind = self.kind(node)
+
+        if kind == K_LIST:
+            plan = []
+            for element_node in reversed(node.element_nodes):
+                plan += self.void_plans.get(element_node) or self.void_plan(element_node)
+        elif kind == K_FOR or kind == K_WHILE or kind == K_UNTIL:
+            plan = [(VOID_LOOP_START, node)]
+        elif kind == K_VAR_ASSIGN:
+            plan = [(ASSIGN, node, True), node.value_node]
+        else:
+            plan = [POP_ITEM, node]
+
+        self.void_plans[node] = plan
+        return plan
+
+    def if_cases(self, node, start, todo, values, context): # Tests the cases from start on, up to one that is not numeric
+        cases = node.cases
+        for i in range(start, len(cases)):
+            condition, expr, return_null = cases[i]
+            if condition.numeric:
+                try:
+                    if self.unboxed(condition, context) != 0:
+                        return self.if_branch(expr, return_null, todo)
+                    continue
+                except Deopt:
+                    pass
+            todo.append((IF, node, i))
+            todo.append(condition)
+            return
+
+        if node.else_case:
+            self.if_branch(*node.else_case, todo)
+        else:
+            values.append(Number.null)
+
+    def if_branch(self, expr, return_null, todo):
+        if return_null:
+            todo.append(PUSH_NULL_ITEM)
+            todo.append((VOID, expr))
+        else:
+            todo.append(expr)
+
+    ##################
+    # Loops
+    ##################
+
+    def body_plan(self, node, mode): # What a loop pushes for its body every pass
+        if mode == COLLECT_LOOP: return [node.body_node]
+        return self.void_plans.get(node.body_node) or self.void_plan(node.body_node)
+
+    def start_loop(self, node, kind, mode, todo, values, context):
+        if kind == K_WHILE or kind == K_UNTIL:
+            loop = [WHILE, node, mode, len(values), [], self.body_plan(node, mode), kind == K_UNTIL]
+            self.next_iteration(loop, todo, values, context)
+        elif node.start_value_node and node.end_value_node:
+            todo.append((FOR_RANGE_PREP, node, mode))
+            if node.step_value_node: todo.append(node.step_value_node)
+            todo.append(node.end_value_node)
+            todo.append(node.start_value_node)
+        elif node.iterable_node:
+            todo.append((FOR_EACH_PREP, node, mode))
+            todo.append(node.iterable_node)
+        else:
+            self.finish_loop([FOR_RANGE, node, mode, len(values), [], []], values, context)
+
+    def next_iteration(self, loop, todo, values, context): # Starts the body again, or ends the loop
+        kind, node = loop[0], loop[1]
+
+        if kind == FOR_RANGE:
+            i = loop[6]
+            if (i < loop[7]) if loop[9] else (i > loop[7]):
+                context.symbol_table.store(node.slot, node.var_name_tok.value, make_number(i))
+                loop[6] = i + loop[8]
+                return self.push_iteration(loop, todo)
+
+        elif kind == FOR_EACH:
+            element = next(loop[6], STOP)
+            if element is not STOP:
+                context.symbol_table.store(node.slot, node.var_name_tok.value, element)
+                return self.push_iteration(loop, todo)
+
+        else:
+            condition = node.condition_node
+            if condition.numeric:
+                try:
+                    if (self.unboxed(condition, context) != 0) != loop[6]:
+                        return self.push_iteration(loop, todo)
+                    return self.finish_loop(loop, values, context)
+                except Deopt:
+                    pass
+            todo.append((WHILE_TEST, loop)) # The loop is not on todo while its condition runs, like in conditional_loop
+            todo.append(condition)
+            return
+
+        self.finish_loop(loop, values, context)
+
+    def push_iteration(self, loop, todo):
+        todo.append(loop)
+        todo.extend(loop[5])
+
+    def finish_loop(self, loop, values, context):
+        mode, node = loop[2], loop[1]
+        if mode == NULL_LOOP:
+            values.append(Number.null)
+        elif mode == COLLECT_LOOP:
+            values.append(List(loop[4]))
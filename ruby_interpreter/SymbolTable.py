@@ -10,11 +10,89 @@ class SymbolTable:
     def get(self, name):                        # get value from certain variable name
         value = self.symbols.get(name,None)     # get name or default value of None
         if value == None and self.parent:       # If there's a value is None and theres a parent, return the global value
-            return self.parent.get(name)
+            return lookup(self.parent, name)
         return value                            # otherwise return the local value
 
     def set(self, name, value):
         self.symbols[name] = value
     
     def remove(self,name):
-        del self.symbols[name]
\ No newline at end of file
+        del self.symbols[name]
+
+    def set_parent(self, parent):
+        self.parent = parent
+
+    def names(self): # Names that currently have a value here, not counting the parent
+        return [name for name, value in self.symbols.items() if value is not None]
+    # Variable access by slot. Only a Frame actually uses the slot,
+    # a SymbolTable just looks the name up in its dict
+    def load(self, slot, name):
+        return self.get(name)
+
+    def store(self, slot, name, value):
+        self.set(name, value)
+
+
+# Every name the scope of some function binds, added as the Function values are made. Only a Frame
+# of such a function can have a value for one, any other name is found past every Frame in the chain
+FRAME_NAMES = set()
+
+# Symbol table of a single function call.
+# The Resolver gave every name the function binds a slot, so the values are kept
+# in a list sized once per call instead of a dict, and nodes inside the function
+# read them by index. Names the function does not bind still go to the parent.
+class Frame(SymbolTable):
+    def __init__(self, scope, parent = None):
+        self.scope = scope                  # name -> slot, shared by every call of the function
+        self.slots = [None] * len(scope)
+        self.set_parent(parent)
+
+    def set_parent(self, parent):
+        self.parent = parent
+        # The first table up the chain that is not another call of the same function. Those calls
+        # can not bind a name the function does not bind either, so a recursion skips all of them at once
+        self.outer = parent.outer if type(parent) is Frame and parent.scope is self.scope else parent
+        # The first table up the chain that is not a Frame at all, where a name no function binds is looked up.
+        # A mutual recursion alternates functions, so outer skips nothing there, but this skips every call
+        self.base = parent.base if type(parent) is Frame else parent
+
+    def get(self, name):
+        slot = self.scope.get(name)
+        value = None if slot is None else self.slots[slot]
+        if value is None and self.parent:
+            if slot is not None: return lookup(self.parent, name)
+            return lookup(self.outer if name in FRAME_NAMES else self.base, name)
+        return value
+
+    def set(self, name, value):
+        self.slots[self.scope[name]] = value
+
+    def remove(self, name):
+        self.slots[self.scope[name]] = None
+
+    def names(self):
+        return [name for name, slot in self.scope.items() if self.slots[slot] is not None]
+
+    def load(self, slot, name):
+        value = self.slots[slot]
+        if value is None and self.parent:       # Not assigned in this call yet, look in the callers
+            return lookup(self.parent, name)
+        return value
+
+    def store(self, slot, name, value):
+        self.slots[slot] = value
+
+
+def lookup(table, name): # SymbolTable.get up the chain of parents in a loop, which a deep recursion makes long
+    while table is not None:
+        if type(table) is Frame:
+            slot = table.scope.get(name)
+            if slot is None:
+                table = table.outer if name in FRAME_NAMES else table.base
+                continue
+            value = table.slots[slot]
+        else:
+            value = table.symbols.get(name)
+        if value is not None: return value
+        table = table.parent
+    return None
@@ -15,22 +15,25 @@ LETTERS_DIGITS = LETTERS + '0123456789'
 #   TOKENS
 ###############
 
+# Token types are small ints so the Parser compares them with integer compares,
+# TOKEN_NAMES has the name of each one for printing
+
 # Algebraic
-TT_ADD          = 'ADD'
-TT_SUBTRACT     = 'SUBTRACT'
-TT_MULTIPLY     = 'MULTIPLY'
-TT_DIVIDE       = 'DIVIDE'
-TT_EOF          = 'EOF'
-TT_FLOAT        = 'FLOAT'
-TT_INT          = 'INT'
-TT_POWER        = 'POWER'
-TT_LPAREN       = 'LPAREN'
-TT_RPAREN       = 'RPAREN'
+TT_ADD          = 0
+TT_SUBTRACT     = 1
+TT_MULTIPLY     = 2
+TT_DIVIDE       = 3
+TT_EOF          = 4
+TT_FLOAT        = 5
+TT_INT          = 6
+TT_POWER        = 7
+TT_LPAREN       = 8
+TT_RPAREN       = 9
 
 # Variables
-TT_IDENTIFIER   = 'IDENTIFIER'
-TT_KEYWORD      = 'KEYWORD'
-TT_EQ           = 'EQ'
+TT_IDENTIFIER   = 10
+TT_KEYWORD      = 11
+TT_EQ           = 12
 
 '''
     VAR          variable_name       =  <expr>
@@ -39,12 +42,12 @@ TT_EQ           = 'EQ'
 '''
 # Comparison Operators
 
-TT_GREATER_THAN         = 'GT'
-TT_LESS_THAN            = 'LT'
-TT_EQUALS_TO            = 'EE'
-TT_GREATER_THAN_EQUALS  = 'GTE'
-TT_LESS_THAN_EQUALS     = 'LTE'
-TT_NE                   = 'NE'
+TT_GREATER_THAN         = 13
+TT_LESS_THAN            = 14
+TT_EQUALS_TO            = 15
+TT_GREATER_THAN_EQUALS  = 16
+TT_LESS_THAN_EQUALS     = 17
+TT_NE                   = 18
 
 
 KEYWORDS = ['AND',
@@ -70,21 +73,33 @@ KEYWORDS = ['AND',
             ]
 
 # Functions
-TT_COMMA = 'COMMA'
-TT_ARROW = 'ARROW'
+TT_COMMA = 19
+TT_ARROW = 20
 
 # Strings
-TT_STRING = 'STRING'
+TT_STRING = 21
 
 # Lists
-TT_LSQUARE = 'LSQUARE'
-TT_RSQUARE = 'RSQUARE'
+TT_LSQUARE = 22
+TT_RSQUARE = 23
 
 # Line Tokens
-TT_NEWLINE = 'NEWLINE'
+TT_NEWLINE = 24
 
 # iteratable
-TT_DOTDOT = 'DOTDOT'
+TT_DOTDOT = 25
+
+TOKEN_NAMES = ['ADD', 'SUBTRACT', 'MULTIPLY', 'DIVIDE', 'EOF', 'FLOAT', 'INT', 'POWER', 'LPAREN', 'RPAREN',
+               'IDENTIFIER', 'KEYWORD', 'EQ', 'GT', 'LT', 'EE', 'GTE', 'LTE', 'NE',
+               'COMMA', 'ARROW', 'STRING', 'LSQUARE', 'RSQUARE', 'NEWLINE', 'DOTDOT']
+
+# Keyword IDs, the lexer looks the ID up once and stores it in Token.keyword
+(KW_AND, KW_OR, KW_NOT, KW_IF, KW_THEN, KW_ELSIF, KW_ELSE, KW_WHILE, KW_FUNC, KW_FOR, KW_IN, KW_TO,
+ KW_FUN, KW_STEP, KW_END, KW_RETURN, KW_CONTINUE, KW_BREAK, KW_DO, KW_UNTIL) = range(len(KEYWORDS))
+KEYWORD_IDS = {keyword: i for i, keyword in enumerate(KEYWORDS)}
+
+# The Parser checks for VAR and ELIF, which are not in KEYWORDS, so no token ever has these IDs
+KW_VAR = KW_ELIF = -1
 
 ###############
 # TOKEN CLASS #
@@ -93,31 +108,34 @@ TT_DOTDOT = 'DOTDOT'
 '''
 The token class specifies the type and value of the character
 class Token(object):
-    self.type = type    # token type
+    self.type = type    # token type, one of the TT_* ints
     self.value = value  # value of token
+    self.keyword = keyword  # KW_* ID if the token is a keyword
 
-    self.pos_start = None   # Entry for Position class optional, if there is, the position class of the Token is copied
-    self.pos_end = None     # Entry for Position class optional, if there is, the position class of the Token is copied and advanced
+    self.pos_start = None   # Entry for Position class optional, positions never change so they are shared, not copied
+    self.pos_end = None     # Entry for Position class optional, the start advanced by one if there is only a start
 '''
 
 class Token(object):
-    def __init__(self, type, value=None, pos_start = None, pos_end = None):
+    __slots__ = ('type', 'value', 'pos_start', 'pos_end', 'keyword')
+
+    def __init__(self, type, value=None, pos_start = None, pos_end = None, keyword = None):
         self.type = type
         self.value = value
+        self.keyword = keyword # KW_* ID of a keyword token, None otherwise
+        self.pos_start = self.pos_end = None
 
-        if pos_start: # If there's start position, assign the start as the current position and the end the advance() of the current position
-            self.pos_start = pos_start.copy()
-            self.pos_end = pos_start.copy()
-            self.pos_end.advance()
+        if pos_start: # If there's start position, the token starts there and ends one character later
+            self.pos_start = pos_start
+            self.pos_end = pos_start.advance()
 
         if pos_end: # If there's a end position provided, make start and end the given end position
-            self.pos_end = pos_end.copy() 
-            self.pos_start = pos_end.copy()
+            self.pos_end = pos_end
+            self.pos_start = pos_end
     
     def matches(self, type_, value):
-        return self.type == type_ and self.value.upper() == value
+        return self.type == type_ and self.keyword is not None and self.keyword == KEYWORD_IDS.get(value)
 
     def __repr__(self):
-        if self.value: return f'{self.type}:{self.value}'
-        return f'{self.type}'
-
+        if self.value: return f'{TOKEN_NAMES[self.type]}:{self.value}'
+        return f'{TOKEN_NAMES[self.type]}'
@@ -0,0 +1,611 @@
+import re
+from RTEResult import RTEResult, BreakSignal, ContinueSignal
+from Errors import RunTimeError
+from Context import Context
+from Token import *
+from Nodes import *
+import TranspilerRuntime as runtime
+
+###################
+#   TRANSPILER
+###################
+
+# Translates the AST into python source, compiles it with compile() and runs it as native bytecode.
+#
+# The source is three-address code: every operator and call gets its own line and a temporary,
+# and line_nodes maps each generated line back to the node it came from. When something fails,
+# the line numbers in the python traceback give the node positions and the chain of call sites,
+# which is all RunTimeError.generate_traceback needs.
+#
+# Scoping follows the Interpreter: assignments are always local, and reads fall back to the
+# callers' variables. Locals of functions are python locals. A name that some function assigns
+# but another function reads without assigning it is looked up through the calling frames
+# (runtime.dynamic), and so is a local read before the function has surely assigned it.
+# Top level names are python globals, kept in step with the program's SymbolTable by
+# runtime.Globals, so the shell and scripts loaded with RUN or REQUIRE see them.
+
+COMPARISONS = {
+    TT_GREATER_THAN: ('>', 'gt'),
+    TT_GREATER_THAN_EQUALS: ('>=', 'gte'),
+    TT_LESS_THAN: ('<', 'lt'),
+    TT_LESS_THAN_EQUALS: ('<=', 'lte'),
+    TT_EQUALS_TO: ('==', 'eq'),
+    TT_NE: ('!=', 'ne'),
+}
+
+ARITHMETIC = {
+    TT_ADD: ('+', 'add'),
+    TT_SUBTRACT: ('-', 'sub'),
+    TT_MULTIPLY: ('*', 'mul'),
+    TT_DIVIDE: ('/', 'div'),
+    TT_POWER: ('**', 'power'),
+}
+
+ASSIGNING_NODES = (VarAssignNode, ForNode, FunctionDefinitionNode)
+
+
+class Scope: # Names assigned and read directly in a function body or the program
+    def __init__(self):
+        self.assigned = set()
+        self.read = set()
+
+
+class Transpiler:
+    file_count = 0
+
+    def __init__(self):
+        Transpiler.file_count += 1
+        self.file_name = f'<transpiled {Transpiler.file_count}>'
+        self.lines = []         # [indent, text, node]
+        self.indent = 0
+        self.temp_count = 0
+        self.function_count = 0
+        self.function_names = {'_program': '<program>'} # python name -> script name
+        self.loop_depth = 0
+        self.scope = None
+        self.scopes = {}        # FunctionDefinitionNode (or None for the program) -> Scope
+        self.assigned_cache = {}
+        self.definite = set()   # Locals of the current function that are surely assigned at this point
+        self.unbound = set()    # Locals of the current function read where they may not be assigned yet
+
+    ##################
+    # Running
+    ##################
+
+    def run(self, node, context):
+        source, line_nodes = self.transpile(node)
+        namespace = {name: getattr(runtime, name) for name in dir(runtime) if not name.startswith('__')}
+        program_globals = runtime.Globals(namespace, context)
+        program_globals.load()
+
+        exec(compile(source, self.file_name, 'exec'), namespace)
+        try:
+            result = namespace['_program']()
+        except runtime.ScriptError as exception:
+            return RTEResult().failure(self.make_error(exception, line_nodes))
+        except NameError as exception:
+            if not self.is_undefined_variable(exception): raise # A bug in the generated code
+            return RTEResult().failure(self.make_error(exception, line_nodes))
+        except (BreakSignal, ContinueSignal): # From a function called outside of any loop
+            return RTEResult().success(None)
+        finally:
+            program_globals.store()
+
+        if result is None: return RTEResult().success(None)
+        return RTEResult().success(runtime.box(result))
+
+    # Only a top level or free name a script reads before anything defined it makes a NameError.
+    # Locals of functions are always bound before they are read, UnboundLocalError is never the script's
+    def is_undefined_variable(self, exception):
+        if type(exception) is not NameError: return False
+        tb = exception.__traceback__
+        while tb.tb_next: tb = tb.tb_next
+        return tb.tb_frame.f_code.co_filename == self.file_name and self.variable_name(exception).startswith('v_')
+
+    def variable_name(self, exception):
+        return exception.name or re.search(r"'(\w+)'", str(exception)).group(1)
+
+    # Rebuilds the RunTimeError the Interpreter would have made from the python traceback
+    def make_error(self, exception, line_nodes):
+        frames = []
+        tb = exception.__traceback__
+        while tb:
+            code = tb.tb_frame.f_code
+            if code.co_filename == self.file_name:
+                frames.append((self.function_names[code.co_name], line_nodes[tb.tb_lineno - 1]))
+            tb = tb.tb_next
+
+        context, entry_pos = None, None
+        for display_name, line_node in frames: # every outer frame stopped on the line of a call
+            context = Context(display_name, context, entry_pos)
+            entry_pos = line_node.pos_start if line_node else None
+
+        node = frames[-1][1]
+        if isinstance(exception, NameError):
+            python_name = self.variable_name(exception)
+            var_node = self.find_var_access(node, python_name) or node
+            return RunTimeError(var_node.pos_start, var_node.pos_end, f"'{python_name[2:]}' is not defined", context)
+
+        pos_node = node.right_node if exception.at == 'right' else node
+        if exception.builtin:
+            context = Context(exception.builtin, context, node.pos_start)
+        return RunTimeError(pos_node.pos_start, pos_node.pos_end, exception.details, context)
+
+    def find_var_access(self, node, python_name):
+        if isinstance(node, VarAccessNode) and 'v_' + node.var_name_tok.value == python_name:
+            return node
+        for child in children(node):
+            if isinstance(child, FunctionDefinitionNode): continue
+            found = self.find_var_access(child, python_name)
+            if found: return found
+        return None
+
+    ##################
+    # Analysis
+    ##################
+
+    def collect_scopes(self, node, scope): # Walks with its own stack, a long chain of operators nests as deep as it is long
+        stack = [(node, scope)]
+        while stack:
+            node, scope = stack.pop()
+            if isinstance(node, VarAccessNode):
+                scope.read.add(node.var_name_tok.value)
+            elif isinstance(node, VarAssignNode):
+                scope.assigned.add(node.var_name_tok.value)
+            elif isinstance(node, ForNode):
+                scope.assigned.add(node.var_name_tok.value)
+            elif isinstance(node, FunctionDefinitionNode):
+                if node.var_name_tok: scope.assigned.add(node.var_name_tok.value)
+                function_scope = Scope()
+                function_scope.assigned.update(arg_name.value for arg_name in node.arg_name_toks)
+                self.scopes[node] = function_scope
+                stack.append((node.body_node, function_scope))
+                continue
+
+            stack.extend((child, scope) for child in reversed(children(node)))
+
+    def assigned_names(self, node): # Names a node may assign to, not counting nested function bodies
+        stack = [(node, False)] # A node comes back with True once the names of its children are cached
+        while stack:
+            current, children_done = stack.pop()
+            if id(current) in self.assigned_cache: continue
+            nested = () if isinstance(current, FunctionDefinitionNode) else children(current)
+            if not children_done:
+                stack.append((current, True))
+                stack.extend((child, False) for child in nested)
+                continue
+
+            names = set()
+            if isinstance(current, ASSIGNING_NODES) and current.var_name_tok:
+                names.add(current.var_name_tok.value)
+            for child in nested:
+                names |= self.assigned_cache[id(child)]
+            self.assigned_cache[id(current)] = names
+        return self.assigned_cache[id(node)]
+
+    # Names a function reads that neither it nor a function defined in it around the read binds,
+    # what the MEMO purity check looks up
+    def free_names(self, node):
+        names, stack = set(), [(node.body_node, self.scopes[node].assigned)]
+        while stack:
+            node, bound = stack.pop()
+            if isinstance(node, FunctionDefinitionNode):
+                stack.append((node.body_node, bound | self.scopes[node].assigned))
+                continue
+            if isinstance(node, VarAccessNode) and node.var_name_tok.value not in bound:
+                names.add(node.var_name_tok.value)
+            stack.extend((child, bound) for child in children(node))
+        return names
+
+    ##################
+    # Output
+    ##################
+
+    def transpile(self, node):
+        program_scope = Scope()
+        self.scopes[None] = program_scope
+        self.collect_scopes(node, program_scope)
+
+        function_scopes = [scope for key, scope in self.scopes.items() if key is not None]
+        self.function_locals = set().union(*[scope.assigned for scope in function_scopes])
+
+        self.scope = program_scope
+        self.emit('def _program():')
+        self.indent += 1
+        if program_scope.assigned:
+            self.emit('global ' + ', '.join('v_' + name for name in sorted(program_scope.assigned)))
+        self.emit('_result = []')
+        for statement in node.element_nodes:
+            self.emit(f'_result.append({self.expr(statement)})', statement)
+        self.emit('return _result')
+
+        source = '\n'.join('    ' * indent + text for indent, text, _ in self.lines) + '\n'
+        return source, [line_node for _, _, line_node in self.lines]
+
+    def emit(self, text, node=None):
+        self.lines.append([self.indent, text, node])
+
+    def temp(self):
+        self.temp_count += 1
+        return f'_t{self.temp_count}'
+
+    def assign_temp(self, text, node):
+        name = self.temp()
+        self.emit(f'{name} = {text}', node)
+        return name
+
+    def begin_block(self):
+        self.indent += 1
+        return len(self.lines)
+
+    def end_block(self, start):
+        if len(self.lines) == start: self.emit('pass')
+        self.indent -= 1
+
+    ##################
+    # Expressions
+    ##################
+
+    # Returns a python name or literal holding the node's value
+    def expr(self, node):
+        method_name = f'expr_{type(node).__name__}'
+        method = getattr(self, method_name, self.no_transpile_method)
+        return method(node)
+
+    def no_transpile_method(self, node):
+        raise Exception(f'No expr_{type(node).__name__} method defined')
+
+    # Evaluates a list of nodes left to right. A plain variable read is copied into
+    # a temporary if a later node could assign to that variable first.
+    def operands(self, nodes):
+        atoms = []
+        for i, node in enumerate(nodes):
+            atom = self.expr(node)
+            if isinstance(node, VarAccessNode) and any(
+                    node.var_name_tok.value in self.assigned_names(later) for later in nodes[i + 1:]):
+                atom = self.assign_temp(atom, node)
+            atoms.append(atom)
+        return atoms
+
+    def expr_NumberNode(self, node):
+        if node.tok.value < 0: return f'({node.tok.value!r})' # Folded by the Optimizer, keeps -2 ** 2 right
+        return repr(node.tok.value)
+
+    def expr_StringNode(self, node):
+        return repr(node.tok.value)
+
+    def expr_VarAccessNode(self, node):
+        name = node.var_name_tok.value
+        if self.scope is self.scopes[None]: return 'v_' + name
+        if name in self.scope.assigned:
+            if name in self.definite: return 'v_' + name
+            # Until this call assigns it, the name is still the callers' variable, e.g. x = x + 1
+            self.unbound.add(name)
+            return self.assign_temp(f"v_{name} if v_{name} is not None else dynamic('v_{name}')", node)
+        if name in self.function_locals:
+            return self.assign_temp(f"dynamic('v_{name}')", node)
+        return 'v_' + name
+
+    def expr_VarAssignNode(self, node):
+        value = self.expr(node.value_node)
+        self.emit(f'v_{node.var_name_tok.value} = {value}', node)
+        self.definite.add(node.var_name_tok.value)
+        return f'v_{node.var_name_tok.value}'
+
+    def int_check(self, *atoms): # Python condition that holds when every atom is an int
+        names = [atom for atom in atoms if not atom.isdigit()]
+        if not names: return 'True'
+        return ' and '.join(f'type({name}) is int' for name in names)
+
+    # The int only version of an operation, falling back to the runtime helper for anything else
+    def guarded(self, fast, guard, slow):
+        if guard == 'True': return f'({fast})'
+        return f'(({fast}) if {guard} else {slow})'
+
+    def binary_text(self, node, left, right):
+        op_type = node.op_tok.type
+        if op_type in COMPARISONS:
+            op, helper = COMPARISONS[op_type]
+            return self.guarded(f'1 if {left} {op} {right} else 0', self.int_check(left, right), f'{helper}({left}, {right})')
+        if op_type in ARITHMETIC:
+            op, helper = ARITHMETIC[op_type]
+            guard = self.int_check(left, right)
+            if op_type == TT_DIVIDE and right == '0':
+                return f'{helper}({left}, {right})'
+            if op_type == TT_DIVIDE and not right.isdigit():
+                guard = f'{guard} and {right}' if guard != 'True' else right
+            return self.guarded(f'{left} {op} {right}', guard, f'{helper}({left}, {right})')
+        raise Exception(f'No binary operation defined for {node.op_tok}')
+
+    # a + b + c + ... nests on the left as deep as it is long, so the chain is walked down in a loop
+    # and every operator after the first takes the temporary of the one before it as its left operand
+    def expr_BinaryOperatorNode(self, node):
+        if node.op_tok.type == TT_KEYWORD: return self.logic(node)
+        chain = [node]
+        while isinstance(chain[-1].left_node, BinaryOperatorNode) and chain[-1].left_node.op_tok.type != TT_KEYWORD:
+            chain.append(chain[-1].left_node)
+
+        first = chain.pop()
+        left, right = self.operands([first.left_node, first.right_node])
+        result = self.assign_temp(self.binary_text(first, left, right), first)
+        while chain:
+            node = chain.pop()
+            result = self.assign_temp(self.binary_text(node, result, self.expr(node.right_node)), node)
+        return result
+
+    # AND and OR: 1 or 0, the lines of the right operand only run when the left one does not decide
+    def logic(self, node):
+        result = self.temp()
+        is_and = node.op_tok.keyword == KW_AND
+        self.emit(f'if {self.condition(node.left_node)}:', node)
+        definite = set(self.definite) # The right operand may not run
+        start = self.begin_block()
+        if is_and:
+            self.emit(f'{result} = 1 if {self.condition(node.right_node)} else 0', node)
+        else:
+            self.emit(f'{result} = 1')
+        self.end_block(start)
+        self.emit('else:')
+        start = self.begin_block()
+        if is_and:
+            self.emit(f'{result} = 0')
+        else:
+            self.emit(f'{result} = 1 if {self.condition(node.right_node)} else 0', node)
+        self.end_block(start)
+        self.definite = definite
+        return result
+
+    def expr_UnaryOpNode(self, node):
+        value = self.expr(node.node)
+        if node.op_tok.type == TT_SUBTRACT:
+            return self.assign_temp(self.guarded(f'{value} * -1', self.int_check(value), f'neg({value})'), node)
+        if node.op_tok.keyword == KW_NOT:
+            return self.assign_temp(self.guarded(f'1 if {value} == 0 else 0', self.int_check(value), f'notted({value})'), node)
+        return value
+
+    def expr_ListNode(self, node):
+        return self.assign_temp('[' + ', '.join(self.operands(node.element_nodes)) + ']', node)
+
+    # Python expression for a condition, comparisons are used as is
+    def condition(self, node):
+        if isinstance(node, BinaryOperatorNode) and node.op_tok.type in COMPARISONS:
+            left, right = self.operands([node.left_node, node.right_node])
+            return self.binary_text(node, left, right)
+        value = self.expr(node)
+        return self.guarded(value, self.int_check(value), f'truth({value})')
+
+    def expr_IfNode(self, node):
+        result = self.temp()
+        self.if_expr(node, result)
+        return result
+
+    def if_expr(self, node, result):
+        if not node.cases: # Every condition was folded away by the Optimizer
+            if node.else_case:
+                self.branch(*node.else_case, result)
+            elif result:
+                self.emit(f'{result} = 0')
+            return
+
+        depth = 0
+        for i, (condition, expr, return_null) in enumerate(node.cases):
+            if i == 0:
+                self.emit(f'if {self.condition(condition)}:', condition)
+                definite = set(self.definite) # Only the first condition surely runs
+            else:
+                else_line = len(self.lines)
+                self.emit('else:')
+                start = self.begin_block()
+                test = self.condition(condition)
+                if len(self.lines) == start: # Nothing had to be computed first, so this can be an elif
+                    self.lines[else_line][1:] = [f'elif {test}:', condition]
+                    self.indent -= 1
+                else:
+                    self.emit(f'if {test}:', condition)
+                    depth += 1
+
+            branch_definite = set(self.definite)
+            start = self.begin_block()
+            self.branch(expr, return_null, result)
+            self.end_block(start)
+            self.definite = branch_definite
+
+        if node.else_case or result:
+            self.emit('else:')
+            start = self.begin_block()
+            if node.else_case:
+                self.branch(*node.else_case, result)
+            else:
+                self.emit(f'{result} = 0')
+            self.end_block(start)
+
+        self.indent -= depth
+        self.definite = definite
+
+    def branch(self, expr, return_null, result):
+        if return_null or not result:
+            self.statement(expr)
+            if result: self.emit(f'{result} = 0')
+        else:
+            self.emit(f'{result} = {self.expr(expr)}')
+
+    # A BREAK or CONTINUE outside of a loop in a called function raises BREAK or CONTINUE,
+    # which the nearest loop around the call takes like its own, as in the Interpreter
+    def loop_body(self, node, result):
+        self.loop_depth += 1
+        definite = set(self.definite) # The body may not run at all
+        if isinstance(node, ForNode): self.definite.add(node.var_name_tok.value)
+
+        calls = self.has_call(node.body_node)
+        if calls:
+            self.indent += 1
+            self.emit('try:')
+        start = self.begin_block()
+        if node.return_null or not result:
+            self.statement(node.body_node)
+        else:
+            self.emit(f'{result}.append({self.expr(node.body_node)})')
+        self.end_block(start)
+        if calls:
+            self.emit('except BreakSignal: break')
+            self.emit('except ContinueSignal: continue')
+            self.indent -= 1
+
+        self.definite = definite
+        self.loop_depth -= 1
+
+    def has_call(self, node): # Whether running the node can call a function, not counting the bodies it defines
+        if isinstance(node, CallNode): return True
+        if isinstance(node, FunctionDefinitionNode): return False
+        return any(self.has_call(child) for child in children(node))
+
+    # Loops only collect their values when they are used as an expression
+    def expr_ForNode(self, node):
+        return self.loop_expr(node, self.for_loop)
+
+    def expr_WhileNode(self, node):
+        return self.loop_expr(node, self.while_loop)
+
+    def expr_UntilNode(self, node):
+        return self.loop_expr(node, self.until_loop)
+
+    def loop_expr(self, node, loop):
+        if node.return_null:
+            loop(node, None)
+            return '0'
+        result = self.temp()
+        self.emit(f'{result} = []')
+        loop(node, result)
+        return result
+
+    def for_loop(self, node, result):
+        var_name = 'v_' + node.var_name_tok.value
+
+        if node.iterable_node:
+            iterable = self.expr(node.iterable_node)
+            self.emit(f'for {var_name} in ({iterable} if type({iterable}) is list else elements({iterable})):', node)
+        else:
+            start, end = self.operands([node.start_value_node, node.end_value_node])
+            step = self.expr(node.step_value_node) if node.step_value_node else '1'
+            guard = self.int_check(start, end, step)
+            if step == '0':
+                guard = 'False'
+            elif not step.isdigit():
+                guard = f'{guard} and {step}' if guard != 'True' else step
+            steps = self.guarded(f'range({start}, {end}, {step})', guard, f'count({start}, {end}, {step})')
+            self.emit(f'for {var_name} in {steps}:', node)
+
+        self.loop_body(node, result)
+
+    def while_loop(self, node, result, until=False):
+        loop_line = len(self.lines)
+        self.emit('while True:')
+        start = self.begin_block()
+        test = self.condition(node.condition_node)
+        if until: test = f'not {test}'
+
+        if len(self.lines) == start: # The condition fits on the loop line
+            self.lines[loop_line][1:] = [f'while {test}:', node.condition_node]
+        else:
+            self.emit(f'if not ({test}): break', node.condition_node)
+        self.indent -= 1
+        self.loop_body(node, result)
+
+    def until_loop(self, node, result):
+        self.while_loop(node, result, until=True)
+
+    def expr_FunctionDefinitionNode(self, node):
+        self.function_count += 1
+        python_name = f'f_{self.function_count}'
+        script_name = node.var_name_tok.value if node.var_name_tok else '<anonymous>'
+        self.function_names[python_name] = script_name
+
+        arg_names, copies = [], []
+        for i, arg_name in enumerate(node.arg_name_toks): # a repeated argument name keeps the last value
+            if 'v_' + arg_name.value in arg_names:
+                arg_names.append(f'_arg{i}')
+                copies.append(f'v_{arg_name.value} = _arg{i}')
+            else:
+                arg_names.append('v_' + arg_name.value)
+
+        outer = self.scope, self.loop_depth, self.definite, self.unbound
+        self.scope, self.loop_depth = self.scopes[node], 0
+        self.definite = {arg_name.value for arg_name in node.arg_name_toks}
+        self.unbound = set()
+
+        self.emit(f'def {python_name}({", ".join(arg_names)}):')
+        start = self.begin_block()
+        for copy in copies: self.emit(copy)
+        if node.auto_return:
+            self.emit(f'return {self.expr(node.body_node)}', node.body_node)
+        else:
+            self.statement(node.body_node)
+            self.emit('return 0')
+        if self.unbound: # None until assigned, which runtime.dynamic skips like an empty Frame slot
+            self.lines.insert(start + len(copies), [self.indent, ' = '.join('v_' + name for name in sorted(self.unbound)) + ' = None', None])
+        self.end_block(start)
+
+        self.scope, self.loop_depth, self.definite, self.unbound = outer
+        free_names = tuple(sorted(self.free_names(node)))
+        bound_names = tuple(sorted(self.scopes[node].assigned))
+        self.emit(f'function({python_name}, {script_name!r}, {len(arg_names)}, {free_names!r}, {bound_names!r})')
+        if node.var_name_tok:
+            self.emit(f'v_{node.var_name_tok.value} = {python_name}', node)
+        return python_name
+
+    def expr_CallNode(self, node):
+        return self.assign_temp(self.call_text(node), node)
+
+    def call_text(self, node):
+        atoms = self.operands([node.node_to_call] + node.arg_nodes)
+        func, args = atoms[0], atoms[1:]
+        return f"{func}({', '.join(args)}) if getattr({func}, 'arity', -1) == {len(args)} else bad_call({func}, {len(args)})"
+
+    def expr_ReturnNode(self, node):
+        value = self.expr(node.node_to_return) if node.node_to_return else '0'
+        if self.scope is self.scopes[None]:
+            self.emit(value, node)
+            self.emit('return None') # a RETURN in the program itself ends it without a value
+        else:
+            self.emit(f'return {value}', node)
+        return '0'
+
+    def expr_ContinueNode(self, node):
+        return self.jump_out_of_loop(node, 'continue')
+
+    def expr_BreakNode(self, node):
+        return self.jump_out_of_loop(node, 'break')
+
+    def jump_out_of_loop(self, node, keyword):
+        if self.loop_depth:
+            self.emit(keyword, node)
+        elif self.scope is not self.scopes[None]: # Leaves the function for the loop around the call
+            self.emit(f'raise {keyword.upper()}', node)
+        else: # BREAK or CONTINUE outside of any loop stops the program
+            return self.expr_ReturnNode(ReturnNode(None, node.pos_start, node.pos_end))
+        return '0'
+
+    ##################
+    # Statements
+    ##################
+
+    # Emits a node whose value is thrown away
+    def statement(self, node):
+        if isinstance(node, ListNode):
+            for element_node in node.element_nodes:
+                self.statement(element_node)
+        elif isinstance(node, IfNode):
+            self.if_expr(node, None)
+        elif isinstance(node, ForNode):
+            self.for_loop(node, None)
+        elif isinstance(node, WhileNode):
+            self.while_loop(node, None)
+        elif isinstance(node, UntilNode):
+            self.until_loop(node, None)
+        elif isinstance(node, CallNode):
+            self.emit(self.call_text(node), node)
+        elif isinstance(node, VarAccessNode):
+            atom = self.expr(node)
+            if atom.startswith('v_'): self.emit(atom, node) # still fails if it is not defined
+        else:
+            self.expr(node)
@@ -0,0 +1,390 @@
+import sys
+from types import FunctionType
+from RTEResult import ErrorSignal, BreakSignal, ContinueSignal, BREAK, CONTINUE
+from Errors import RunTimeError
+from Value import *
+
+##########################
+#   TRANSPILER RUNTIME
+##########################
+
+# Helpers called by code from Transpiler. Values are plain python objects:
+#   Number -> int / float, String -> str, List -> list, functions -> python functions
+# The generated code inlines the int/int case of every operator and only calls
+# these helpers for everything else, so they mirror the Value methods exactly.
+
+class ScriptError(Exception): # Turned into a RunTimeError by Transpiler.run
+    def __init__(self, details, at='node', builtin=None):
+        self.details = details
+        self.at = at            # 'node' for the whole node, 'right' for the right operand
+        self.builtin = builtin  # name of the built-in function that failed, if any
+
+
+def is_number(value):
+    return type(value) is int or type(value) is float
+
+def illegal_operation():
+    raise ScriptError('Illegal operation')
+
+
+##################
+# Operators
+##################
+
+def add(a, b):
+    if is_number(a):
+        if is_number(b) or type(b) is str: return a + b
+    elif type(a) is str:
+        if type(b) is str: return a + b
+    elif type(a) is list: # List.added_to appends to the same list
+        a.append(b)
+        return a
+    illegal_operation()
+
+def sub(a, b):
+    if is_number(a):
+        if is_number(b) or type(b) is str: return a - b
+    elif type(a) is list:
+        if type(b) is list: # List.subbed_by can never pop with a list index
+            raise ScriptError("Element at this index can not be removed, index is out of bounds", 'right')
+    illegal_operation()
+
+def mul(a, b):
+    if is_number(a):
+        if is_number(b) or type(b) is str: return a * b
+    elif type(a) is str:
+        if is_number(b): return a * b
+    elif type(a) is list:
+        if type(b) is list:
+            a.extend(b)
+            return a
+    illegal_operation()
+
+def div(a, b):
+    if is_number(a):
+        if is_number(b):
+            if b == 0: raise ScriptError("Divison by zero", 'right')
+            return a / b
+    elif type(a) is list:
+        if is_number(b):
+            try:
+                return a[b]
+            except:
+                raise ScriptError("Element at this index can not be retrieved, index is out of bounds", 'right')
+    illegal_operation()
+
+def power(a, b):
+    if is_number(a) and (is_number(b) or type(b) is str): return a ** b
+    illegal_operation()
+
+def compare(op):
+    def comparison(a, b):
+        if is_number(a) and is_number(b): return int(op(a, b))
+        illegal_operation()
+    return comparison
+
+gt = compare(lambda a, b: a > b)
+gte = compare(lambda a, b: a >= b)
+lt = compare(lambda a, b: a < b)
+lte = compare(lambda a, b: a <= b)
+eq = compare(lambda a, b: a == b)
+ne = compare(lambda a, b: a != b)
+
+def neg(a):
+    if is_number(a) or type(a) is str: return a * -1
+    illegal_operation()
+
+def notted(a):
+    if is_number(a): return 1 if a == 0 else 0
+    illegal_operation()
+
+def truth(value): # Value.is_true
+    if is_number(value): return value != 0
+    if type(value) is str: return len(value) > 0
+    return False
+
+
+##################
+# Loops
+##################
+
+def count(i, end, step): # Counted FOR loop for anything range() cannot express
+    if step >= 0:
+        while i < end:
+            yield i
+            i += step
+    else:
+        while i > end:
+            yield i
+            i += step
+
+def elements(value):
+    if type(value) is list: return value
+    illegal_operation()
+
+
+##################
+# Calls
+##################
+
+def function(func, name, arity, free_names=(), bound_names=()): # Marks a generated python function as a script function
+    func.script_name = name
+    func.arity = arity
+    func.free_names = free_names   # For the MEMO purity check
+    func.bound_names = bound_names
+    return func
+
+def bad_call(func, arg_count):
+    arity = getattr(func, 'arity', None)
+    if arity is None: illegal_operation()
+    if arg_count > arity:
+        raise ScriptError(f"{arg_count - arity} too many args passed into {to_repr(func)}")
+    raise ScriptError(f"{arg_count - arity} too few args passed into {to_repr(func)}")
+
+def dynamic(name): # Reads a variable from the closest calling function that defined it
+    frame = sys._getframe(1)
+    file_name = frame.f_code.co_filename
+    global_names = frame.f_globals
+    frame = frame.f_back
+
+    while frame:
+        if frame.f_code.co_filename == file_name:
+            value = frame.f_locals.get(name) # None while the function has not assigned it yet
+            if value is not None: return value
+        frame = frame.f_back
+
+    if name in global_names: return global_names[name]
+    raise ScriptError(f"'{name[2:]}' is not defined")
+
+
+##################
+# Conversions
+##################
+
+def to_repr(value):
+    if type(value) is str: return value
+    if type(value) is list: return f'[{", ".join([to_repr(x) for x in value])}]'
+    if type(value) is FunctionType:
+        if hasattr(value, 'builtin_name'): return f"<built-in function {value.builtin_name}>"
+        return f"<function {value.script_name}>"
+    return str(value)
+
+def box(value): # python value -> Value
+    if type(value) is str: return String(value)
+    if type(value) is list: return List([box(x) for x in value])
+    if type(value) is FunctionType:
+        if hasattr(value, 'builtin_name'): return BuiltInFunction(value.builtin_name)
+        if hasattr(value, 'value'): return value.value # Came from unbox
+        return TranspiledFunction(value)
+    return make_number(value)
+
+# Value -> python value. Calls through execute() run in the context of program_globals,
+# with its SymbolTable brought up to date first and read back after, as a RUN may define names
+def unbox(value, program_globals):
+    if isinstance(value, (Number, String)): return value.value
+    if isinstance(value, List): return [unbox(x, program_globals) for x in value.elements]
+    if isinstance(value, BuiltInFunction) and value.name in BUILTINS: return BUILTINS[value.name]
+    if isinstance(value, TranspiledFunction): return value.function
+
+    # Any other function is called through its own execute()
+    arg_names = getattr(value, 'arg_names', None)
+    if arg_names is None: arg_names = getattr(value, f'execute_{value.name}').arg_names
+    def call(*args):
+        program_globals.store()
+        try:
+            result = value.execute([box(arg) for arg in args], program_globals.context)
+        except ErrorSignal as signal:
+            raise ScriptError(signal.error.details, builtin=value.name)
+        finally:
+            program_globals.load()
+        return unbox(result, program_globals)
+
+    call.arity = len(arg_names)
+    call.value = value
+    if isinstance(value, BuiltInFunction):
+        call.builtin_name = value.name
+    else:
+        call.script_name = value.name
+    return call
+
+
+# A script function of the generated code as a Value, so it can be kept in a SymbolTable after the
+# program ends (the shell, RUN, REQUIRE) and be called by the other engines
+class TranspiledFunction(BaseFunction):
+    __slots__ = ('function', 'arg_names')
+
+    def __init__(self, function):
+        super().__init__(function.script_name)
+        self.function = function
+        self.arg_names = [None] * function.arity
+
+    def execute(self, args, context, pos_start=None, pos_end=None):
+        exec_ctx = self.generate_new_context(context, pos_start, pos_end)
+        self.check_args(self.arg_names, args, exec_ctx)
+
+        program_globals = self.function.__globals__['_globals']
+        program_globals.load()
+        try:
+            return box(self.function(*[unbox(arg, program_globals) for arg in args]))
+        except ScriptError as exception:
+            raise ErrorSignal(RunTimeError(pos_start, pos_end, exception.details, context))
+        finally:
+            program_globals.store()
+
+    def __repr__(self):
+        return f"<function {self.name}>"
+
+
+# Top level names of the generated code are python globals in its namespace. Globals keeps them in
+# step with the SymbolTable of the program: load() before the program runs and after every call
+# through execute(), store() before such a call and when the program ends
+class Globals:
+    def __init__(self, namespace, context):
+        self.namespace = namespace
+        self.context = context
+        self.synced = {} # name -> (python value, Value) as they were last made the same
+        namespace['_globals'] = self
+
+    def load(self): # Every name visible from the program's SymbolTable that changed there
+        table, seen = self.context.symbol_table, set()
+        while table is not None:
+            for name in table.names():
+                if name in seen: continue
+                seen.add(name)
+                value = table.get(name)
+                synced = self.synced.get(name)
+                if synced and synced[1] is value:
+                    # A list may have changed inside, e.g. by a function of another engine, and is updated in place
+                    if type(value) is List: synced[0][:] = [unbox(x, self) for x in value.elements]
+                    continue
+                python_value = unbox(value, self)
+                self.namespace['v_' + name] = python_value
+                self.synced[name] = (python_value, value)
+            table = table.parent
+
+    def store(self): # Every name the program changed, and the insides of its lists
+        for key, python_value in list(self.namespace.items()):
+            if not key.startswith('v_'): continue
+            name = key[2:]
+            synced = self.synced.get(name)
+            if synced and synced[0] is python_value:
+                # The List stays the same Value, so whatever else holds it (a module, a function) sees the change
+                if type(python_value) is list: synced[1].elements[:] = [box(x) for x in python_value]
+                continue
+
+            value = box(python_value)
+            self.context.symbol_table.set(name, value)
+            self.synced[name] = (python_value, value)
+
+
+##################
+# Built-ins
+##################
+
+def builtin(name, arity):
+    def decorator(func):
+        func.builtin_name = name
+        func.arity = arity
+        BUILTINS[name] = func
+        return func
+    return decorator
+
+BUILTINS = {}
+
+@builtin('print', 1)
+def print_(value):
+    print(to_repr(value))
+    return 0
+
+@builtin('print_ret', 1)
+def print_ret(value):
+    return to_repr(value)
+
+@builtin('is_number', 1)
+def is_number_(value):
+    return int(is_number(value))
+
+@builtin('is_string', 1)
+def is_string(value):
+    return int(type(value) is str)
+
+@builtin('is_list', 1)
+def is_list(value):
+    return int(type(value) is list)
+
+@builtin('is_function', 1)
+def is_function(value):
+    return int(type(value) is FunctionType)
+
+@builtin('append', 2)
+def append(list_, value):
+    if type(list_) is not list: raise ScriptError("First argument must be a list", builtin='append')
+    list_.append(value)
+    return 0
+
+@builtin('pop', 2)
+def pop(list_, index):
+    if type(list_) is not list: raise ScriptError("First argument must be a list", builtin='pop')
+    if not is_number(index): raise ScriptError("Index must be a integer", builtin='pop')
+    try:
+        return list_.pop(index)
+    except:
+        raise ScriptError("Index out of bounds", builtin='pop')
+
+@builtin('extend', 2)
+def extend(list1, list2):
+    if type(list1) is not list: raise ScriptError("First argument must be a list", builtin='extend')
+    if type(list2) is not list: raise ScriptError("Second argument must be a list", builtin='extend')
+    list1.extend(list2)
+    return 0
+
+@builtin('len', 1)
+def len_(list_):
+    if type(list_) is not list: raise ScriptError("Argument must be a list", builtin='len')
+    return len(list_)
+
+@builtin('memo', 1)
+def memo(func):
+    if type(func) is not FunctionType or not hasattr(func, 'free_names') or hasattr(func, 'memo_cache'):
+        raise ScriptError("Argument must be a function", builtin='memo')
+    refusal = memo_refusal(func)
+    if refusal:
+        raise ScriptError(f"Can not memoize {to_repr(func)}, {refusal}", builtin='memo')
+
+    cache = MemoCache()
+    def memoized(*args): # MemoFunction.execute
+        key = None
+        if all(type(arg) in (int, float, str) for arg in args):
+            key = tuple((type(arg), arg) for arg in args)
+
+        result = cache.lookup(key)
+        if result is not None: return result
+        result = func(*args)
+        if key is not None and type(result) in (int, float, str): cache.store(key, result)
+        return result
+
+    memoized.memo_cache = cache
+    memoized.wrapped = func
+    return function(memoized, func.script_name, func.arity, func.free_names, func.bound_names)
+
+@builtin('memo_stats', 1)
+def memo_stats(func):
+    cache = getattr(func, 'memo_cache', None)
+    if cache is None: raise ScriptError("Argument must be a memoized function", builtin='memo_stats')
+    return [cache.hits, cache.misses, len(cache.results)]
+
+def memo_refusal(func): # Value.memo_refusal, names are looked up in the program globals
+    program_globals = getattr(func, 'wrapped', func).__globals__
+    todo, seen = [(func, frozenset(func.bound_names))], {func}
+    while todo:
+        func, bound = todo.pop()
+        for name in func.free_names:
+            if name in bound: continue
+            value = program_globals.get('v_' + name)
+            value = getattr(value, 'wrapped', value)
+            if type(value) is not FunctionType: return f'it reads {name}'
+            if getattr(value, 'builtin_name', None) in IMPURE_BUILTINS: return f'it calls {to_repr(value)}'
+            if hasattr(value, 'free_names') and value not in seen:
+                seen.add(value)
+                todo.append((value, bound.union(value.bound_names)))
+    return None
@@ -0,0 +1,240 @@
+from RTEResult import *
+from Errors import RunTimeError
+from Compiler import *
+from Value import *
+
+###########################
+#   Compiled Function Class
+###########################
+
+# A Function that also carries the Code its body was compiled to.
+# The VM runs the code directly; anything else can still call execute(),
+# which walks body_node with the Interpreter like a normal Function.
+# Calls get a Frame from the Resolver's scope, the code reads and writes its names by slot.
+class CompiledFunction(Function):
+    __slots__ = ('code',)
+
+    def __init__(self, name, body_node, arg_names, auto_return, scope, code):
+        super().__init__(name, body_node, arg_names, auto_return, scope)
+        self.code = code
+
+
+#################
+#   VM
+#################
+
+# Runs a Code object from the Compiler with an operand stack.
+# Calls to compiled functions push a frame instead of recursing in Python,
+# so every value, context and error is built the same way the Interpreter builds them.
+
+class VM:
+    def run(self, code, context): # Returns a RTEResult like Interpreter.run
+        try:
+            return RTEResult().success(self.execute(code, context))
+        except ErrorSignal as signal:
+            return RTEResult().failure(signal.error)
+
+    def execute(self, code, context): # Returns the value of the code, raises ErrorSignal on errors
+        frames = [] # saved callers: (instructions, nodes, constants, names, slots, loops, pc, stack, context, call node)
+        instructions = code.instructions
+        nodes = code.nodes
+        constants = code.constants
+        names = code.names
+        slots = code.slots
+        loops = code.loops
+        stack = []
+        pc = 0
+
+        while True:
+            op = instructions[pc]
+            arg = instructions[pc + 1]
+            pc += 2
+
+            if op == LOAD_NAME:
+                node = nodes[pc - 2]
+                slot = slots[arg]
+                if slot is None:
+                    value = context.symbol_table.get(names[arg])
+                else:
+                    value = context.symbol_table.load(slot, names[arg]) # Indexed read from the function's Frame
+                if not value:
+                    raise ErrorSignal(RunTimeError(
+                        node.pos_start, node.pos_end,
+                        f"'{names[arg]}' is not defined",
+                        context
+                    ))
+                stack.append(value)
+
+            elif op == LOAD_NUMBER:
+                stack.append(make_number(constants[arg]))
+
+            elif op == BINARY_OP:
+                node = nodes[pc - 2]
+                right = stack.pop()
+                result, error = getattr(stack[-1], names[arg])(right)
+                if error: raise ErrorSignal(error.at_node(node, context))
+                stack[-1] = result
+
+            elif op == STORE_NAME:
+                slot = slots[arg]
+                if slot is None:
+                    context.symbol_table.set(names[arg], stack[-1])
+                else:
+                    context.symbol_table.store(slot, names[arg], stack[-1])
+
+            elif op == POP:
+                stack.pop()
+
+            elif op == JUMP:
+                pc = arg
+
+            elif op == POP_JUMP_IF_FALSE:
+                if not stack.pop().is_true(): pc = arg
+
+            elif op == POP_JUMP_IF_TRUE:
+                if stack.pop().is_true(): pc = arg
+
+            elif op == FOR_RANGE_NEXT:
+                state = stack[-1]
+                i = state[0]
+                if (i < state[1]) if state[3] else (i > state[1]):
+                    state[0] = i + state[2]
+                    stack.append(make_number(i))
+                else:
+                    stack.pop()
+                    pc = arg
+
+            elif op == FOR_ITER:
+                item = next(stack[-1], None)
+                if item is None:
+                    stack.pop()
+                    pc = arg
+                else:
+                    stack.append(item)
+
+            elif op == CALL:
+                node = nodes[pc - 2]
+                if arg:
+                    args = stack[-arg:]
+                    del stack[-arg:]
+                else:
+                    args = []
+                value_to_call = stack.pop()
+
+                if isinstance(value_to_call, CompiledFunction):
+                    exec_ctx = value_to_call.generate_new_context(context, node.pos_start, node.pos_end)
+                    value_to_call.check_and_populate_args(value_to_call.arg_names, args, exec_ctx)
+
+                    frames.append((instructions, nodes, constants, names, slots, loops, pc, stack, context, node))
+                    code = value_to_call.code
+                    instructions = code.instructions
+                    nodes = code.nodes
+                    constants = code.constants
+                    names = code.names
+                    slots = code.slots
+                    loops = code.loops
+                    stack = []
+                    context = exec_ctx
+                    pc = 0
+                else:
+                    try:
+                        stack.append(value_to_call.execute(args, context, node.pos_start, node.pos_end))
+                    except (BreakSignal, ContinueSignal) as signal: # A function the Interpreter ran left its loop
+                        frames.append((instructions, nodes, constants, names, slots, loops, pc, stack, context, node))
+                        frame = self.leave_loop(frames, isinstance(signal, BreakSignal))
+                        if frame is None: return None
+                        instructions, nodes, constants, names, slots, loops, pc, stack, context, node = frame
+
+            elif op == RETURN_VALUE:
+                value = stack.pop()
+                if not frames:
+                    return value
+
+                instructions, nodes, constants, names, slots, loops, pc, stack, context, node = frames.pop()
+                stack.append(value)
+
+            elif op == LOAD_STRING:
+                stack.append(string_literal(constants[arg]))
+
+            elif op == LOAD_NULL:
+                stack.append(Number.null)
+
+            elif op == UNARY_NEG:
+                node = nodes[pc - 2]
+                number, error = stack[-1].multiply_by(make_number(-1))
+                if error: raise ErrorSignal(error.at_node(node, context))
+                stack[-1] = number
+
+            elif op == UNARY_NOT:
+                node = nodes[pc - 2]
+                number, error = stack[-1].notted()
+                if error: raise ErrorSignal(error.at_node(node, context))
+                stack[-1] = number
+
+            elif op == UNARY_POS:
+                pass
+
+            elif op == BUILD_LIST:
+                if arg:
+                    elements = stack[-arg:]
+                    del stack[-arg:]
+                else:
+                    elements = []
+                stack.append(List(elements))
+
+            elif op == NEW_ACCUM:
+                stack.append([])
+
+            elif op == ACCUM_APPEND:
+                value = stack.pop()
+                stack[-arg].append(value)
+
+            elif op == BUILD_ACCUM:
+                stack[-1] = List(stack[-1])
+
+            elif op == FOR_RANGE_PREP:
+                step_value = stack.pop()
+                end_value = stack.pop()
+                start_value = stack.pop()
+                stack.append([start_value.value, end_value.value, step_value.value, step_value.value >= 0])
+
+            elif op == GET_ITER:
+                stack[-1] = iter(stack[-1].elements)
+
+            elif op == LOAD_ONE:
+                stack.append(make_number(1))
+
+            elif op == POP_N:
+                del stack[-arg:]
+
+            elif op == MAKE_FUNCTION:
+                node, body_code = constants[arg]
+                func_name = node.var_name_tok.value if node.var_name_tok else None
+                arg_names = [arg_name.value for arg_name in node.arg_name_toks]
+                stack.append(CompiledFunction(func_name, node.body_node, arg_names, node.auto_return, node.scope, body_code))
+
+            elif op == LEAVE_LOOP:
+                frame = self.leave_loop(frames, arg)
+                if frame is None: return None # No loop around any of the calls, the program stops
+                instructions, nodes, constants, names, slots, loops, pc, stack, context, node = frame
+
+            elif op == HALT:
+                return None
+
+            else:
+                raise Exception(f'Unknown opcode {op}')
+
+    # A BREAK or CONTINUE left a function: drops the callers up to the closest one whose call is in a loop,
+    # and returns that frame with its stack cut back and pc at the end or the next pass of the loop
+    def leave_loop(self, frames, is_break):
+        while frames:
+            frame = frames.pop()
+            loops, pc, stack = frame[5], frame[6], frame[7]
+            loop = loops.get(pc - 2)
+            if loop is None: continue
+
+            break_target, break_depth, continue_target, continue_depth = loop
+            target, depth = (break_target, break_depth) if is_break else (continue_target, continue_depth)
+            del stack[depth:]
+            return frame[:6] + (target,) + frame[7:]
+        return None
@@ -2,64 +2,56 @@
 #   VALUES
 ####################
 
-from Errors import RunTimeError
-from RTEResult import RTEResult
+from Errors import RunTimeError, OperationError
+from RTEResult import ErrorSignal, ReturnSignal
 from Context import Context
-from SymbolTable import SymbolTable
+from SymbolTable import SymbolTable, Frame, FRAME_NAMES
+from Nodes import VarAccessNode, FunctionDefinitionNode, children, bound_names
+from collections import OrderedDict
 import os
 
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__)) # Where RUN and REQUIRE look for a relative path
+
 ######################
 #   Value Class
 ######################
+# Values only hold their data. Where a value was made or is used, and in which context, is up to
+# the node and context running it: operations return an OperationError that the engine places
+# at its node, and calls get the caller's context and the position of the call from the engine.
+# Numbers, Strings and functions never change once made, so every engine shares them freely
 class Value: # This class basically returns an error if there is an illegal operation
-    def __init__(self):
-        self.set_pos()
-        self.set_context()
-    
-    def set_pos(self, pos_start = None, pos_end = None):
-        self.pos_start = pos_start
-        self.pos_end = pos_end
-        return self
-    
-    def set_context(self, context=None):
-        self.context = context
-        return self
+    __slots__ = ()
 
-    def execute(self, args):
-        return RTEResult().failure(self.illegal_operation())
-
-    def copy(self):
-        raise Exception('No copy method defined')
+    # Returns the value of the call, raises ErrorSignal on errors.
+    # context is the caller's, pos_start and pos_end the call's
+    def execute(self, args, context, pos_start=None, pos_end=None):
+        raise ErrorSignal(RunTimeError(pos_start, pos_end, 'Illegal operation', context))
 
     def is_true(self):
         return False
 
     def illegal_operation(self, other=None): # main point of this class
-        if not other: other = self
-        return RunTimeError(
-			self.pos_start, other.pos_end,
-			'Illegal operation',
-			self.context
-		)
+        return OperationError('Illegal operation')
 
 ######################
 #   Number Class
 ######################
 class Number(Value):
+    __slots__ = ('value',)
+
     def __init__(self,value):
-        super().__init__()
         self.value = value
     
     def _binary_op(self, other, op_func): # Checks to see if operation is between two numbers, then does a function, which is lambda.
         if isinstance(other,Number):
-            return Number(op_func(self.value,other.value)).set_context(self.context), None
+            return make_number(op_func(self.value,other.value)), None
         elif isinstance(other,String):
-            return String(op_func(self.value,other.value)).set_context(self.context), None
+            return String(op_func(self.value,other.value)), None
         return None, super().illegal_operation(other)   # Otherwise, operation is illegal
     
     def _comparison_op(self, other, op_func): # Checks to see if operation is between two numbers, then does a function, which is lambda.
         if isinstance(other,Number):
-            return Number(int(op_func(self.value,other.value))).set_context(self.context), None
+            return (Number.true if op_func(self.value,other.value) else Number.false), None
         return None, super().illegal_operation(other)   # Otherwise, operation is illegal
 
     def added_to(self, other):
@@ -74,9 +66,7 @@ class Number(Value):
     def divide_by(self, other):
         if isinstance(other, Number):
             if other.value == 0:
-                return None, RunTimeError(other.pos_start,
-                other.pos_end, "Divison by zero",
-                self.context)
+                return None, OperationError("Divison by zero", 'right')
             return self._binary_op(other, lambda a, b: a / b)
         
     def greater_than(self,other):
@@ -93,6 +83,9 @@ class Number(Value):
     
     def equal_to(self,other):
         return self._comparison_op(other, lambda a, b: a == b)
+
+    def not_equal_to(self,other):
+        return self._comparison_op(other, lambda a, b: a != b)
     
     def anded_by(self,other):
         return self._comparison_op(other, lambda a, b: bool(a) and bool(b))
@@ -101,13 +94,7 @@ class Number(Value):
         return self._comparison_op(other, lambda a, b: bool(a) or bool(b))
     
     def notted(self):
-        return Number(1 if self.value == 0 else 0).set_context(self.context), None
-        
-    def copy(self):
-        copy = Number(self.value)
-        copy.set_pos(self.pos_start, self.pos_end)
-        copy.set_context(self.context)
-        return copy
+        return (Number.true if self.value == 0 else Number.false), None
     
     def is_true(self):
         return self.value != 0
@@ -118,40 +105,64 @@ class Number(Value):
     def __repr__(self):
         return str(self.value)
 
+# Numbers never change once made, so every int in SMALL_INT_MIN..SMALL_INT_MAX has one Number that
+# make_number hands out instead of building a new one: loop counters, indexes, counts and the 0 and 1
+# of every comparison. Only ints, 1.0 == 1 but prints differently
+SMALL_INT_MIN = -128
+SMALL_INT_MAX = 1024
+
+SMALL_INTS = [Number(value) for value in range(SMALL_INT_MIN, SMALL_INT_MAX + 1)]
+
 Number.null = Number(0)
-Number.false = Number(0)
-Number.true = Number(1)
-    
+Number.false = SMALL_INTS[-SMALL_INT_MIN]     # What comparisons, AND, OR and NOT return
+Number.true = SMALL_INTS[1 - SMALL_INT_MIN]
+
+# Number(value) without the __init__ call, or the shared one of a small int.
+# The Interpreter's numeric fast paths build one of these per operation
+def make_number(value):
+    if type(value) is int and SMALL_INT_MIN <= value <= SMALL_INT_MAX:
+        return SMALL_INTS[value - SMALL_INT_MIN]
+    number = object.__new__(Number)
+    number.value = value
+    return number
+
+
 class String(Value):
+    __slots__ = ('value',)
+
     def __init__(self,value):
-        super().__init__()
         self.value = value
 
     def added_to(self,other):
         if isinstance(other,String):
-            return String(self.value + other.value).set_context(self.context), None
+            return String(self.value + other.value), None
         return None, super().illegal_operation(other)
 
     def multiply_by(self,other):
         if isinstance(other,Number):
-            return String(self.value * other.value).set_context(self.context), None
+            return String(self.value * other.value), None
         return None, super().illegal_operation(other)
 
     def is_true(self):
         return len(self.value) > 0
-
-    def copy(self):
-        copy = Number(self.value)
-        copy.set_pos(self.pos_start, self.pos_end)
-        copy.set_context(self.context)
-        return copy
     
     def __repr__(self):
         return f'{self.value}'
 
+# One String per literal text: every engine takes the Strings of its literals from here, so the same
+# literal in a loop, a function body or another script is one object. Only literals go in, which keeps
+# the table as big as the text of the programs that ran
+STRING_LITERALS = {}
+
+def string_literal(value):
+    string = STRING_LITERALS.get(value)
+    if string is None: string = STRING_LITERALS[value] = String(value)
+    return string
+
 class List(Value):
+    __slots__ = ('elements',)
+
     def __init__(self, elements):
-        super().__init__()
         self.elements = elements
 
     def added_to(self,other):
@@ -174,11 +185,7 @@ class List(Value):
                 new_list.elements.pop(other)
                 return new_list, None
             except:
-                return None, RunTimeError(
-                    other.pos_start, other.pos_end,
-                    "Element at this index can not be removed, index is out of bounds",
-                    self.context
-                )
+                return None, OperationError("Element at this index can not be removed, index is out of bounds", 'right')
         else:
             return None,super().illegal_operation(other)
         
@@ -187,19 +194,12 @@ class List(Value):
             try:
                 return self.elements[other.value], None
             except:
-                return None, RunTimeError(
-                    other.pos_start, other.pos_end,
-                    "Element at this index can not be retrieved, index is out of bounds",
-                    self.context
-                )
+                return None, OperationError("Element at this index can not be retrieved, index is out of bounds", 'right')
         else:
             return None,super().illegal_operation(other)
     
     def copy(self):
-        copy = List(self.elements)
-        copy.set_pos(self.pos_start, self.pos_end)
-        copy.set_context(self.context)
-        return copy
+        return List(self.elements)
     
     def __repr__(self):
         return f'[{", ".join([str(x) for x in self.elements])}]'
@@ -209,135 +209,236 @@ class List(Value):
 ###########################
 
 class BaseFunction(Value):
+    __slots__ = ('name',)
+
     def __init__(self,name):
-        super().__init__()
         self.name = name or "<anonymous>"
     
-    def generate_new_context(self):
-        new_context = Context(self.name, self.context, self.pos_start)
-        new_context.symbol_table = SymbolTable(new_context.parent.symbol_table)
+    def generate_new_context(self, context, pos_start, pos_end): # Context of a call from context
+        new_context = Context(self.name, context, pos_start, pos_end)
+        new_context.symbol_table = SymbolTable(context.symbol_table)
         return new_context
     
-    def check_args(self,arg_names, args):
-        res = RTEResult()
-
+    def check_args(self,arg_names, args, exec_ctx): # Errors point at the call, in the caller
         if len(args) > len(arg_names):
-            return res.failure(RunTimeError(
-                self.pos_start, self.pos_end,
+            raise ErrorSignal(RunTimeError(
+                exec_ctx.parent_entry_pos, exec_ctx.parent_entry_end,
                 f"{len(args) - len(arg_names)} too many args passed into {self}",
-                self.context
+                exec_ctx.parent
             ))
         
         elif len(args) < len(arg_names):
-            return res.failure(RunTimeError(
-                self.pos_start, self.pos_end,
+            raise ErrorSignal(RunTimeError(
+                exec_ctx.parent_entry_pos, exec_ctx.parent_entry_end,
                 f"{len(args) - len(arg_names)} too few args passed into {self}",
-                self.context
+                exec_ctx.parent
             ))
-        
-        return res.success(None)
     
     def populate_args(self, arg_names, args, exec_ctx):
         for i in range(len(args)): # in the list of arg_name and args, get name and value
             arg_name = arg_names[i]
             arg_value = args[i]
-            arg_value.set_context(exec_ctx) # update value to execute context
-            exec_ctx.symbol_table.set(arg_name,arg_value) # Add to context
+            exec_ctx.symbol_table.set(arg_name,arg_value) # Add to context, values are shared so it is not changed
     
     def check_and_populate_args(self, arg_names, args, exec_ctx):
-        res = RTEResult()
-        res.register(self.check_args(arg_names, args))
-        if res.error : return res
-
+        self.check_args(arg_names, args, exec_ctx)
         self.populate_args(arg_names, args, exec_ctx)
 
-        return res.success(None)
-
 ######################
 #   Function Class
 ######################
 
 class Function(BaseFunction):
-    def __init__(self,name, body_node, arg_names, auto_return):
+    __slots__ = ('body_node', 'arg_names', 'auto_return', 'scope')
+
+    def __init__(self,name, body_node, arg_names, auto_return, scope=None):
         super().__init__(name)
         self.body_node = body_node
         self.arg_names = arg_names
         self.auto_return = auto_return
+        self.scope = scope # Slots from the Resolver, calls get a Frame instead of a SymbolTable
+        if scope: FRAME_NAMES.update(scope)
+
+    def generate_new_context(self, context, pos_start, pos_end):
+        if self.scope is None: return super().generate_new_context(context, pos_start, pos_end)
+        new_context = Context(self.name, context, pos_start, pos_end)
+        new_context.symbol_table = Frame(self.scope, context.symbol_table)
+        return new_context
     
-    def execute(self,args):
-        from Interpreter import Interpreter
-        res = RTEResult()
+    def execute(self, args, context, pos_start=None, pos_end=None):
+        from Interpreter import Interpreter, TailCall
         interpreter = Interpreter()
-        exec_ctx = self.generate_new_context()
-        
-        res.register(self.check_and_populate_args(self.arg_names, args, exec_ctx))
-        if res.should_return(): return res
+        function, caller = self, None
 
-        value = res.register(interpreter.visit(self.body_node, exec_ctx))
-        if res.should_return() and res.func_return_value == None:
-            return res
-        
-        if self.auto_return: # Returns a value if there's no function
-            return_value = value or res.func_return_value or Number.null
-        else:
-            return_value = None or res.func_return_value or Number.null 
+        while True: # One pass per call, tail calls come back here instead of recursing
+            exec_ctx = function.generate_new_context(context, pos_start, pos_end)
+            function.check_and_populate_args(function.arg_names, args, exec_ctx)
+            if caller: function.replace_caller(exec_ctx, caller)
 
-        return res.success(return_value)
-    
-    def copy(self):
-        copy = Function(self.name, self.body_node, self.arg_names, self.auto_return)
-        copy.set_context(self.context)
-        copy.set_pos(self.pos_start, self.pos_end)
-        return copy
+            try:
+                if function.auto_return: # Returns a value if there's no function
+                    value = interpreter.visit(function.body_node, exec_ctx)
+                else:
+                    interpreter.visit_void(function.body_node, exec_ctx)
+                    value = Number.null
+            except ReturnSignal as signal: # RETURN inside the body
+                value = signal.value
+
+            if type(value) is not TailCall: return value
+            function, args, caller = value.function, value.args, value.context
+            context, pos_start, pos_end = caller, value.pos_start, value.pos_end
+
+    # The caller of a tail call is done, so the new context can take its place in the chain, which keeps
+    # tail recursion in constant space. Only when nothing the caller bound is visible through the
+    # new context though: names are dynamically scoped, so everything else still needs the caller.
+    # The traceback still lists the caller through tail_calls
+    def replace_caller(self, exec_ctx, caller):
+        if any(name not in self.arg_names for name in caller.symbol_table.names()): return
+
+        call_pos = exec_ctx.parent_entry_pos
+        exec_ctx.parent = caller.parent
+        exec_ctx.parent_entry_pos = caller.parent_entry_pos
+        exec_ctx.parent_entry_end = caller.parent_entry_end
+        exec_ctx.symbol_table.set_parent(caller.parent.symbol_table)
+
+        tail_calls = caller.tail_calls # Repeats of the same call are counted instead of stored
+        if tail_calls and tail_calls[0] == caller.display_name and tail_calls[1] == call_pos:
+            exec_ctx.tail_calls = (tail_calls[0], tail_calls[1], tail_calls[2] + 1, tail_calls[3])
+        else:
+            exec_ctx.tail_calls = (caller.display_name, call_pos, 1, tail_calls)
     
     def __repr__(self):
         return f"<function {self.name}>"
 
+##########################
+#   Memoized Function Class
+##########################
+
+MEMO_SIZE = 1000 # Results kept per memoized function, the least recently used one goes first
+
+# Built-ins with side effects, MEMO refuses functions that can reach one of them
+IMPURE_BUILTINS = {'print', 'input', 'input_int', 'clear', 'append', 'pop', 'extend', 'run', 'require', 'run_cache_stats', 'run_cache_clear'}
+
+class MemoCache: # LRU of results by argument key, one per MemoFunction
+    def __init__(self, size=MEMO_SIZE):
+        self.results = OrderedDict()
+        self.size = size
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, key): # Cached result or None, a None key (unhashable arguments) always misses
+        result = None if key is None else self.results.get(key)
+        if result is None:
+            self.misses += 1
+            return None
+        self.results.move_to_end(key)
+        self.hits += 1
+        return result
+
+    def store(self, key, result):
+        self.results[key] = result
+        if len(self.results) > self.size:
+            self.results.popitem(last=False)
+
+# Wraps a Function made with MEMO(fn). Calls with only Number and String arguments
+# return the earlier result for the same arguments instead of running the body again
+class MemoFunction(BaseFunction):
+    __slots__ = ('function', 'cache')
+
+    def __init__(self, function, cache):
+        super().__init__(function.name)
+        self.function = function
+        self.cache = cache
+
+    @property
+    def arg_names(self): # What calling it takes, e.g. when the python engine unboxes it
+        return self.function.arg_names
+
+    def execute(self, args, context, pos_start=None, pos_end=None):
+        key = memo_key(args)
+        result = self.cache.lookup(key)
+        if result is not None: return result
+
+        # Runs exactly like calling the function itself, so contexts and tracebacks stay the same
+        result = self.function.execute(args, context, pos_start, pos_end)
+        if key is not None and isinstance(result, (Number, String)): # Lists can change after the call
+            self.cache.store(key, result)
+        return result
+
+    def __repr__(self):
+        return repr(self.function)
+
+def memo_key(args): # Hashable key of the arguments, None if one of them is not a Number or String
+    key = []
+    for arg in args:
+        if not isinstance(arg, (Number, String)): return None
+        key.append((type(arg.value), arg.value)) # 1 and 1.0 print differently, so they are not the same key
+    return tuple(key)
+
+# Why MEMO can not take a function, None when it can. The result may only depend on the arguments:
+# the body may call functions, which are checked the same way as they are bound right now, but no side
+# effect built-in, and it may only read names that it, or a function on the way to the read, binds.
+# Any other name is a global or a variable of the caller, which can change between two calls
+def memo_refusal(function, context):
+    todo = [(function.body_node, frozenset(function.arg_names).union(bound_names(function.body_node)))]
+    seen = {function.body_node}
+    while todo:
+        node, bound = todo.pop()
+        if isinstance(node, FunctionDefinitionNode):
+            arg_names = [arg_name_tok.value for arg_name_tok in node.arg_name_toks]
+            todo.append((node.body_node, bound.union(arg_names, bound_names(node.body_node))))
+            continue
+        todo.extend((child, bound) for child in children(node))
+        if not isinstance(node, VarAccessNode) or node.var_name_tok.value in bound: continue
+
+        value = context.symbol_table.get(node.var_name_tok.value)
+        if isinstance(value, MemoFunction): value = value.function
+        if isinstance(value, BuiltInFunction):
+            if value.name in IMPURE_BUILTINS: return f'it calls {value}'
+        elif isinstance(value, Function) and value.body_node:
+            if value.body_node not in seen: # Its own names are bound too, like the caller's stay visible in it
+                seen.add(value.body_node)
+                todo.append((value.body_node, bound.union(value.arg_names, bound_names(value.body_node))))
+        elif not isinstance(value, BaseFunction):
+            return f'it reads {node.var_name_tok.value}'
+    return None
+
+# Built-in errors point at the call, which the context of the built-in knows
 class BuiltInFunction(BaseFunction):
+    __slots__ = ()
+
     def __init__(self,name):
         super().__init__(name)
 
-    def execute(self, args):
-        res = RTEResult()
-        exec_ctx = self.generate_new_context()
+    def execute(self, args, context, pos_start=None, pos_end=None):
+        exec_ctx = self.generate_new_context(context, pos_start, pos_end)
 
         method_name = f'execute_{self.name}'
         method = getattr(self, method_name, self.no_visit_method)
 
-        res.register(self.check_and_populate_args(method.arg_names, args, exec_ctx))
-        if res.error: return res
-
-        return_value = res.register(method(exec_ctx))
-        if res.error: return res
-
-        return res.success(return_value)
+        self.check_and_populate_args(method.arg_names, args, exec_ctx)
+        return method(exec_ctx)
     
     def no_visit_method(self, node, context):
         raise Exception(f'No execute_{self.name} method defined')
 
-    def copy(self):
-        copy = BuiltInFunction(self.name)
-        copy.set_pos(self.pos_start, self.pos_end)
-        copy.set_context(self.context)
-        return copy
-    
     def __repr__(self):
         return f"<built-in function {self.name}>"
     
     # Prints a value
     def execute_print(self, exec_ctx):# symbol tables holds all args passed in
         print(str(exec_ctx.symbol_table.get('value')))
-        return RTEResult().success(Number.null)
+        return Number.null
     execute_print.arg_names = ['value']
     
     # Returns the print value
     def execute_print_ret(self, exec_ctx):# symbol tables holds all args passed in, 
-        return RTEResult.success(String(str(exec_ctx.symbol_table.get('value'))))
+        return String(str(exec_ctx.symbol_table.get('value')))
     execute_print_ret.arg_names = ['value']
 
     def execute_input(self, exec_ctx):
         text = input()
-        return RTEResult().success(String(text))
+        return String(text)
     execute_input.arg_names = []
 
     def execute_input_int(self, exec_ctx):
@@ -348,37 +449,37 @@ class BuiltInFunction(BaseFunction):
                 break
             except ValueError:
                 print(f"'{text}' must be an integer. Try again.")
-        return RTEResult().success(Number(number))
+        return make_number(number)
     execute_input_int.arg_names = []
 
     # Clears terminal
     def execute_clear(self, exec_ctx):
         os.system('cls' if os.name ==  'nt' else 'clear') # If windows os, use cls, otherwise, use clear
-        return RTEResult().success(Number.null)
+        return Number.null
     execute_clear.arg_names = []
 
     # Checks to see if arg is a number
     def execute_is_number(self, exec_ctx):
         is_number = isinstance(exec_ctx.symbol_table.get("value"), Number)
-        return RTEResult().success(Number.true if is_number else Number.false)
+        return Number.true if is_number else Number.false
     execute_is_number.arg_names = ['value']
 
     # Checks to see if arg is a string
     def execute_is_string(self, exec_ctx):
         is_string = isinstance(exec_ctx.symbol_table.get("value"), String)
-        return RTEResult().success(Number.true if is_string else Number.false)
+        return Number.true if is_string else Number.false
     execute_is_string.arg_names = ['value']
 
     # Checks to see if arg is a list
     def execute_is_list(self, exec_ctx):
         is_list = isinstance(exec_ctx.symbol_table.get("value"), List)
-        return RTEResult().success(Number.true if is_list else Number.false)
+        return Number.true if is_list else Number.false
     execute_is_list.arg_names = ['value']
 
     # Checks to see if arg is a function
     def execute_is_function(self, exec_ctx):
         is_function = isinstance(exec_ctx.symbol_table.get("value"), BaseFunction)
-        return RTEResult().success(Number.true if is_function else Number.false)
+        return Number.true if is_function else Number.false
     execute_is_function.arg_names = ['value']
 
     # Appends argument to a list
@@ -387,14 +488,14 @@ class BuiltInFunction(BaseFunction):
         value = exec_ctx.symbol_table.get("value")
 
         if not isinstance(list, List):
-            return RTEResult().failure(
+            raise ErrorSignal(
                 RunTimeError(
-                    self.pos_start, self.pos_end, 
+                    exec_ctx.parent_entry_pos, exec_ctx.parent_entry_end,
                     "First argument must be a list",
                     exec_ctx
                 ))
         list.elements.append(value)
-        return RTEResult().success(Number.null)
+        return Number.null
 
     execute_append.arg_names = ['list', 'value']
 
@@ -404,16 +505,16 @@ class BuiltInFunction(BaseFunction):
         index = exec_ctx.symbol_table.get("index")
 
         if not isinstance(list, List):
-            return RTEResult().failure(
+            raise ErrorSignal(
                 RunTimeError(
-                    self.pos_start, self.pos_end, 
+                    exec_ctx.parent_entry_pos, exec_ctx.parent_entry_end,
                     "First argument must be a list",
                     exec_ctx
                 ))
         if not isinstance(index, Number):
-            return RTEResult().failure(
+            raise ErrorSignal(
                 RunTimeError(
-                    self.pos_start, self.pos_end, 
+                    exec_ctx.parent_entry_pos, exec_ctx.parent_entry_end,
                     "Index must be a integer",
                     exec_ctx
                 ))
@@ -421,13 +522,13 @@ class BuiltInFunction(BaseFunction):
         try:
             element = list.elements.pop(index.value)
         except:
-            return RTEResult().failure(
+            raise ErrorSignal(
                 RunTimeError(
-                    self.pos_start, self.pos_end, 
+                    exec_ctx.parent_entry_pos, exec_ctx.parent_entry_end,
                     "Index out of bounds",
                     exec_ctx
                 ))
-        return RTEResult().success(element)
+        return element
     execute_pop.arg_names = ['list', 'index']
 
     # built in extend function
@@ -436,75 +537,146 @@ class BuiltInFunction(BaseFunction):
         list2 = exec_ctx.symbol_table.get("list2")
         
         if not isinstance(list1, List):
-            return RTEResult().failure(
+            raise ErrorSignal(
                 RunTimeError(
-                    self.pos_start, self.pos_end, 
+                    exec_ctx.parent_entry_pos, exec_ctx.parent_entry_end,
                     "First argument must be a list",
                     exec_ctx
                 ))
         if not isinstance(list2, List):
-            return RTEResult().failure(
+            raise ErrorSignal(
                 RunTimeError(
-                    self.pos_start, self.pos_end, 
+                    exec_ctx.parent_entry_pos, exec_ctx.parent_entry_end,
                     "Second argument must be a list",
                     exec_ctx
                 ))
         
         list1.elements.extend(list2.elements)
-        return RTEResult().success(Number.null)
+        return Number.null
     execute_extend.arg_names = ["list1", 'list2']
 
     def execute_len(self, exec_ctx):
         list_ = exec_ctx.symbol_table.get("list")
 
         if not isinstance(list_, List):
-            return RTEResult().failure(RunTimeError(
-                self.pos_start, self.pos_end,
+            raise ErrorSignal(RunTimeError(
+                exec_ctx.parent_entry_pos, exec_ctx.parent_entry_end,
                 f"Argument must be a list",
                 exec_ctx
             ))
         
-        return RTEResult().success(Number(len(list_.elements)))
+        return make_number(len(list_.elements))
     execute_len.arg_names = ["list"]
 
     # Execute Files
     def execute_run(self, exec_ctx):
-        import main
+        fn, file_path = self.script_path(exec_ctx)
+        self.run_script(fn, file_path, exec_ctx)
+        return Number.null
+    execute_run.arg_names = ["fn"]
+
+    # Runs a script once per process and binds the names it defines, later calls only bind them again
+    def execute_require(self, exec_ctx):
+        from ModuleCache import module_cache
+        from GlobalSymbolTable import global_symbol_table
+        fn, file_path = self.script_path(exec_ctx)
+
+        symbols = module_cache.get(file_path)
+        if symbols is None:
+            stamp = module_cache.stamp(file_path)
+            module_table = SymbolTable(global_symbol_table) # Catches the names the module binds at its top level
+            self.run_script(fn, file_path, exec_ctx, module_table)
+            symbols = {name: module_table.symbols[name] for name in module_table.names()}
+            module_cache.set(file_path, stamp, symbols)
+
+        global_symbol_table.symbols.update(symbols) # Where RUN would have put them
+        return Number.null
+    execute_require.arg_names = ["fn"]
+
+    def script_path(self, exec_ctx): # The fn argument of RUN/REQUIRE and the file it names
         fn = exec_ctx.symbol_table.get("fn")
         if not isinstance(fn, String):
-            return RTEResult().failure(RunTimeError(
-                self.pos_start, self.pos_end,
+            raise ErrorSignal(RunTimeError(
+                exec_ctx.parent_entry_pos, exec_ctx.parent_entry_end,
                 "Argument must be sting",
                 exec_ctx
                 ))
-        
-        os.chdir(os.path.dirname(os.path.abspath(__file__)))
 
-        fn = fn.value
-        file_path = os.path.abspath(fn)
-        
+        # A relative path is from the interpreter's directory, without changing the working directory
+        return fn.value, os.path.join(SCRIPT_DIR, fn.value)
+
+    def run_script(self, fn, file_path, exec_ctx, symbol_table=None):
+        import main
         try:
             with open(file_path, "r") as f:
                 script = f.read()
         except Exception as e:
-            return RTEResult().failure(RunTimeError(
-                self.pos_start, self.pos_end,
+            raise ErrorSignal(RunTimeError(
+                exec_ctx.parent_entry_pos, exec_ctx.parent_entry_end,
                 f"Failed to load script {fn}" + str(e),
                 exec_ctx
             ))
-        
-        _, error = main.run(fn, script)
+
+        # A script RUN before is not lexed and parsed again
+        _, error = main.run(fn, script, cache=True, path=file_path, symbol_table=symbol_table)
 
         if error:
-            return RTEResult().failure(RunTimeError(
-                    self.pos_start, self.pos_end,
+            raise ErrorSignal(RunTimeError(
+                    exec_ctx.parent_entry_pos, exec_ctx.parent_entry_end,
                     f"Failed to finishing executing script {fn} \n" +
                     error.as_string(),
                     exec_ctx
                 ))
-        
-        return RTEResult().success(Number.null)
-    execute_run.arg_names = ["fn"]
+
+    # Returns [hits, misses, writes] of the cache of scripts RUN
+    def execute_run_cache_stats(self, exec_ctx):
+        from ScriptCache import script_cache
+        stats = script_cache.stats()
+        return List([make_number(stats['hits']), make_number(stats['misses']), make_number(stats['writes'])])
+    execute_run_cache_stats.arg_names = []
+
+    # Deletes every cached script, returns how many there were
+    def execute_run_cache_clear(self, exec_ctx):
+        from ScriptCache import script_cache
+        return make_number(script_cache.clear())
+    execute_run_cache_clear.arg_names = []
+
+    # Returns a memoized version of a function
+    def execute_memo(self, exec_ctx):
+        function = exec_ctx.symbol_table.get("function")
+
+        if not isinstance(function, Function) or not function.body_node:
+            raise ErrorSignal(RunTimeError(
+                exec_ctx.parent_entry_pos, exec_ctx.parent_entry_end,
+                "Argument must be a function",
+                exec_ctx
+            ))
+
+        refusal = memo_refusal(function, exec_ctx)
+        if refusal:
+            raise ErrorSignal(RunTimeError(
+                exec_ctx.parent_entry_pos, exec_ctx.parent_entry_end,
+                f"Can not memoize {function}, {refusal}",
+                exec_ctx
+            ))
+
+        return MemoFunction(function, MemoCache())
+    execute_memo.arg_names = ["function"]
+
+    # Returns [hits, misses, cached results] of a memoized function
+    def execute_memo_stats(self, exec_ctx):
+        function = exec_ctx.symbol_table.get("function")
+
+        if not isinstance(function, MemoFunction):
+            raise ErrorSignal(RunTimeError(
+                exec_ctx.parent_entry_pos, exec_ctx.parent_entry_end,
+                "Argument must be a memoized function",
+                exec_ctx
+            ))
+
+        cache = function.cache
+        return List([make_number(cache.hits), make_number(cache.misses), make_number(len(cache.results))])
+    execute_memo_stats.arg_names = ["function"]
 
 # This creates a constant for the built-in function
 BuiltInFunction.print       = BuiltInFunction("print")
@@ -521,5 +693,8 @@ BuiltInFunction.extend      = BuiltInFunction('extend')
 BuiltInFunction.clear       = BuiltInFunction('clear')
 BuiltInFunction.len         = BuiltInFunction('len')
 BuiltInFunction.run         = BuiltInFunction('run')
-
-
+BuiltInFunction.require     = BuiltInFunction('require')
+BuiltInFunction.run_cache_stats = BuiltInFunction('run_cache_stats')
+BuiltInFunction.run_cache_clear = BuiltInFunction('run_cache_clear')
+BuiltInFunction.memo        = BuiltInFunction('memo')
+BuiltInFunction.memo_stats  = BuiltInFunction('memo_stats')
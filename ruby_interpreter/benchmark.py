@@ -0,0 +1,483 @@
+import os
+import sys
+import io
+import time
+import warnings
+import subprocess
+import contextlib
+import main
+
+#####################
+#   BENCHMARKS
+#####################
+
+# Run with: python benchmark.py [engine ...]
+# Every program is run on each engine and compared against the tree-walking Interpreter.
+#
+# Memory: python benchmark.py --memory [engine ...]
+# Runs loops of growing length, each in a fresh process, and prints the peak RSS.
+# Block loops throw their values away, so their peak should stay flat as the count grows.
+# The list loop keeps a value for every step, its peak is what the values themselves cost.
+#
+# Lexers: python benchmark.py --lexer
+# Lexes a few thousand lines made of the programs above with every lexer in Lexer.LEXERS
+# and prints the throughput in MB/s. Every lexer has to make the same tokens as the Lexer.
+# It then prints the memory of the full token list, and parses the same text from the list and
+# from the streamed tokens (RegexLexer.generate_tokens through a TokenBuffer) with the peak memory of both.
+#
+# Flat AST: python benchmark.py --ast
+# Compares the AST of the lexer text as Nodes and as a FlatAST.FlatTree: the memory each keeps,
+# whole tree passes over both (bound names, pickle against to_bytes) and the Interpreter
+# running PROGRAMS off the Nodes and off the FlatTree views.
+#
+# Script cache: python benchmark.py --cache
+# Runs a script that defines a function for every copy of PROGRAMS (so nothing but the definitions run)
+# without the ScriptCache, then again once its entry is written, as RUN does it on every call after the first.
+#
+# Quickening: python benchmark.py --quicken [engine ...]
+# Runs PROGRAMS with the type feedback of BinaryOperatorNode and CallNode sites off and on,
+# and prints how many sites each program quickened, deoptimized and left generic.
+#
+# Allocations: python benchmark.py --alloc [engine ...]
+# Counts the Numbers and Strings each of PROGRAMS makes on every engine, and how many
+# values make_number handed out from its shared small ints instead.
+#
+# Recursion depth: python benchmark.py --depth [engine ...]
+# Makes the same number of calls as recursion of growing depth that is not a tail call, and times
+# every engine, or prints the error of an engine that runs out of python stack.
+
+PROGRAMS = {
+    'loop': '''
+total = 0
+for i = 0 to 100000
+    total = total + i * 2
+end
+puts total
+''',
+    'while': '''
+x = 0
+count = 0
+while x < 50000
+    x = x + 1
+    if x / 2 > 100
+        count = count + 1
+    end
+end
+puts count
+''',
+    'fib': '''
+fun fib(n)
+    if n < 2
+        return n
+    end
+    return fib(n - 1) + fib(n - 2)
+end
+puts fib(18)
+''',
+    'calls': '''
+fun add(a, b) -> a + b
+total = 0
+for i = 0 to 20000
+    total = add(total, i)
+end
+puts total
+''',
+    'compare': '''
+hits = 0
+for i = 0 to 50000
+    big = i > 25000
+    small = NOT big
+    if big == small
+        hits = hits - 1
+    end
+    hits = hits + big
+end
+puts hits
+''',
+    'logic': '''
+fun check(n) -> n * n > 100
+hits = 0
+i = 0
+while i < 50000 AND hits < 50000
+    i = i + 1
+    if i < 50 AND check(i) OR i == 40000
+        hits = hits + 1
+    end
+end
+puts hits
+''',
+}
+
+ENGINES = ['interpreter', 'vm', 'closure', 'python', 'stack']
+
+MEMORY_PROGRAMS = {
+    'for': '''
+total = 0
+for i = 0 to {count}
+    total = total + i
+end
+''',
+    'while': '''
+i = 0
+while i < {count}
+    i = i + 1
+end
+''',
+    'list': '''
+squares = for i = 0 to {count} [i * i]
+''',
+}
+
+MEMORY_COUNTS = [10000, 100000, 1000000]
+
+LEXER_COPIES = 400 # Copies of PROGRAMS in the lexer benchmark text, about 8000 lines
+
+
+def time_program(name, engine, repeat=3, **options):
+    best = None
+    for _ in range(repeat):
+        output = io.StringIO()
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(output):
+            _, error = main.run(f'<{name}>', PROGRAMS[name], engine, **options)
+        elapsed = time.perf_counter() - start
+
+        if error: raise Exception(error.as_string())
+        best = elapsed if best is None else min(best, elapsed)
+    return best, output.getvalue().strip()
+
+
+def bench_engines(engines):
+    print(f'{"program":<10}{"engine":<14}{"time":>10}{"speedup":>10}')
+    for name in PROGRAMS:
+        baseline, expected = time_program(name, 'interpreter')
+        for engine in engines:
+            if engine == 'interpreter':
+                elapsed, output = baseline, expected
+            else:
+                elapsed, output = time_program(name, engine)
+            if output != expected:
+                raise Exception(f'{engine} printed {output!r} for {name}, expected {expected!r}')
+            print(f'{name:<10}{engine:<14}{elapsed:>9.3f}s{baseline / elapsed:>9.2f}x')
+
+
+def report_rss(name, engine, count): # Called in the child process started by peak_rss
+    import resource # Unix only
+    _, error = main.run(f'<{name}>', MEMORY_PROGRAMS[name].format(count=count), engine)
+    if error: raise Exception(error.as_string())
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(peak if sys.platform == 'darwin' else peak * 1024) # ru_maxrss is in bytes on macOS, KB elsewhere
+
+
+def peak_rss(name, engine, count): # Peak RSS in MB of a fresh process running one memory program
+    code = f'import benchmark; benchmark.report_rss({name!r}, {engine!r}, {count})'
+    result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True,
+                            cwd=os.path.dirname(os.path.abspath(__file__)))
+    if result.returncode: raise Exception(result.stderr)
+    return int(result.stdout.split()[-1]) / (1024 * 1024)
+
+
+def bench_memory(engines):
+    print(f'{"program":<10}{"engine":<14}' + ''.join(f'{count:>12}' for count in MEMORY_COUNTS))
+    for name in MEMORY_PROGRAMS:
+        for engine in engines:
+            peaks = [peak_rss(name, engine, count) for count in MEMORY_COUNTS]
+            print(f'{name:<10}{engine:<14}' + ''.join(f'{peak:>10.1f}MB' for peak in peaks))
+
+
+def lexer_text():
+    return '# lexer benchmark\n' + ''.join(PROGRAMS.values()) * LEXER_COPIES
+
+
+def token_dump(tokens): # What the parser sees of each token
+    return [(tok.type, tok.value, tok.pos_start.idx, tok.pos_start.ln, tok.pos_start.col,
+             tok.pos_end.idx, tok.pos_end.ln, tok.pos_end.col) for tok in tokens]
+
+
+def bench_lexers(repeat=3):
+    from Lexer import Lexer, LEXERS
+    text = lexer_text()
+    size = len(text.encode()) / (1024 * 1024)
+    expected, error = Lexer('<lexer>', text).make_tokens()
+    if error: raise Exception(error.as_string())
+    expected = token_dump(expected)
+
+    print(f'{len(text.splitlines())} lines, {size:.2f}MB, {len(expected)} tokens')
+    print(f'{"lexer":<10}{"time":>10}{"MB/s":>10}{"speedup":>10}')
+    baseline = None
+    for name, lexer in LEXERS.items():
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            tokens, error = lexer('<lexer>', text).make_tokens()
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+
+        if error or token_dump(tokens) != expected:
+            raise Exception(f'{name} lexer made different tokens')
+        baseline = baseline or best
+        print(f'{name:<10}{best:>9.3f}s{size / best:>10.2f}{baseline / best:>9.2f}x')
+
+
+def bench_stream():
+    import tracemalloc
+    from Lexer import RegexLexer
+    from Parser import Parser, TokenBuffer
+    text = lexer_text()
+
+    def token_list(): return RegexLexer('<lexer>', text).make_tokens()[0]
+    def token_stream(): return TokenBuffer(RegexLexer('<lexer>', text).generate_tokens())
+
+    tracemalloc.start()
+    tokens = token_list()
+    size = tracemalloc.get_traced_memory()[0] / (1024 * 1024)
+    tracemalloc.stop()
+    print(f'token list: {len(tokens)} tokens, {size:.1f}MB, {size * 1024 * 1024 / len(tokens):.0f} bytes per token')
+    del tokens
+
+    print(f'{"parse":<10}{"time":>10}{"peak":>10}')
+    for name, tokens in (('list', token_list), ('stream', token_stream)):
+        tracemalloc.start()
+        start = time.perf_counter()
+        ast = Parser(tokens()).parse()
+        elapsed = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+        tracemalloc.stop()
+
+        if ast.error: raise Exception(ast.error.as_string())
+        print(f'{name:<10}{elapsed:>9.3f}s{peak:>8.1f}MB') # Times include the tracemalloc overhead
+
+
+def best_time(function, repeat=3):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def bench_ast():
+    import gc
+    import pickle
+    import tracemalloc
+    from Lexer import RegexLexer
+    from Parser import Parser
+    from Optimizer import Optimizer
+    from Resolver import Resolver
+    from FlatAST import FlatTree
+    text = lexer_text()
+    sys.setrecursionlimit(max(sys.getrecursionlimit(), 10000)) # pickle recurses down the Nodes
+
+    def nodes():
+        tokens, error = RegexLexer('<ast>', text).make_tokens()
+        if error: raise Exception(error.as_string())
+        return Resolver().resolve(Optimizer().optimize(Parser(tokens).parse().node))
+
+    # Memory kept once the tokens are gone, the positions and the Source included
+    tracemalloc.start()
+    node = nodes()
+    gc.collect()
+    nodes_size = tracemalloc.get_traced_memory()[0]
+    tree = FlatTree(node)
+    del node
+    gc.collect()
+    flat_size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    mb = 1024 * 1024
+    print(f'{len(tree)} nodes: Nodes {nodes_size / mb:.1f}MB, FlatTree {flat_size / mb:.1f}MB, {nodes_size / flat_size:.1f}x less')
+
+    node = nodes()
+    data, flat_data = pickle.dumps(node, pickle.HIGHEST_PROTOCOL), tree.to_bytes()
+    passes = [
+        ('bound names', lambda: set(Optimizer().bound_names(node)), lambda: set(tree.bound_names())),
+        ('serialize', lambda: pickle.dumps(node, pickle.HIGHEST_PROTOCOL), tree.to_bytes),
+        ('deserialize', lambda: pickle.loads(data), lambda: FlatTree.from_bytes(flat_data)),
+    ]
+    flatten_time, _ = best_time(lambda: FlatTree(node))
+    to_node_time, _ = best_time(tree.to_node)
+    print(f'FlatTree(node) {flatten_time:.3f}s, to_node() {to_node_time:.3f}s')
+    print(f'serialized: pickle {len(data) / mb:.1f}MB, to_bytes {len(flat_data) / mb:.1f}MB')
+    print(f'{"pass":<14}{"Nodes":>10}{"FlatTree":>10}{"speedup":>10}')
+    for name, nodes_pass, flat_pass in passes:
+        nodes_time, expected = best_time(nodes_pass)
+        flat_time, result = best_time(flat_pass)
+        if name == 'bound names' and result != expected: raise Exception('FlatTree found different bound names')
+        print(f'{name:<14}{nodes_time:>9.3f}s{flat_time:>9.3f}s{nodes_time / flat_time:>9.2f}x')
+
+    print(f'{"program":<10}{"engine":<14}{"Nodes":>10}{"FlatTree":>10}{"speedup":>10}')
+    for name in PROGRAMS:
+        for engine in ('interpreter', 'closure'): # The closure engine only reads the views once, to compile
+            nodes_time, expected = time_program(name, engine)
+            with warnings.catch_warnings(): # main.run warns about the interpreter on a flat tree, measured here on purpose
+                warnings.simplefilter('ignore', RuntimeWarning)
+                flat_time, output = time_program(name, engine, flat=True)
+            if output != expected: raise Exception(f'FlatTree printed {output!r} for {name}, expected {expected!r}')
+            print(f'{name:<10}{engine:<14}{nodes_time:>9.3f}s{flat_time:>9.3f}s{nodes_time / flat_time:>9.2f}x')
+
+
+def library_text(): # The lexer text as function definitions, running it only defines them
+    return ''.join(f'fun part{index}()\n{program}end\n'
+                   for index, program in enumerate(list(PROGRAMS.values()) * LEXER_COPIES))
+
+
+def bench_cache(repeat=5):
+    import tempfile
+    from ScriptCache import script_cache
+    text = library_text()
+
+    with tempfile.TemporaryDirectory() as directory:
+        fn = os.path.join(directory, 'library.txt')
+        with open(fn, 'w') as f:
+            f.write(text)
+
+        def run(cache):
+            _, error = main.run(fn, text, cache=cache)
+            if error: raise Exception(error.as_string())
+
+        cold_time, _ = best_time(lambda: run(False), repeat)
+        run(True) # Writes the entry
+        warm_time, _ = best_time(lambda: run(True), repeat)
+        entry_size = os.path.getsize(script_cache.entry_path(fn))
+        stats = script_cache.stats()
+        script_cache.clear()
+
+    print(f'{text.count(chr(10))} lines, entry {entry_size / 1024:.0f}KB, hits {stats["hits"]}, misses {stats["misses"]}, writes {stats["writes"]}')
+    print(f'{"run":<14}{"time":>10}{"speedup":>10}')
+    print(f'{"no cache":<14}{cold_time:>9.3f}s{1:>9.2f}x')
+    print(f'{"cached":<14}{warm_time:>9.3f}s{cold_time / warm_time:>9.2f}x')
+
+
+def bench_quicken(engines):
+    from Interpreter import Interpreter, quickening
+    print(f'{"program":<10}{"engine":<14}{"generic":>10}{"quickened":>10}{"speedup":>10}  sites')
+    try:
+        for name in PROGRAMS:
+            for engine in engines:
+                Interpreter.quicken = False
+                generic_time, expected = time_program(name, engine)
+                Interpreter.quicken = True
+                quickening.clear()
+                quick_time, output = time_program(name, engine, repeat=1)
+                stats = quickening.stats()
+                quick_time = min(quick_time, time_program(name, engine, repeat=2)[0])
+                if output != expected: raise Exception(f'Quickening printed {output!r} for {name}, expected {expected!r}')
+                print(f'{name:<10}{engine:<14}{generic_time:>9.3f}s{quick_time:>9.3f}s{generic_time / quick_time:>9.2f}x'
+                      f'  {stats["sites"]} watched, {stats["quickened"]} quickened, {stats["deopts"]} deopts, {stats["generic"]} generic')
+    finally:
+        Interpreter.quicken = True
+
+
+def count_values(name, engine): # (made, shared) of one run of a program, after a first run imported its engine
+    import Value
+    time_program(name, engine, repeat=1)
+    counts = {'made': 0, 'shared': 0}
+    shared = {id(number) for number in Value.SMALL_INTS}
+    make_number = Value.make_number
+
+    def counting_init(init): # Number(...) and String(...), make_number does not call __init__
+        def counted(self, value):
+            counts['made'] += 1
+            init(self, value)
+        return counted
+
+    def counting_make_number(value):
+        number = make_number(value)
+        counts['shared' if id(number) in shared else 'made'] += 1
+        return number
+
+    # Every engine imported make_number into its own module
+    modules = [module for module in sys.modules.values() if getattr(module, 'make_number', None) is make_number]
+    for module in modules: module.make_number = counting_make_number
+    inits = {value_type: value_type.__init__ for value_type in (Value.Number, Value.String)}
+    for value_type, init in inits.items(): value_type.__init__ = counting_init(init)
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            _, error = main.run(f'<{name}>', PROGRAMS[name], engine)
+        if error: raise Exception(error.as_string())
+    finally:
+        for value_type, init in inits.items(): value_type.__init__ = init
+        for module in modules: module.make_number = make_number
+    return counts['made'], counts['shared']
+
+
+def bench_alloc(engines):
+    print(f'{"program":<10}{"engine":<14}{"made":>10}{"shared":>10}')
+    for name in PROGRAMS:
+        for engine in engines:
+            made, shared = count_values(name, engine)
+            print(f'{name:<10}{engine:<14}{made:>10}{shared:>10}')
+
+
+DEPTH_PROGRAM = '''
+fun sum(n)
+    if n == 0
+        return 0
+    end
+    return n + sum(n - 1)
+end
+total = 0
+for i = 1 to {repeat}
+    total = total + sum({depth})
+end
+puts total
+'''
+
+# Two functions calling each other, a name lookup can not skip the calls of one function at a time here
+MUTUAL_DEPTH_PROGRAM = '''
+fun ev(n)
+    if n == 0
+        return 0
+    end
+    return 1 + od(n - 1)
+end
+fun od(n)
+    if n == 0
+        return 0
+    end
+    return 1 + ev(n - 1)
+end
+total = 0
+for i = 1 to {repeat}
+    total = total + ev({depth})
+end
+puts total
+'''
+
+DEPTH_CALLS = 100000
+DEPTHS = [50, 500, 5000, 20000]
+
+def bench_depth(engines):
+    print(f'{"program":<10}{"depth":<10}{"engine":<14}{"time":>10}')
+    for name, program in (('self', DEPTH_PROGRAM), ('mutual', MUTUAL_DEPTH_PROGRAM)):
+        for depth in DEPTHS:
+            text = program.format(depth=depth, repeat=DEPTH_CALLS // depth + 1)
+            for engine in engines:
+                start = time.perf_counter()
+                with contextlib.redirect_stdout(io.StringIO()):
+                    _, error = main.run(f'<depth {depth}>', text, engine)
+                # A Recursion Error when the engine goes past python's own recursion limit
+                result = error.error_name if error else f'{time.perf_counter() - start:>9.3f}s'
+                print(f'{name:<10}{depth:<10}{engine:<14}{result:>10}')
+
+
+if __name__ == '__main__':
+    if '--lexer' in sys.argv:
+        bench_lexers()
+        bench_stream()
+    elif '--ast' in sys.argv:
+        bench_ast()
+    elif '--cache' in sys.argv:
+        bench_cache()
+    elif '--quicken' in sys.argv:
+        bench_quicken([arg for arg in sys.argv[1:] if arg != '--quicken'] or ['interpreter', 'stack'])
+    elif '--alloc' in sys.argv:
+        bench_alloc([arg for arg in sys.argv[1:] if arg != '--alloc'] or ENGINES)
+    elif '--depth' in sys.argv:
+        bench_depth([arg for arg in sys.argv[1:] if arg != '--depth'] or ENGINES)
+    elif '--memory' in sys.argv:
+        bench_memory([arg for arg in sys.argv[1:] if arg != '--memory'] or ENGINES)
+    else:
+        bench_engines(sys.argv[1:] or ENGINES)
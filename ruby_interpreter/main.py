@@ -1,25 +1,99 @@
-def run(fn,text):
-    from Lexer import Lexer
-    from Parser import Parser
+def run(fn,text, engine='interpreter', optimize=True, lexer='regex', flat=False, cache=False, path=None, symbol_table=None):
+    from Errors import RecursionDepthError
+    from Position import Position, Source
+    # The passes and the stack engine walk the tree with stacks of their own, but the Parser still recurses
+    # per nested parenthesis and the other engines per nested node and call
+    try:
+        return run_program(fn, text, engine, optimize, lexer, flat, cache, path, symbol_table)
+    except RecursionError:
+        source = Source(fn, text)
+        first_line_end = text.find('\n')
+        return None, RecursionDepthError(Position(0, source), Position(len(text) if first_line_end < 0 else first_line_end, source),
+                                         f'The program nests or recurses too deeply for the {engine} engine')
+
+def run_program(fn, text, engine, optimize, lexer, flat, cache, path, symbol_table):
+    import warnings
+    from Lexer import LEXERS
+    from Parser import Parser, TokenBuffer
+    from RTEResult import ErrorSignal
     from Interpreter import Interpreter
+    from Resolver import Resolver
+    from Optimizer import Optimizer
     from Context import Context
     from GlobalSymbolTable import global_symbol_table
-    lexer  = Lexer(fn, text)
-    tokens, error = lexer.make_tokens()
-    if error: return None, error 
+    from FlatAST import FlatTree
+    from ScriptCache import script_cache
+    # The top level names of the program go in symbol_table, the global one unless REQUIRE gives one of its own
+    if symbol_table is None: symbol_table = global_symbol_table
+    optimizer = Optimizer(symbol_table) if optimize else None
+
+    # cache=True keeps the resolved tree of the script file on disk, running it again skips straight to the engine.
+    # The file is path when fn is only the name error messages show, fn otherwise
+    path = path or fn
+    tree = script_cache.load(path, text, optimizer, fn) if cache else None
+    if tree:
+        node = tree.root if flat else tree.to_node()
+    else:
+        # 'regex' makes the same tokens as the character by character 'char' Lexer, only faster
+        lexer  = LEXERS[lexer](fn, text)
+        if hasattr(lexer, 'generate_tokens'): # The parser pulls the tokens while the lexer makes them
+            tokens = TokenBuffer(lexer.generate_tokens())
+        else:
+            tokens, error = lexer.make_tokens()
+            if error: return None, error
+
+
+        #Generate Abstract Syntax Tree
+        try:
+            parser = Parser(tokens)
+            ast = parser.parse()
+            if ast.error: parser.tokens.drain() # A lexer error anywhere wins, as when all tokens are made first
+        except ErrorSignal as signal:
+            return None, signal.error
+        if ast.error: return None, ast.error
+        node = ast.node
 
+        # Fold constants and prune dead branches, optimize=False runs the tree as parsed
+        if optimizer:
+            node = optimizer.optimize(node)
 
-    #Generate Abstract Syntax Tree
-    parser = Parser(tokens)
-    ast = parser.parse()
-    if ast.error: return None, ast.error
+        # Give variables inside functions their Frame slots
+        Resolver().resolve(node)
+
+        if cache or flat: tree = FlatTree(node)
+        if cache: script_cache.store(path, text, tree, optimizer)
+        # Keep the tree in parallel arrays instead of a python object per node, the engines run off its views
+        if flat: node = tree.root
+
+    # A view reads each attribute from the arrays once and keeps it, but the tree walking interpreter still
+    # runs slower off views than off Nodes. flat=True is for the engines that turn the tree into something else
+    # once (closure, vm), or for a program too big to keep as Nodes
+    if flat and engine == 'interpreter':
+        warnings.warn("the interpreter engine runs slower on a flat tree than on Nodes, flat=True is meant for the closure or vm engine",
+                      RuntimeWarning, stacklevel=3)
 
     # Run Program
-    interpreter = Interpreter()
     context = Context("<program>", )
-    context.symbol_table = global_symbol_table
-    result = interpreter.visit(ast.node, context)
-    
+    context.symbol_table = symbol_table
+
+    if engine == 'vm': # Compile to bytecode and run it on the stack VM
+        from Compiler import Compiler
+        from VM import VM
+        code = Compiler().compile_program(node)
+        result = VM().run(code, context)
+    elif engine == 'closure': # Turn every node into a python closure once, then call it
+        from ClosureCompiler import ClosureCompiler
+        result = ClosureCompiler().run(node, context)
+    elif engine == 'python': # Translate to python source and run it as native bytecode
+        from Transpiler import Transpiler
+        result = Transpiler().run(node, context)
+    elif engine == 'stack': # Walk the tree with its own stacks, so deep recursion does not hit python's limit
+        from StackInterpreter import StackInterpreter
+        result = StackInterpreter().run(node, context)
+    else:
+        interpreter = Interpreter()
+        result = interpreter.run(node, context)
+
 
     return result.value, result.error
 
@@ -0,0 +1,43 @@
+import contextlib
+import io
+import os
+import sys
+
+import pytest
+
+# The modules import each other by bare name, as when main.py is run from its own directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main
+from GlobalSymbolTable import global_symbol_table
+from ModuleCache import module_cache
+from ScriptCache import script_cache
+from Interpreter import quickening
+
+ENGINES = ['interpreter', 'vm', 'closure', 'python', 'stack']
+
+
+def run(text, engine, fn='<test>', **options):
+    """Runs text on engine, returns what it printed and the error message, None when it ran."""
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        _, error = main.run(fn, text, engine, **options)
+    return output.getvalue(), error.as_string() if error else None
+
+
+@pytest.fixture(params=ENGINES)
+def engine(request):
+    return request.param
+
+
+@pytest.fixture(autouse=True)
+def fresh_globals():
+    # Programs run in the global symbol table, every test starts with only the built-ins in it
+    symbols = dict(global_symbol_table.symbols)
+    module_cache.clear()
+    quickening.clear()
+    yield
+    global_symbol_table.symbols.clear()
+    global_symbol_table.symbols.update(symbols)
+    module_cache.clear()
+    script_cache.clear()
@@ -0,0 +1,124 @@
+import os
+
+import pytest
+
+from conftest import run
+from ModuleCache import module_cache
+from ScriptCache import script_cache, ScriptCache, CACHE_DIR
+
+# RUN keeps the resolved tree of a script in ScriptCache, REQUIRE runs a script once per process
+# and keeps its names in ModuleCache
+
+
+@pytest.fixture
+def script(tmp_path):
+    path = tmp_path / 'lib.txt'
+    path.write_text('fun helper(n) -> n * 2\nlibvar = 7\n')
+    return path
+
+
+def test_run_again_hits_the_script_cache(engine, script):
+    text = f'''
+RUN("{script}")
+RUN("{script}")
+puts(RUN_CACHE_STATS())
+puts(helper(libvar))
+'''
+    assert run(text, engine) == ('[1, 1, 1]\n14\n', None)
+    assert os.path.isdir(script.parent / CACHE_DIR)
+
+
+def test_edited_script_misses_the_script_cache(engine, script):
+    run(f'RUN("{script}")', engine)
+    script.write_text('fun helper(n) -> n * 3\nlibvar = 8\n')
+    text = f'''
+RUN("{script}")
+puts(helper(libvar))
+puts(RUN_CACHE_STATS())
+'''
+    assert run(text, engine) == ('24\n[0, 2, 2]\n', None)
+
+
+def test_run_cache_clear_removes_the_entries(engine, script):
+    text = f'''
+RUN("{script}")
+puts(RUN_CACHE_CLEAR())
+puts(RUN_CACHE_STATS())
+'''
+    assert run(text, engine) == ('1\n[0, 0, 0]\n', None)
+    assert not os.path.exists(script.parent / CACHE_DIR)
+
+
+@pytest.mark.parametrize('flat', [False, True])
+@pytest.mark.filterwarnings('ignore:the interpreter engine runs slower on a flat tree')
+def test_cached_program_runs_the_same(engine, tmp_path, flat):
+    path = tmp_path / 'program.txt'
+    text = '''
+fun fact(n)
+    if n < 2
+        return 1
+    end
+    return n * fact(n - 1)
+end
+for i = 1 to 6
+    puts(fact(i))
+end
+'''
+    path.write_text(text)
+    expected = ('1\n2\n6\n24\n120\n', None)
+    assert run(text, engine, fn=str(path), cache=True, flat=flat) == expected
+    assert run(text, engine, fn=str(path), cache=True, flat=flat) == expected
+    assert script_cache.stats() == {'hits': 1, 'misses': 1, 'writes': 1}
+
+
+def test_script_cache_in_its_own_directory(tmp_path, script):
+    cache = ScriptCache(str(tmp_path / 'cache'))
+    os.makedirs(cache.directory)
+    assert cache.load(str(script), script.read_text()) is None
+    assert cache.stats() == {'hits': 0, 'misses': 1, 'writes': 0}
+    assert cache.clear() == 0
+
+
+def test_script_cache_checks_mtime_and_size_before_the_hash(script, monkeypatch):
+    written = script.stat().st_mtime_ns - 10**9 # Older than the entry, so the fast key is trusted
+    os.utime(script, ns=(written, written))
+    run(f'RUN("{script}")', 'interpreter')
+    hashed = []
+    monkeypatch.setattr(script_cache, 'digest', lambda text: hashed.append(text) or ScriptCache.digest(script_cache, text))
+
+    run(f'RUN("{script}")', 'interpreter')
+    assert hashed == []
+    os.utime(script, ns=(written + 1, written + 1)) # Touched: the hash is checked and still matches
+    run(f'RUN("{script}")', 'interpreter')
+    assert len(hashed) == 1
+    assert script_cache.stats() == {'hits': 2, 'misses': 1, 'writes': 1}
+
+
+def test_require_runs_a_module_once(engine, tmp_path):
+    module = tmp_path / 'module.txt'
+    module.write_text('puts("loading")\nshared = []\nfun add(n) -> APPEND(shared, n)\n')
+    text = f'''
+REQUIRE("{module}")
+add(1)
+REQUIRE("{module}")
+add(2)
+puts(shared)
+'''
+    assert run(text, engine) == ('loading\n[1, 2]\n', None)
+    assert module_cache.loads == 1
+    assert module_cache.hits == 1
+
+
+def test_require_runs_a_changed_module_again(engine, tmp_path):
+    module = tmp_path / 'module.txt'
+    module.write_text('value = 1\n')
+    assert run(f'REQUIRE("{module}")\nputs(value)', engine) == ('1\n', None)
+    module.write_text('value = 22\n')
+    assert run(f'REQUIRE("{module}")\nputs(value)', engine) == ('22\n', None)
+    assert module_cache.loads == 2
+
+
+def test_require_of_a_missing_file_is_an_error(engine, tmp_path):
+    output, error = run(f'REQUIRE("{tmp_path / "missing.txt"}")', engine)
+    assert 'Failed to load script' in error
+    assert module_cache.loads == 0
@@ -0,0 +1,206 @@
+import sys
+
+import pytest
+
+from conftest import run
+
+# BREAK, CONTINUE, RETURN and calls leave the same way on every engine
+
+
+def test_break_and_continue_inside_a_function_leave_the_callers_loop(engine):
+    text = '''
+fun stop()
+    BREAK
+end
+fun skip()
+    CONTINUE
+end
+for i = 0 to 5
+    puts(i)
+    stop()
+end
+for i = 0 to 3
+    skip()
+    puts(i * 10)
+end
+j = 0
+while j < 3
+    j = j + 1
+    skip()
+    puts(j)
+end
+puts(99)
+'''
+    assert run(text, engine) == ('0\n99\n', None)
+
+
+def test_break_inside_a_function_leaves_the_innermost_loop_of_the_caller(engine):
+    text = '''
+fun stop()
+    BREAK
+end
+for i = 0 to 2
+    for j = 0 to 5
+        puts(i * 10 + j)
+        if j == 1
+            stop()
+        end
+    end
+end
+'''
+    assert run(text, engine) == ('0\n1\n10\n11\n', None)
+
+
+def test_break_outside_of_any_loop_ends_the_program(engine):
+    text = '''
+fun stop()
+    BREAK
+end
+puts(1)
+stop()
+puts(2)
+'''
+    assert run(text, engine) == ('1\n', None)
+
+
+# The closure and python engines leave calls to python, so tail calls still take a python frame
+@pytest.mark.parametrize('engine', ['interpreter', 'vm', 'stack'])
+def test_tail_recursion_runs_past_pythons_recursion_limit(engine):
+    text = f'''
+fun down(n, total)
+    if n == 0
+        return total
+    end
+    return down(n - 1, total + 1)
+end
+puts(down({sys.getrecursionlimit() * 3}, 0))
+'''
+    assert run(text, engine) == (f'{sys.getrecursionlimit() * 3}\n', None)
+
+
+TAIL_CALL_ERROR = '''
+fun down(n)
+    if n == 0
+        return 1 / 0
+    end
+    return down(n - 1)
+end
+fun start() -> down(50)
+start()
+'''
+
+
+def test_error_in_tail_recursion_has_the_same_traceback_on_every_engine(engine):
+    output, error = run(TAIL_CALL_ERROR, engine)
+    assert output == ''
+    assert error == run(TAIL_CALL_ERROR, 'interpreter')[1]
+    assert 'Divison by zero' in error
+    # Tail calls run in a loop, the traceback still shows every call as if each had its own frame
+    assert error.count('in down') == 51
+    assert error.count('in start') == 1
+
+
+def test_error_in_a_nested_call_has_the_same_traceback_on_every_engine(engine):
+    text = '''
+fun inner(n) -> n / 0
+fun outer(n) -> 1 + inner(n)
+puts(outer(2))
+'''
+    output, error = run(text, engine)
+    assert error == run(text, 'interpreter')[1]
+    assert 'in inner' in error and 'in outer' in error
+
+
+def test_stack_engine_recursion_beyond_pythons_limit():
+    depth = sys.getrecursionlimit() * 5
+    text = f'''
+fun sum(n)
+    if n == 0
+        return 0
+    end
+    return n + sum(n - 1)
+end
+puts(sum({depth}))
+'''
+    assert run(text, 'stack') == (f'{depth * (depth + 1) // 2}\n', None)
+
+
+MUTUAL_RECURSION = '''
+fun ev(n)
+    if n == 0
+        return 0
+    end
+    return unit + od(n - 1)
+end
+fun od(n)
+    if n == 0
+        return 0
+    end
+    return unit + ev(n - 1)
+end
+'''
+
+
+# unit is bound by no function, so it is looked up past every call of ev and od at once
+@pytest.mark.parametrize('engine', ['vm', 'stack'])
+def test_mutual_recursion_beyond_pythons_limit(engine):
+    depth = sys.getrecursionlimit() * 5
+    assert run(MUTUAL_RECURSION + f'unit = 2\nputs(ev({depth}))', engine) == (f'{depth * 2}\n', None)
+
+
+def test_mutual_recursion_still_sees_the_names_a_caller_binds(engine):
+    text = MUTUAL_RECURSION + '''
+unit = 2
+fun start(unit) -> ev(50)
+puts(start(3))
+puts(ev(50))
+'''
+    assert run(text, engine) == ('150\n100\n', None)
+
+
+@pytest.mark.parametrize('optimize', [False, True])
+def test_chain_longer_than_pythons_recursion_limit(engine, optimize):
+    terms = sys.getrecursionlimit() * 3
+    text = f'y = 1\nputs({" + ".join(["y"] * terms)})'
+    assert run(text, engine, optimize=optimize) == (f'{terms}\n', None)
+
+
+def test_nesting_past_pythons_recursion_limit_is_an_error(engine):
+    depth = sys.getrecursionlimit() * 2
+    output, error = run(f'puts({"(" * depth}1{")" * depth})', engine)
+    assert output == ''
+    assert error.startswith(f'Recursion Error: The program nests or recurses too deeply for the {engine} engine')
+
+
+def test_and_or_short_circuit(engine):
+    text = '''
+fun loud(n)
+    puts("called")
+    return n
+end
+puts(0 AND loud(1))
+puts(1 OR loud(1))
+puts(1 AND loud(2))
+puts(0 OR loud(0))
+'''
+    assert run(text, engine) == ('0\n1\ncalled\n1\ncalled\n0\n', None)
+
+
+def test_short_circuit_skips_an_error(engine):
+    assert run('puts(0 AND 1 / 0)\nputs(1 OR missing)', engine) == ('0\n1\n', None)
+
+
+def test_short_circuit_in_a_loop_condition(engine):
+    text = '''
+calls = [0]
+fun seen(n)
+    APPEND(calls, n)
+    return 1
+end
+i = 0
+while i < 3 AND seen(i)
+    i = i + 1
+end
+puts(calls)
+'''
+    assert run(text, engine) == ('[0, 0, 1, 2]\n', None)
@@ -0,0 +1,55 @@
+from conftest import run
+
+# MEMO(fn) keeps the results of a function that has no side effects
+
+
+def test_memo_results_are_the_same_values(engine):
+    text = '''
+fun square(n) -> n * n
+fast = MEMO(square)
+puts(fast(12))
+puts(fast(12))
+puts(fast("no") == 0)
+'''
+    output, error = run(text, engine)
+    assert output.splitlines()[:2] == ['144', '144']
+    assert error == run(text, 'interpreter')[1]
+
+
+def test_memo_refuses_a_function_that_reads_a_global(engine):
+    text = '''
+x = 1
+fun f(a) -> a + x
+g = MEMO(f)
+'''
+    output, error = run(text, engine)
+    assert 'Can not memoize <function f>, it reads x' in error
+
+
+def test_memo_refuses_a_function_that_calls_one_reading_a_global(engine):
+    text = '''
+x = 1
+fun inner(a) -> a + x
+fun outer(a) -> inner(a) * 2
+g = MEMO(outer)
+'''
+    output, error = run(text, engine)
+    assert 'Can not memoize <function outer>, it reads x' in error
+
+
+def test_memo_takes_what_only_depends_on_the_arguments(engine):
+    # inner reads b of whichever function calls it, here always outer's own argument
+    text = '''
+fun square(n) -> n * n
+fun inner() -> b + 1
+fun outer(b)
+    c = square(b)
+    scale = fun (n) -> n * c
+    return scale(inner())
+end
+fast = MEMO(outer)
+puts(fast(3))
+puts(fast(3))
+puts(MEMO_STATS(fast))
+'''
+    assert run(text, engine) == ('36\n36\n[1, 1, 1]\n', None)
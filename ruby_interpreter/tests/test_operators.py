@@ -0,0 +1,38 @@
+import pytest
+
+from conftest import run
+
+# Operators give the same Values on every engine, whichever path computes them
+
+
+@pytest.mark.parametrize('expression, result', [
+    ('1 != 2', '1'), ('2 != 2', '0'), ('2.5 != 2', '1'), ('0 - 3 != 3', '1'),
+])
+def test_not_equal_on_numbers(engine, expression, result):
+    assert run(f'puts({expression})', engine) == (result + '\n', None)
+
+
+def test_not_equal_in_a_loop_condition(engine):
+    text = '''
+i = 0
+while i != 4
+    i = i + 1
+end
+puts(i)
+fun count(n)
+    k = 0
+    while k != n
+        k = k + 1
+    end
+    return k
+end
+puts(count(7))
+'''
+    assert run(text, engine) == ('4\n7\n', None)
+
+
+def test_long_chain_of_operators(engine):
+    # The python engine gives every operator its own line, a long chain does not nest in the generated code
+    terms = 450
+    text = f'y = 1\nputs({" + ".join(["y"] * terms)})\nfun f(a) -> {" * ".join(["a"] * terms)}\nputs(f(1))'
+    assert run(text, engine) == (f'{terms}\n1\n', None)
@@ -0,0 +1,49 @@
+import warnings
+
+import pytest
+
+from conftest import run
+
+# The options of main.run change how a program gets to an engine, never what it does
+
+
+FIB = '''
+fun fib(n)
+    if n < 2
+        return n
+    end
+    return fib(n - 1) + fib(n - 2)
+end
+total = 0
+for i = 0 to 10
+    total = total + fib(i)
+end
+puts(total)
+'''
+
+
+def test_unoptimized_tree_runs_the_same(engine):
+    assert run(FIB, engine, optimize=False) == run(FIB, engine) == ('88\n', None)
+
+
+def test_char_lexer_runs_the_same(engine):
+    assert run(FIB, engine, lexer='char') == ('88\n', None)
+
+
+def test_statement_that_does_not_parse_is_reported_at_its_first_token():
+    output, error = run('r = 0\nr = while i < 3 i = i + 1', 'interpreter')
+    assert 'Token cannot appear after previous tokens' in error
+    assert 'line 2' in error
+
+
+@pytest.mark.filterwarnings('ignore:the interpreter engine runs slower on a flat tree')
+def test_flat_tree_runs_the_same(engine):
+    assert run(FIB, engine, flat=True) == ('88\n', None)
+
+
+def test_flat_tree_warns_on_the_interpreter():
+    with pytest.warns(RuntimeWarning, match='flat tree'):
+        assert run(FIB, 'interpreter', flat=True) == ('88\n', None)
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        assert run(FIB, 'closure', flat=True) == ('88\n', None)
@@ -0,0 +1,101 @@
+import pytest
+
+from conftest import run
+from Interpreter import quickening, QUICKEN_AFTER, MAX_DEOPTS
+
+# The Interpreter quickens sites that keep seeing the same types, the other engines run the same
+# programs without it. Whatever a quickened site runs on, the result is the generic one.
+
+# times(a, b) is quickened for a String and a Number, then sees two Numbers and then a List
+CHANGING_TYPES = f'''
+fun times(a, b) -> a * b
+for i = 1 to {QUICKEN_AFTER * 2}
+    s = times("ab", 2)
+end
+puts(s)
+puts(times(3, 4))
+puts(times("c", 3))
+puts(times([1, 2], 2))
+'''
+
+
+def test_site_that_changes_types_deopts(engine):
+    output, error = run(CHANGING_TYPES, engine)
+    assert output == 'abab\n12\nccc\n'
+    assert 'Illegal operation' in error
+    assert error == run(CHANGING_TYPES, 'interpreter')[1]
+
+
+def test_interpreter_counts_the_deopt():
+    run(CHANGING_TYPES, 'interpreter')
+    stats = quickening.stats()
+    assert stats['quickened'] >= 1
+    assert stats['deopts'] >= 1
+
+
+def test_site_that_keeps_changing_types_goes_generic(engine):
+    text = f'''
+fun add(a, b) -> a + b
+out = []
+k = 0
+for i = 0 to {(QUICKEN_AFTER + 1) * (MAX_DEOPTS + 2)}
+    n = add(i, 1)
+    k = k + 1
+    if k == {QUICKEN_AFTER + 1}
+        k = 0
+        APPEND(out, add("x", "y"))
+    end
+end
+puts(LEN(out))
+puts(out / 0)
+'''
+    assert run(text, engine) == (f'{MAX_DEOPTS + 2}\nxy\n', None)
+    if engine == 'interpreter':
+        assert quickening.stats()['generic'] >= 1
+
+
+def test_call_site_deopts_when_the_function_changes(engine):
+    text = f'''
+fun one() -> 1
+fun two() -> 2
+f = one
+total = 0
+for i = 0 to {QUICKEN_AFTER * 3}
+    if i == {QUICKEN_AFTER * 2}
+        f = two
+    end
+    total = total + f()
+end
+puts(total)
+'''
+    assert run(text, engine) == (f'{QUICKEN_AFTER * 2 + QUICKEN_AFTER * 2}\n', None)
+    if engine == 'interpreter':
+        assert quickening.stats()['deopts'] >= 1
+
+
+@pytest.mark.parametrize('call, message', [
+    ('divide(1, 0)', 'Divison by zero'), ('index([1, 2], 5)', 'Element at this index'),
+])
+def test_quickened_site_still_reports_errors(engine, call, message):
+    text = f'''
+fun divide(a, b) -> a / b
+fun index(list, i) -> list / i
+for i = 1 to {QUICKEN_AFTER * 2}
+    divide(i, 2)
+    index([1, 2], 1)
+end
+{call}
+'''
+    output, error = run(text, engine)
+    assert message in error
+    assert error == run(text, 'interpreter')[1]
+
+
+def test_quickening_off_runs_the_same():
+    from Interpreter import Interpreter
+    Interpreter.quicken = False
+    try:
+        assert run(CHANGING_TYPES, 'interpreter')[0] == 'abab\n12\nccc\n'
+        assert quickening.stats()['quickened'] == 0
+    finally:
+        Interpreter.quicken = True
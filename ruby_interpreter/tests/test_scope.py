@@ -0,0 +1,70 @@
+from conftest import run
+from GlobalSymbolTable import global_symbol_table
+from SymbolTable import SymbolTable
+
+# Top level names live in the program's SymbolTable on every engine, functions see them dynamically
+
+
+def test_reading_a_global_before_assigning_it_in_a_function(engine):
+    text = '''
+x = 5
+fun g()
+    x = x + 1
+    puts(x)
+end
+g()
+puts(x)
+'''
+    assert run(text, engine) == ('6\n5\n', None)
+
+
+def test_local_assigned_on_only_one_branch(engine):
+    text = '''
+y = 1
+fun h(a)
+    if a
+        y = 2
+    end
+    return y
+end
+puts(h(0))
+puts(h(1))
+'''
+    assert run(text, engine) == ('1\n2\n', None)
+
+
+def test_globals_survive_run(engine, tmp_path):
+    library = tmp_path / 'lib.txt'
+    library.write_text('fun helper(n) -> n * 2\nlibvar = 7\n')
+    text = f'''
+RUN("{library}")
+puts(helper(21))
+puts(libvar)
+'''
+    assert run(text, engine) == ('42\n7\n', None)
+
+
+def test_globals_survive_between_programs(engine):
+    # What the shell does: every line is a program of its own in the same symbol table
+    assert run('y = 3', engine) == ('', None)
+    assert run('fun twice(n) -> n * 2', engine) == ('', None)
+    assert run('puts(twice(y))', engine) == ('6\n', None)
+    assert global_symbol_table.get('y').value == 3
+
+
+def test_function_changes_a_global_list(engine):
+    text = '''
+items = [1]
+fun add(n) -> APPEND(items, n)
+add(2)
+add(3)
+puts(items)
+'''
+    assert run(text, engine) == ('[1, 2, 3]\n', None)
+
+
+def test_program_in_its_own_symbol_table(engine):
+    table = SymbolTable(global_symbol_table)
+    assert run('z = 4\nputs(z * 2)', engine, symbol_table=table) == ('8\n', None)
+    assert table.get('z').value == 4
+    assert global_symbol_table.symbols.get('z') is None
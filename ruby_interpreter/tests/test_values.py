@@ -0,0 +1,98 @@
+from conftest import run
+from GlobalSymbolTable import global_symbol_table
+from Value import Number, make_number, string_literal, SMALL_INT_MIN, SMALL_INT_MAX
+
+# Values are shared between names, calls and engines where the tree walking Interpreter shares them
+
+
+def test_list_aliasing_matches_the_interpreter(engine):
+    text = '''
+a = [1, 2]
+b = a
+APPEND(b, 3)
+puts(a)
+c = a + 4
+puts(c)
+puts(a)
+fun keep(list) -> list
+d = keep(a)
+POP(d, 0)
+puts(a)
+e = [a, a]
+APPEND(a, 9)
+puts(e)
+'''
+    output, error = run(text, engine)
+    assert (output, error) == run(text, 'interpreter')
+    assert output.splitlines()[0] == '[1, 2, 3]'
+
+
+def test_numbers_do_not_change_through_an_alias(engine):
+    text = '''
+x = 5
+y = x
+x = x + 1
+puts(y)
+fun bump(n)
+    n = n + 1
+    return n
+end
+puts(bump(x))
+puts(x)
+'''
+    assert run(text, engine) == ('5\n7\n6\n', None)
+
+
+def test_functions_are_bound_when_assigned(engine):
+    text = '''
+fun f() -> 1
+g = f
+fun f() -> 2
+puts(g())
+puts(f())
+'''
+    assert run(text, engine) == ('1\n2\n', None)
+
+
+def test_function_made_by_a_function_keeps_working(engine):
+    text = '''
+fun make() -> fun (n) -> n * 3
+triple = make()
+puts(triple(4))
+puts(triple("ab"))
+'''
+    assert run(text, engine) == ('12\nababab\n', None)
+
+
+def test_small_ints_are_shared():
+    assert make_number(7) is make_number(7)
+    assert make_number(SMALL_INT_MIN) is make_number(SMALL_INT_MIN)
+    assert make_number(SMALL_INT_MAX) is make_number(SMALL_INT_MAX)
+    assert make_number(SMALL_INT_MAX + 1) is not make_number(SMALL_INT_MAX + 1)
+    assert make_number(1.0) is not Number.true
+    assert str(make_number(1.0)) == '1.0'
+
+
+def test_string_literals_are_shared():
+    assert string_literal('abc') is string_literal('abc')
+    assert string_literal('abc') is not string_literal('abd')
+
+
+def test_engines_share_numbers_and_literals(engine):
+    text = '''
+a = 3 + 4
+b = 14 / 2
+c = 2 > 1
+s = "word"
+fun word() -> "word"
+t = word()
+big = 5000 * 2
+'''
+    assert run(text, engine) == ('', None)
+    get = global_symbol_table.get
+    assert get('a') is make_number(7)
+    assert get('c') is Number.true
+    if engine != 'python': # The python engine runs on python strs, a String is made again when it ends
+        assert get('s') is get('t') is string_literal('word')
+    assert get('big').value == 10000
+    assert get('b').value == 7